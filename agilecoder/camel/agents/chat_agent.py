@@ -23,6 +23,8 @@ from agilecoder.camel.configs import ChatGPTConfig
 from agilecoder.camel.messages import ChatMessage, MessageType, SystemMessage
 from agilecoder.camel.model_backend import ModelBackend, ModelFactory
 from agilecoder.camel.typing import ModelType, RoleType
+from agilecoder.components.events import LLMRetry, emit
+from agilecoder.components.tracing import current_span, traced
 from agilecoder.camel.utils import (
     get_model_token_limit,
     num_tokens_from_messages,
@@ -30,6 +32,12 @@ from agilecoder.camel.utils import (
 )
 
 
+def emit_retry(retry_state):
+    """called by tenacity before a step of an agent is tried again"""
+    agent = retry_state.args[0]
+    emit(LLMRetry(agent.model.value, retry_state.attempt_number))
+
+
 @dataclass(frozen=True)
 class ChatAgentResponse:
     r"""Response of a ChatAgent.
@@ -153,7 +161,8 @@ class ChatAgent(BaseAgent):
         self.stored_messages.append(message)
         return self.stored_messages
 
-    @retry(wait=wait_exponential(min=5, max=60), stop=stop_after_attempt(5))
+    @retry(wait=wait_exponential(min=5, max=60), stop=stop_after_attempt(5), before_sleep=emit_retry)
+    @traced("ChatAgent.step")
     @openai_api_key_required
     def step(
             self,
@@ -171,6 +180,7 @@ class ChatAgent(BaseAgent):
                 the chat session has terminated, and information about the chat
                 session.
         """
+        current_span().set_attribute("role", self.role_name)
         messages = self.update_messages(input_message)
         if self.message_window_size is not None and len(
                 messages) > self.message_window_size:
@@ -14,10 +14,13 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 import os
+import time
 import openai
 import tiktoken
 
 from agilecoder.camel.typing import ModelType
+from agilecoder.components.events import LLMCall, emit
+from agilecoder.components.tracing import current_span, traced
 from agilecoder.components.utils import log_and_print_online
 
 
@@ -153,6 +156,7 @@ class OpenAIModel(ModelBackend):
             openai.api_version = API_VERSION
     
 
+    @traced("ModelBackend.run")
     def run(self, *args, **kwargs) -> Dict[str, Any]:
         string = "\n".join([message["content"] for message in kwargs["messages"]])
         encoding = tiktoken.encoding_for_model(self.model_type.value)
@@ -177,8 +181,18 @@ class OpenAIModel(ModelBackend):
         else:
             kwargs['model'] = self.model_type.value
         # import pdb; pdb.set_trace()
-        response = openai.ChatCompletion.create(*args, **kwargs,
-                                                **self.model_config_dict)
+        start = time.perf_counter()
+        try:
+            response = openai.ChatCompletion.create(*args, **kwargs,
+                                                    **self.model_config_dict)
+        except Exception as e:
+            emit(LLMCall(self.model_type.value, 0, 0, time.perf_counter() - start, error=type(e).__name__))
+            raise
+        emit(LLMCall(self.model_type.value, response["usage"]["prompt_tokens"],
+                     response["usage"]["completion_tokens"], time.perf_counter() - start))
+        current_span().set_attribute("model", self.model_type.value)
+        current_span().set_attribute("prompt_tokens", response["usage"]["prompt_tokens"])
+        current_span().set_attribute("completion_tokens", response["usage"]["completion_tokens"])
 
         log_and_print_online(
             "**[OpenAI_Usage_Info Receive]**\nprompt_tokens: {}\ncompletion_tokens: {}\ntotal_tokens: {}\n".format(
@@ -241,6 +255,7 @@ class ClaudeAIModel(ModelBackend):
         self.model_config_dict = model_config_dict
             
 
+    @traced("ModelBackend.run")
     def run(self, *args, **kwargs) -> Dict[str, Any]:
         string = "\n".join([message["content"] for message in kwargs["messages"]])
         encoding = tiktoken.encoding_for_model(self.model_type.value)
@@ -279,10 +294,20 @@ class ClaudeAIModel(ModelBackend):
         kwargs = new_kwargs
         llm = AI4CodeSonnet()
         # try:
-        claude_output = llm.generate(*args, messages=messages,**kwargs)
+        start = time.perf_counter()
+        try:
+            claude_output = llm.generate(*args, messages=messages,**kwargs)
+        except Exception as e:
+            emit(LLMCall(self.model_type.value, 0, 0, time.perf_counter() - start, error=type(e).__name__))
+            raise
         # except:
         #     breakpoint()
         response = convert_claude_to_openai(claude_output)
+        emit(LLMCall(self.model_type.value, response["usage"]["prompt_tokens"],
+                     response["usage"]["completion_tokens"], time.perf_counter() - start))
+        current_span().set_attribute("model", self.model_type.value)
+        current_span().set_attribute("prompt_tokens", response["usage"]["prompt_tokens"])
+        current_span().set_attribute("completion_tokens", response["usage"]["completion_tokens"])
 
         log_and_print_online(
             "**[CLAUDE_Usage_Info Receive]**\nprompt_tokens: {}\ncompletion_tokens: {}\ntotal_tokens: {}\n".format(
@@ -13,5 +13,7 @@ def main():
                         help="Name of software, your software will be generated in WareHouse/name_org_timestamp")
     parser.add_argument('--model', type=str, default="GPT_3_5_AZURE",
                         help="GPT Model, choose from {'GPT_3_5_TURBO','GPT_4','GPT_4_32K', 'GPT_3_5_AZURE','CLAUDE'}")
+    parser.add_argument('--unit-testing', action='store_true', default=None,
+                        help="Write and run unit tests in the Test phases, like unit_testing in ChatChainConfig.json")
     args = parser.parse_args()
     run_task(args)                                           
\ No newline at end of file
@@ -10,8 +10,11 @@ from agilecoder.camel.agents import RolePlaying
 from agilecoder.camel.configs import ChatGPTConfig
 from agilecoder.camel.typing import TaskType, ModelType
 from agilecoder.components.chat_env import ChatEnv, ChatEnvConfig
-from agilecoder.components.statistics import get_info
+from agilecoder.components.events import install_event_log, install_sink
+from agilecoder.components.statistics import get_info, install_statistics
+from agilecoder.components.tracing import current_span, install_tracing, shutdown_tracing, traced
 from agilecoder.components.utils import log_and_print_online, now
+from agilecoder.online_log.shipper import ShipperSink, get_shipper
 
 
 def check_bool(s):
@@ -27,7 +30,8 @@ class ChatChain:
                  task_prompt: str = None,
                  project_name: str = None,
                  org_name: str = None,
-                 model_type: ModelType = ModelType.GPT_3_5_TURBO) -> None:
+                 model_type: ModelType = ModelType.GPT_3_5_TURBO,
+                 unit_testing: bool = None) -> None:
         """
 
         Args:
@@ -37,6 +41,7 @@ class ChatChain:
             task_prompt: the user input prompt for software
             project_name: the user input name for software
             org_name: the organization name of the human user
+            unit_testing: write and run unit tests in the Test phases, None for unit_testing of ChatChainConfig.json
         """
 
         # load config file
@@ -51,6 +56,11 @@ class ChatChain:
             self.config = json.load(file)
         with open(self.config_phase_path, 'r', encoding="utf8") as file:
             self.config_phase = json.load(file)
+        # "patch" asks the modification phases for search/replace edits instead of whole files,
+        # ComposedPhases build their SimplePhases from config_phase as well
+        if self.config.get("code_edit_format", "whole") == "patch":
+            for phase in self.config_phase.values():
+                phase['phase_prompt'] = phase.get('phase_prompt_patch', phase['phase_prompt'])
         with open(self.config_role_path, 'r', encoding="utf8") as file:
             self.config_role = json.load(file)
 
@@ -65,7 +75,14 @@ class ChatChain:
         self.chat_env_config = ChatEnvConfig(clear_structure=check_bool(self.config["clear_structure"]),
                                              brainstorming=check_bool(self.config["brainstorming"]),
                                              gui_design=check_bool(self.config["gui_design"]),
-                                             git_management=check_bool(self.config["git_management"]))
+                                             git_management=check_bool(self.config["git_management"]),
+                                             test_resource_limits=self.config.get("test_resource_limits"),
+                                             unit_testing=check_bool(self.config.get("unit_testing", "False"))
+                                             if unit_testing is None else unit_testing,
+                                             git_commit_per_phase=check_bool(self.config.get("git_commit_per_phase", "False")),
+                                             rollback_on_regression=check_bool(self.config.get("rollback_on_regression", "False")),
+                                             code_edit_format=self.config.get("code_edit_format", "whole"),
+                                             run_settle=float(self.config.get("run_settle", 1.0)))
         self.chat_env = ChatEnv(self.chat_env_config)
 
         # the user input prompt will be self-improved (if set "self_improve": "True" in ChatChainConfig.json)
@@ -113,6 +130,7 @@ class ChatChain:
         for employee in self.recruitments:
             self.chat_env.recruit(agent_name=employee)
 
+    @traced("ChatChain.execute_step")
     def execute_step(self, phase_item: dict):
         """
         execute single phase in the chain
@@ -125,6 +143,8 @@ class ChatChain:
 
         phase = phase_item['phase']
         phase_type = phase_item['phaseType']
+        current_span().set_attribute("phase", phase)
+        current_span().set_attribute("phase_type", phase_type)
         # For SimplePhase, just look it up from self.phases and conduct the "Phase.execute" method
         if phase_type == "SimplePhase":
             max_turn_step = phase_item['max_turn_step']
@@ -152,6 +172,8 @@ class ChatChain:
             self.chat_env = compose_phase_instance.execute(self.chat_env)
         else:
             raise RuntimeError(f"PhaseType '{phase_type}' is not yet implemented.")
+        if self.chat_env_config.git_commit_per_phase:
+            self.chat_env.commit_codes(phase)
 
     def execute_chain(self):
         """
@@ -203,6 +225,8 @@ class ChatChain:
                     print("{} Removed.".format(file_path))
         software_path = os.path.join(directory, "_".join([self.project_name, self.org_name, self.start_time]))
         self.chat_env.set_directory(software_path)
+        # the online log keeps the events of concurrent runs apart, a job of the server names the run itself
+        get_shipper().run_id = os.environ.get("AGILECODER_RUN_ID") or os.path.basename(software_path)
 
         # copy config files to software path
         shutil.copy(self.config_path, software_path)
@@ -213,6 +237,22 @@ class ChatChain:
         with open(os.path.join(software_path, self.project_name + ".prompt"), "w") as f:
             f.write(self.task_prompt_raw)
 
+        # the statistics of get_info are counted as the log is written
+        install_statistics(self.log_filepath)
+
+        # the online log keeps metrics of the events of the runs
+        if check_bool(self.config.get("metrics", "True")):
+            install_sink(ShipperSink())
+
+        # structured events of the run, as json lines next to the log
+        if check_bool(self.config.get("event_log", "False")):
+            install_event_log(self.log_filepath, level=logging.getLevelName(self.config.get("event_log_level", "INFO")))
+
+        # spans of the run, as a chrome trace or OTLP/JSON next to the log, for a sample of the runs
+        if check_bool(self.config.get("trace", "False")):
+            install_tracing(self.log_filepath, format=self.config.get("trace_format", "chrome"),
+                            sample_rate=float(self.config.get("trace_sample_rate", "1.0")))
+
         preprocess_msg = "**[Preprocessing]**\n\n"
         chat_gpt_config = ChatGPTConfig()
 
@@ -270,6 +310,7 @@ class ChatChain:
 
         log_and_print_online(post_info)
 
+        shutdown_tracing()
         logging.shutdown()
         time.sleep(1)
 
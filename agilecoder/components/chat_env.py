@@ -1,30 +1,58 @@
+import hashlib
+import json
 import os
 import re
 import shutil
-import signal
-import glob
 import subprocess
+import sys
 import time
-from typing import Dict
+from typing import Dict, List, Optional, Set
 
 import openai
 import requests
 
+from agilecoder.components.code_history import TestOutcome, Version
 from agilecoder.components.codes import Codes
 from agilecoder.components.documents import Documents
+from agilecoder.components.events import TestRun, emit
 from agilecoder.components.roster import Roster
+from agilecoder.components.runner import ResourceLimits, run_program
+from agilecoder.components.symbols import summarize
+from agilecoder.components.tracing import current_span, span, traced
+from agilecoder.components.unit_tests import is_unit_test_file, project_traceback, run_unit_tests
 from agilecoder.components.utils import log_and_print_online
 
+# outputs of the chain and of the runs, they do not change the result of a test run
+TEST_CACHE_IGNORED_DIRECTORIES = {'__pycache__', '.git', '.pytest_cache'}
+TEST_CACHE_IGNORED_FILES = {'meta.txt', 'manual.md'}
+
 
 class ChatEnvConfig:
     def __init__(self, clear_structure,
                  brainstorming,
                  gui_design,
-                 git_management):
+                 git_management,
+                 test_resource_limits=None,
+                 unit_testing=False,
+                 git_commit_per_phase=False,
+                 rollback_on_regression=False,
+                 code_edit_format="whole",
+                 run_settle=1.0):
         self.clear_structure = clear_structure
         self.brainstorming = brainstorming
         self.gui_design = gui_design
         self.git_management = git_management
+        self.test_resource_limits = ResourceLimits.from_dict(test_resource_limits)
+        # run generated test_*.py files as unit tests instead of as programs
+        self.unit_testing = unit_testing
+        # one git commit per phase of the chain instead of one per rewrite
+        self.git_commit_per_phase = git_commit_per_phase
+        # go back to the best tested codes when a modification made the tests worse
+        self.rollback_on_regression = rollback_on_regression
+        # "patch" when the modification phases answer with search/replace edits instead of whole files
+        self.code_edit_format = code_edit_format
+        # seconds a program is still observed once it reached its main loop, to catch the errors of its first frames
+        self.run_settle = run_settle
 
     def __str__(self):
         string = ""
@@ -32,23 +60,10 @@ class ChatEnvConfig:
         string += "ChatEnvConfig.brainstorming: {}\n".format(self.brainstorming)
         return string
 
-import ast
-
 def has_entry_point(code):
-    try:
-        tree = ast.parse(code)
-
-        # Check for if __name__ == "__main__": condition
-      
-        # Check for standalone code (no functions or classes)
-        for node in ast.iter_child_nodes(tree):
-            if not isinstance(node, (ast.Expr, ast.Import, ast.ImportFrom, ast.Module, ast.FunctionDef, ast.ClassDef)):
-                return True
+    return summarize(code).entry_point
 
-        return False
 
-    except SyntaxError:
-        return False
 class ChatEnv:
     def __init__(self, chat_env_config: ChatEnvConfig):
         self.config = chat_env_config
@@ -58,6 +73,15 @@ class ChatEnv:
         self.incorporated_images: Dict[str, str] = {}
         self.requirements: Documents = Documents()
         self.manuals: Documents = Documents()
+        # upper bound for observing a program that never reaches its main loop nor exits
+        self.run_timeout = 3.0
+        # resource usage of every test run: {"sprint", "command", "usage"}
+        self.test_runs: List[Dict] = []
+        # a test run is a regression when it uses this many times the resources of the previous sprint
+        self.regression_ratio = 1.5
+        # ((flag, report), unit test results) keyed by test_cache_key(), unchanged code is never re-executed
+        self.test_results: Dict[str, tuple] = {}
+        self.installed_modules: List[str] = []
         self.env_dict = {
             "directory": "",
             "task_prompt": "",
@@ -69,12 +93,12 @@ class ChatEnv:
             "test_reports": ""
         }
 
-    @staticmethod
-    def fix_module_not_found_error(test_reports):
-        if "ModuleNotFoundError" in test_reports:
-            for match in re.finditer(r"No module named '(\S+)'", test_reports, re.DOTALL):
-                module = match.group(1)
+    def fix_module_not_found_error(self, test_errors):
+        if test_errors.has("ModuleNotFoundError"):
+            for module in test_errors.missing_modules():
                 subprocess.Popen("pip3 install {}".format(module), shell=True).wait()
+                # the environment changed, cached test results must not be reused
+                self.installed_modules.append(module)
                 log_and_print_online("**[CMD Execute]**\n\n[CMD] pip3 install {}".format(module))
                 return module
 
@@ -98,7 +122,51 @@ class ChatEnv:
                 os.mkdir(self.env_dict['directory'])
         os.makedirs(os.path.join(self.env_dict['directory'], 'assets'), exist_ok = True)
 
+    def test_cache_key(self) -> str:
+        """hash of everything a test run depends on: the files of the software, commands and environment"""
+        directory = self.env_dict['directory']
+        hasher = hashlib.sha256()
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames[:] = sorted(dirname for dirname in dirnames if dirname not in TEST_CACHE_IGNORED_DIRECTORIES)
+            for filename in sorted(filenames):
+                if filename in TEST_CACHE_IGNORED_FILES or filename.endswith(('.pyc', '.log')):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                if filename.endswith('.py'):
+                    # files written by Codes are not read back unless they were modified since
+                    digest = self.codes.file_digest(name) if self.codes.directory == directory else None
+                    if digest is None:
+                        with open(path, 'rb') as f:
+                            digest = hashlib.sha256(f.read()).hexdigest()
+                    hasher.update("{}:{}\0".format(name, digest).encode('utf-8'))
+                else:
+                    stat = os.stat(path)
+                    hasher.update("{}:{}:{}\0".format(name, stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+        hasher.update(json.dumps(sorted(set(self.env_dict.get('commands', [])))).encode('utf-8'))
+        hasher.update(repr((sys.executable, os.environ.get('PYTHONPATH'), self.run_timeout, self.config.run_settle,
+                            self.config.unit_testing, self.config.test_resource_limits,
+                            self.installed_modules)).encode('utf-8'))
+        return hasher.hexdigest()
+
+    @traced("ChatEnv.exist_bugs")
     def exist_bugs(self) -> tuple[bool, str]:
+        try:
+            key = self.test_cache_key()
+        except OSError:
+            key = None
+        if key is not None and key in self.test_results:
+            current_span().set_attribute("cached", True)
+            log_and_print_online("**[Test Cache]**\n\nthe files of the software and the commands are unchanged, reuse the previous test report")
+            result, self.env_dict['unit_test_results'] = self.test_results[key]
+            return result
+        self.env_dict['unit_test_results'] = []
+        result = self._exist_bugs()
+        if key is not None:
+            self.test_results[key] = (result, self.env_dict['unit_test_results'])
+        return result
+
+    def _exist_bugs(self) -> tuple[bool, str]:
         directory = self.env_dict['directory']
         print('DIRECTORY:', directory)
 
@@ -117,7 +185,12 @@ class ChatEnv:
                 )
             else:
                 all_files = os.listdir(directory)
-                testing_commands = self.env_dict['commands']
+                testing_commands = list(self.env_dict['commands'])
+                unit_test_files = []
+                if self.config.unit_testing:
+                    unit_test_files = [file for file in all_files if file.endswith('.py') and is_unit_test_file(file)]
+                    all_files = [file for file in all_files if file not in unit_test_files]
+                    testing_commands = [command for command in testing_commands if not is_unit_test_file(command)]
                 return_flag = False
                 error_contents = ''
                 runnable_files = []
@@ -125,9 +198,7 @@ class ChatEnv:
                 for file in all_files:
                     if not file.endswith('.py'): continue
                     is_python = True
-                    with open(os.path.join(directory, file)) as f:
-                        code = f.read()
-                    if has_entry_point(code):
+                    if self.codes.file_symbols(file).entry_point:
                         runnable_files.append(file)
                 if is_python and len(runnable_files) == 0:
                     return True, "[Error] the software lacks an entry point to start"
@@ -139,78 +210,41 @@ class ChatEnv:
                         error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
                         return_flag = True
                         continue
-                    if 'main.py' in all_files and testing_command == 'main.py':
-                        command = "cd {}; ls -l; python3 main.py;".format(directory)
-                        # process = subprocess.Popen(command,
-                        #                     shell=True,
-                        #                     preexec_fn=os.setsid,
-                        #                     stdout=subprocess.PIPE,
-                        #                     stderr=subprocess.PIPE
-                        #                     )
-                    else:
-                        # flag = False
-                        # for file in all_files:
-                        #     if not file.endswith('.py'): continue
-                        #     with open(os.path.join(directory, file)) as f:
-                        #         code = f.read()
-                        #     if has_entry_point(code):
-                        #         command = "cd {}; ls -l; python3 ".format(directory) + file
-                        #         flag = True
-                        #         process = subprocess.Popen(command,
-                        #                         shell=True,
-                        #                         preexec_fn=os.setsid,
-                        #                         stdout=subprocess.PIPE,
-                        #                         stderr=subprocess.PIPE
-                        #                         )
-                        #         break
-                        command = "cd {}; ls -l; python3 ".format(directory) + testing_command
-                    print('COMMAND:', command)
-                    process = subprocess.Popen(command,
-                                    shell=True,
-                                    preexec_fn=os.setsid,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE
-                                    )
-                            # if len(process.stderr.read().decode('utf-8')) > 0: break
-                        # if not flag:
-                        #     return False, "Error: the software lacks the entry point to start"
-                    time.sleep(3)
-                    return_code = process.returncode
-                    # Check if the software is still running
-                    if process.poll() is None:
-                        if "killpg" in dir(os):
-                            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                        else:
-                            os.kill(process.pid, signal.SIGTERM)
-                            if process.poll() is None:
-                                os.kill(process.pid,signal.CTRL_BREAK_EVENT)
-
-                    # if return_code == 0:
-                    #     return False, success_info
-                    # else:
-                    #     error_output = process.stderr.read().decode('utf-8')
-                    #     if error_output:
-                    #         if "Traceback".lower() in error_output.lower():
-                    #             errs = error_output.replace(directory + "/", "")
-                    #             return True, errs
-                            
-                    #     else:
-                    #         return False, success_info
-                    error_output = process.stderr.read().decode('utf-8')
+                    print('COMMAND:', "python3 " + testing_command)
+                    # GUI programs never exit, they are run headlessly and stopped
+                    # as soon as the probe reports that the main loop was reached
+                    with span("run_program", command=testing_command):
+                        result = run_program(directory, testing_command, timeout=self.run_timeout,
+                                             settle=self.config.run_settle, limits=self.config.test_resource_limits)
+                    self.record_test_run(testing_command, result.usage)
+                    # the same rules as the error report below, only a traceback or a resource limit is a bug
+                    passed = result.limit_exceeded is None and "traceback" not in result.stderr.lower()
+                    emit(TestRun(testing_command, passed, result.duration, result.returncode))
+                    if result.limit_exceeded is not None:
+                        errs = "[Error] the software was stopped because it exceeded the resource limit {}".format(result.limit_exceeded)
+                        error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
+                        return_flag = True
+                    error_output = result.stderr
                     if error_output:
-                        if return_code != 0:
-                            if "Traceback".lower() in error_output.lower():
-                                errs = error_output.replace(directory + "/", "")
-                                # return True, errs
-                                error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
-                                return_flag = True
-                                
-                            # else:
-                            #     return False, success_info
-                        else:
-                            if 'error' in error_output.lower():
-                                return_flag = True
-                                error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
+                        errs = error_output.replace(directory + "/", "")
+                        if "Traceback".lower() in error_output.lower():
+                            error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
+                            return_flag = True
+
+                if len(unit_test_files):
+                    with span("run_unit_tests", files=len(unit_test_files)):
+                        unit_test_results = run_unit_tests(directory, unit_test_files, limits=self.config.test_resource_limits)
+                    self.env_dict['unit_test_results'] = unit_test_results
+                    log_and_print_online("**[Unit Test Results]**\n\n" + "\n".join(
+                        "{}::{} {} ({:.3f}s)".format(result.file, result.name, result.outcome, result.duration)
+                        for result in unit_test_results))
+                    for result in unit_test_results:
+                        emit(TestRun(result.file + "::" + result.name, result.ok, result.duration))
+                        if result.ok:
+                            continue
+                        errs = project_traceback(result.message, directory)
+                        error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = result.file + "::" + result.name, errs = errs)
+                        return_flag = True
 
                 if return_flag:
                     return return_flag, error_contents
@@ -223,6 +257,25 @@ class ChatEnv:
 
         return False, success_info
 
+    def record_test_run(self, command, usage):
+        sprint = self.env_dict.get('num-sprints', 0)
+        previous = [run for run in self.test_runs if run['command'] == command and run['sprint'] < sprint]
+        self.test_runs.append({"sprint": sprint, "command": command, "usage": usage})
+        log_and_print_online("**[Test Resource Usage]**\n\ncommand: {}\n{}".format(command, usage.to_log()))
+
+        if len(previous) == 0:
+            return
+        baseline = previous[-1]['usage']
+        regressions = []
+        # small absolute floors keep noise from short runs out of the report
+        for key, floor in [("user_time", 0.2), ("peak_rss_kb", 10240), ("bytes_written", 1024 * 1024)]:
+            old_value, new_value = getattr(baseline, key), getattr(usage, key)
+            if new_value > floor and new_value > old_value * self.regression_ratio:
+                regressions.append("{}: {} -> {}".format(key, old_value, new_value))
+        if len(regressions):
+            log_and_print_online("**[Performance Regression]**\n\ncommand: {} (sprint {} vs sprint {})\n{}".format(
+                command, sprint, previous[-1]['sprint'], "\n".join(regressions)))
+
     def recruit(self, agent_name: str):
         self.roster._recruit(agent_name)
 
@@ -235,14 +288,48 @@ class ChatEnv:
     def update_codes(self, generated_content):
        return self.codes._update_codes(generated_content)
 
-    def rewrite_codes(self) -> None:
-        self.codes._rewrite_codes(self.config.git_management)
+    def rewrite_codes(self) -> Set[str]:
+        """write the changed source files to the software directory and return their names"""
+        self.codes._rewrite_codes(self.config.git_management, commit=not self.config.git_commit_per_phase)
+        return self.codes.changed_files
+
+    def record_test_outcome(self, exist_bugs_flag, test_errors) -> None:
+        """tag the codes as last written with the result of testing them"""
+        self.codes.history.tag(TestOutcome(passed=not exist_bugs_flag, num_errors=len(test_errors)))
+
+    def roll_back_codes(self, since=0) -> Optional[Version]:
+        """
+        restore and rewrite the best tested codes when the latest tested codes are worse
+        Args:
+            since: number of the first version that may be restored, the older ones belong to earlier work
+        Returns:
+            the version rolled back to, None when the latest codes are kept
+        """
+        history = self.codes.history
+        best = history.best(since)
+        outcome = history.outcomes.get(history.head.number) if history.head is not None else None
+        if best is None or outcome is None or not history.outcomes[best.number].better_than(outcome):
+            return None
+        self.codes._roll_back(best)
+        self.rewrite_codes()
+        return best
+
+    def commit_codes(self, message) -> None:
+        """commit the rewrites staged since the last commit, used when commits are batched per phase"""
+        if self.config.git_management:
+            self.codes._commit_codes(message)
+
+    def get_classes(self) -> Dict[str, List[str]]:
+        """classes defined by each python file of the software directory"""
+        directory = self.env_dict['directory']
+        return {filename: self.codes.file_symbols(filename).classes
+                for filename in sorted(os.listdir(directory)) if filename.endswith('.py')}
 
-    def get_codes(self) -> str:
-        return self.codes._get_codes()
+    def get_codes(self, filenames=None) -> str:
+        return self.codes._get_codes(filenames)
 
-    def _load_from_hardware(self, directory) -> None:
-        self.codes._load_from_hardware(directory)
+    def _load_from_hardware(self, directory, **options) -> None:
+        self.codes._load_from_hardware(directory, **options)
 
     def _update_requirements(self, generated_content):
         self.requirements._update_docs(generated_content)
@@ -289,8 +376,8 @@ class ChatEnv:
                 f.write(r.content)
                 print("{} Downloaded".format(filepath))
         flag = False
+        joined_codes = self.get_codes()
         for regex in [r"(\w+.png)", r"(\w+.gif)"]:
-            joined_codes = self.get_codes()
             matches = re.finditer(regex, joined_codes, re.DOTALL)
             # matched_images = {}
 
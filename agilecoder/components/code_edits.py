@@ -0,0 +1,212 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from agilecoder.components.similarity import normalized_similarity
+
+SEARCH_PATTERN = re.compile(r"^<{5,9} ?SEARCH\b")
+DIVIDER_PATTERN = re.compile(r"^={5,9}\s*$")
+REPLACE_PATTERN = re.compile(r"^>{5,9} ?REPLACE\b")
+FILENAME_PATTERN = re.compile(r"([\w\-./]+\.\w+)")
+HUNK_PATTERN = re.compile(r"^@@ .* @@")
+# minimum similarity of a window of the code to a search block that does not match exactly
+FUZZY_THRESHOLD = 0.85
+
+
+@dataclass
+class Edit:
+    filename: str
+    # lines to find, empty to create the file or append to it
+    search: List[str]
+    replace: List[str]
+
+
+@dataclass
+class EditResult:
+    edit: Edit
+    applied: bool
+    # exact, whitespace, blank lines, fuzzy, created or appended when applied, else the reason of the conflict
+    detail: str
+
+
+def _filename_of(line):
+    line = line.strip().strip("*`#:").strip()
+    if line.startswith("FILENAME"):
+        line = line[len("FILENAME"):].strip(" :")
+    match = FILENAME_PATTERN.fullmatch(line)
+    return match.group(1) if match else None
+
+
+def _diff_path(line):
+    path = line[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith(("a/", "b/")) else path
+
+
+def parse_edits(content) -> Tuple[List[Edit], str]:
+    """
+    extract search/replace blocks and unified diff hunks from a response
+    Returns:
+        the edits in order and the response without them, for the parsing of whole files
+    """
+    edits = []
+    remaining = []
+    lines = content.split("\n")
+    filename = None
+    # position in remaining of the code block being read, which is dropped when only edits were in it
+    fence_start = None
+    edits_before = 0
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if SEARCH_PATTERN.match(line.strip()):
+            search, replace = [], []
+            i += 1
+            while i < len(lines) and not DIVIDER_PATTERN.match(lines[i].strip()):
+                search.append(lines[i])
+                i += 1
+            i += 1
+            while i < len(lines) and not REPLACE_PATTERN.match(lines[i].strip()):
+                replace.append(lines[i])
+                i += 1
+            edits.append(Edit(filename or "", search, replace))
+            i += 1
+            continue
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path, new_path = _diff_path(line), _diff_path(lines[i + 1])
+            i += 2
+            while i < len(lines) and HUNK_PATTERN.match(lines[i]):
+                search, replace = [], []
+                i += 1
+                while i < len(lines) and lines[i][:1] in (" ", "-", "+", "") and not lines[i].startswith(("--- ", "+++ ")):
+                    if lines[i] == "" and (i + 1 == len(lines) or lines[i + 1][:1] not in (" ", "-", "+")):
+                        break
+                    tag, text = lines[i][:1], lines[i][1:]
+                    if tag in (" ", "-", ""):
+                        search.append(text)
+                    if tag in (" ", "+", ""):
+                        replace.append(text)
+                    i += 1
+                if new_path is not None:
+                    edits.append(Edit(new_path, search if old_path is not None else [], replace))
+            continue
+        if line.startswith("```"):
+            if fence_start is None:
+                fence_start, edits_before = len(remaining), len(edits)
+            else:
+                start, fence_start = fence_start, None
+                if len(edits) > edits_before and all(len(rest.strip()) == 0 for rest in remaining[start + 1:]):
+                    del remaining[start:]
+                    i += 1
+                    continue
+        elif fence_start is None:
+            # the file of the following edits is named on its own line outside the code blocks
+            candidate = _filename_of(line)
+            if candidate is not None:
+                filename = candidate
+        remaining.append(line)
+        i += 1
+    return edits, "\n".join(remaining)
+
+
+def _blank_edges(lines):
+    """numbers of the blank lines at the start and at the end of lines"""
+    blank = [len(line.strip()) == 0 for line in lines]
+    if all(blank):
+        return len(lines), 0
+    return blank.index(False), blank[::-1].index(False)
+
+
+def _trim(lines, leading, trailing):
+    """lines without up to leading blank lines at the start and trailing ones at the end"""
+    first, last = _blank_edges(lines)
+    return lines[min(first, leading):len(lines) - min(last, trailing)]
+
+
+def _indent(line):
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _find(code, search, key):
+    keys = [key(line) for line in code]
+    wanted = [key(line) for line in search]
+    return [i for i in range(len(code) - len(search) + 1) if keys[i:i + len(search)] == wanted]
+
+
+def _find_ignoring_blank(code, search):
+    # the ranges of code whose lines other than the blank ones are the ones of search
+    kept = [i for i, line in enumerate(code) if len(line.strip()) > 0]
+    keys = [code[i].strip() for i in kept]
+    wanted = [line.strip() for line in search if len(line.strip()) > 0]
+    return [(kept[j], kept[j + len(wanted) - 1] + 1) for j in range(len(kept) - len(wanted) + 1)
+            if keys[j:j + len(wanted)] == wanted]
+
+
+def _reindent(replace, search_first, code_first):
+    # the search block matched with a different indentation, shift the replacement the same way
+    old, new = _indent(search_first), _indent(code_first)
+    return [new + line[len(old):] if line.startswith(old) else line for line in replace]
+
+
+def locate(code: List[str], search: List[str]) -> Tuple[Optional[int], List[str], str]:
+    """
+    find where search occurs in code
+    Returns:
+        (start line or None, the search lines as they are in the code, how it was found or why not)
+    """
+    for name, key in [("exact", lambda line: line), ("whitespace", lambda line: line.strip())]:
+        positions = _find(code, search, key)
+        if len(positions) == 1:
+            return positions[0], code[positions[0]:positions[0] + len(search)], name
+        if len(positions) > 1:
+            return None, [], "search block matches {} places".format(len(positions))
+    ranges = _find_ignoring_blank(code, search)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return start, code[start:end], "blank lines"
+    if len(ranges) > 1:
+        return None, [], "search block matches {} places".format(len(ranges))
+    text = "\n".join(line.strip() for line in search)
+    scores = []
+    for size in {max(1, len(search) - 1), len(search), len(search) + 1}:
+        for i in range(len(code) - size + 1):
+            window = "\n".join(line.strip() for line in code[i:i + size])
+            # the similarity cannot exceed the ratio of the lengths
+            if min(len(window), len(text)) < FUZZY_THRESHOLD * max(len(window), len(text)):
+                continue
+            scores.append((normalized_similarity(text, window), i, size))
+    scores.sort(key=lambda score: -score[0])
+    if len(scores) == 0 or scores[0][0] < FUZZY_THRESHOLD:
+        return None, [], "search block not found"
+    best, start, size = scores[0]
+    # another window as good but not overlapping makes the anchor ambiguous
+    if any(score == best and abs(i - start) >= size for score, i, _ in scores[1:]):
+        return None, [], "search block matches several places"
+    return start, code[start:start + size], "fuzzy"
+
+
+def apply_edit(code: Optional[str], edit: Edit) -> Tuple[Optional[str], str]:
+    """
+    apply one edit to the content of a file, None when the file does not exist yet
+    Returns:
+        (new content or None on conflict, detail)
+    """
+    # the blank lines around a search block are not anchors, as many are dropped around its replacement
+    leading, trailing = _blank_edges(edit.search)
+    search, replace = _trim(edit.search, leading, trailing), _trim(edit.replace, leading, trailing)
+    if edit.filename == "":
+        return None, "no file name before the edit"
+    if code is None:
+        if len(search) > 0:
+            return None, "file does not exist"
+        return "\n".join(replace), "created"
+    lines = code.split("\n")
+    if len(search) == 0:
+        return "\n".join(lines + replace), "appended"
+    start, matched, detail = locate(lines, search)
+    if start is None:
+        return None, detail
+    if detail != "exact":
+        replace = _reindent(replace, search[0], matched[0])
+    return "\n".join(lines[:start] + replace + lines[start + len(matched):]), detail
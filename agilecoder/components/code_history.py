@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class TestOutcome:
+    passed: bool
+    num_errors: int = 0
+
+    def better_than(self, other: "TestOutcome") -> bool:
+        return (self.passed, -self.num_errors) > (other.passed, -other.num_errors)
+
+
+@dataclass(frozen=True)
+class Version:
+    """
+    an immutable snapshot of the codes, stored as the files changed since the previous version,
+    contents are shared with the Codes and the other versions instead of being copied
+    """
+    number: int
+    # filename -> (content before, content after), None when the file does not exist
+    changes: Mapping[str, Tuple[Optional[str], Optional[str]]]
+    label: str = ""
+
+
+class CodeHistory:
+    """
+    linear history of the codes, memory grows with the changed files of each version,
+    not with the number of versions times the size of the project
+    """
+
+    def __init__(self):
+        self.versions: List[Version] = []
+        self.head: Optional[Version] = None
+        # version number -> outcome of the tests run on it
+        self.outcomes: Dict[int, TestOutcome] = {}
+        self.pending: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def record(self, filename, old: Optional[str], new: Optional[str]):
+        """a file changed, it becomes part of the next version"""
+        if filename in self.pending:
+            old = self.pending[filename][0]
+        if old is new or old == new:
+            self.pending.pop(filename, None)
+        else:
+            self.pending[filename] = (old, new)
+
+    def commit(self, label="") -> Optional[Version]:
+        """turn the pending changes into a new version, None when nothing changed"""
+        if len(self.pending) == 0:
+            return None
+        self.head = Version(len(self.versions), MappingProxyType(self.pending), label)
+        self.versions.append(self.head)
+        self.pending = {}
+        return self.head
+
+    def tag(self, outcome: TestOutcome, version: Optional[Version] = None):
+        """attach the test outcome to a version, the head by default"""
+        version = version or self.head
+        if version is not None:
+            self.outcomes[version.number] = outcome
+
+    def best(self, since=0) -> Optional[Version]:
+        """
+        the tested version with the best outcome, the latest one among equals
+        Args:
+            since: only the versions from this number on are candidates
+        """
+        best = None
+        for number, outcome in sorted(self.outcomes.items()):
+            if number < since:
+                continue
+            if best is None or not self.outcomes[best].better_than(outcome):
+                best = number
+        return None if best is None else self.versions[best]
+
+    def restore(self, target: Version) -> Dict[str, Optional[str]]:
+        """
+        the contents to assign so that the codes are back to target
+        Returns:
+            filename -> content at target, None for the files that did not exist then
+        """
+        contents: Dict[str, Optional[str]] = {}
+        changes = [(filename, old) for filename, (old, _) in self.pending.items()]
+        # walk back from the head, the content before the oldest change after target is the content at target
+        for version in reversed(self.versions[target.number + 1:]):
+            changes.extend((filename, old) for filename, (old, _) in version.changes.items())
+        for filename, old in changes:
+            contents[filename] = old
+        return contents
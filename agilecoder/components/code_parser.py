@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Optional
+
+FENCE = "```"
+
+
+@dataclass
+class CodeBlock:
+    # text between the end of the previous block (or the start of the response) and the opening fence
+    header: str
+    language: str
+    body: str
+    closed: bool = True
+
+    @cached_property
+    def header_line(self) -> Optional[str]:
+        """the line right above the opening fence, None when the fence starts the response"""
+        if not self.header.endswith("\n"):
+            return None
+        return self.header[:-1].rsplit("\n", 1)[-1]
+
+
+class CodeBlockParser:
+    """
+    incremental tokenizer that splits an LLM response into fenced code blocks in a single pass
+    a block opens with a line starting with ``` and ends at the next ```, the text in between
+    blocks is kept as the header of the following block so that every file name layout
+    ("FILENAME", "FILENAME: x.py", bare "x.py" lines) can be resolved without rescanning
+    """
+
+    def __init__(self):
+        self.blocks: List[CodeBlock] = []
+        self._pending = ""
+        self._header: List[str] = []
+        self._language: Optional[str] = None
+        self._body: List[str] = []
+
+    @property
+    def in_block(self):
+        return self._language is not None
+
+    def feed(self, chunk: str) -> List[CodeBlock]:
+        """
+        consume the next chunk of the response
+        Returns:
+            blocks completed by this chunk
+        """
+        count = len(self.blocks)
+        text = self._pending + chunk
+        end = text.rfind("\n") + 1
+        self._pending = text[end:]
+        self._scan(text[:end])
+        return self.blocks[count:]
+
+    def close(self) -> List[CodeBlock]:
+        """flush the last line, a block without closing fence is kept with closed=False"""
+        count = len(self.blocks)
+        self._scan(self._pending)
+        self._pending = ""
+        if self.in_block:
+            self.blocks.append(CodeBlock("".join(self._header), self._language, "".join(self._body), closed=False))
+            self._language = None
+            self._header = []
+        return self.blocks[count:]
+
+    def _scan(self, text):
+        # text always starts at the beginning of a line
+        position = 0
+        while position < len(text):
+            if self.in_block:
+                end = text.find(FENCE, position)
+                if end == -1:
+                    self._body.append(text[position:])
+                    return
+                self._body.append(text[position:end])
+                self.blocks.append(CodeBlock("".join(self._header), self._language, "".join(self._body)))
+                self._language = None
+                self._header = []
+                position = end + len(FENCE)
+                continue
+            if text.startswith(FENCE, position) and (position == 0 or text[position - 1] == "\n"):
+                start = position
+            else:
+                start = text.find("\n" + FENCE, position)
+                start = start + 1 if start != -1 else -1
+            # the fence line has to be complete to know the language
+            end_of_line = text.find("\n", start) if start != -1 else -1
+            if end_of_line == -1:
+                self._header.append(text[position:])
+                return
+            self._header.append(text[position:start])
+            self._language = text[start + len(FENCE):end_of_line]
+            self._body = []
+            position = end_of_line + 1
+
+
+def parse_code_blocks(content: str) -> List[CodeBlock]:
+    parser = CodeBlockParser()
+    parser.feed(content)
+    parser.close()
+    return parser.blocks
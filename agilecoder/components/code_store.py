@@ -0,0 +1,158 @@
+import fnmatch
+import os
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# directories that never hold source code of the software
+IGNORED_DIRECTORIES = {".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "env", "node_modules", ".tox",
+                       ".mypy_cache", ".pytest_cache", ".idea", ".vscode", "build", "dist", "site-packages"}
+MAX_FILE_SIZE = 256 * 1024
+CACHE_BYTES = 16 * 1024 * 1024
+
+
+def read_ignore_patterns(root) -> List[str]:
+    """patterns of the .gitignore at the root of the project, negations are not supported and skipped"""
+    path = os.path.join(root, ".gitignore")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = [line.strip() for line in f]
+    return [line.rstrip("/") for line in lines if line and not line.startswith(("#", "!"))]
+
+
+class CodeStore(MutableMapping):
+    """
+    the source files under root as a mapping from their relative path to their content, like Codes.codebooks
+    only the paths, sizes and modification times are kept after the scan, contents are read on first
+    access and kept in a cache bounded by cache_bytes, which is invalidated by the modification time
+    assigned contents stay in memory until mark_written is called once they are saved
+    """
+
+    def __init__(self, root, extensions=(".py",), ignore: Optional[List[str]] = None,
+                 max_file_size=MAX_FILE_SIZE, max_files: Optional[int] = None, cache_bytes=CACHE_BYTES,
+                 formatter: Optional[Callable[[str], str]] = None):
+        self.root = root
+        self.extensions = tuple(extensions)
+        self.ignore = read_ignore_patterns(root) if ignore is None else list(ignore)
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.cache_bytes = cache_bytes
+        self.formatter = formatter
+        # path -> (size, mtime_ns) of the files on disk
+        self.entries: Dict[str, Tuple[int, int]] = {}
+        # path -> reason, for the files left out by the size limits
+        self.skipped: Dict[str, str] = {}
+        self.modified: Dict[str, str] = {}
+        self.deleted: Set[str] = set()
+        self._cache: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._cached_bytes = 0
+        self.scan()
+
+    def _ignored(self, path, name):
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern) for pattern in self.ignore)
+
+    def scan(self):
+        """list the source files under root, without reading them"""
+        self.entries, self.skipped = {}, {}
+        pending = deque([""])
+        while pending:
+            prefix = pending.popleft()
+            try:
+                iterator = os.scandir(os.path.join(self.root, prefix))
+            except OSError:
+                continue
+            with iterator:
+                for entry in sorted(iterator, key=lambda entry: entry.name):
+                    path = prefix + entry.name
+                    if self._ignored(path, entry.name):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRECTORIES and not entry.name.endswith(".egg-info"):
+                            pending.append(path + "/")
+                        continue
+                    if not entry.name.endswith(self.extensions) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if stat.st_size > self.max_file_size:
+                        self.skipped[path] = "larger than {} bytes".format(self.max_file_size)
+                    elif self.max_files is not None and len(self.entries) >= self.max_files:
+                        self.skipped[path] = "more than {} files".format(self.max_files)
+                    else:
+                        self.entries[path] = (stat.st_size, stat.st_mtime_ns)
+
+    def _read(self, path):
+        filepath = os.path.join(self.root, path)
+        stat = os.stat(filepath)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns:
+            self._cache.move_to_end(path)
+            return cached[1]
+        with open(filepath, encoding="utf-8", errors="replace") as f:
+            content = f.read()
+        if self.formatter is not None:
+            content = self.formatter(content)
+        self.entries[path] = (stat.st_size, stat.st_mtime_ns)
+        self._cache_put(path, stat.st_mtime_ns, content)
+        return content
+
+    def _cache_put(self, path, mtime_ns, content):
+        self._cache_drop(path)
+        self._cache[path] = (mtime_ns, content)
+        self._cached_bytes += len(content)
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, (_, evicted) = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    def _cache_drop(self, path):
+        cached = self._cache.pop(path, None)
+        if cached is not None:
+            self._cached_bytes -= len(cached[1])
+
+    def __getitem__(self, path):
+        if path in self.modified:
+            return self.modified[path]
+        if path in self.deleted or path not in self.entries:
+            raise KeyError(path)
+        try:
+            return self._read(path)
+        except FileNotFoundError:
+            raise KeyError(path) from None
+
+    def __setitem__(self, path, content):
+        self.deleted.discard(path)
+        self.modified[path] = content
+
+    def __delitem__(self, path):
+        if path not in self:
+            raise KeyError(path)
+        self.modified.pop(path, None)
+        self._cache_drop(path)
+        if path in self.entries:
+            self.deleted.add(path)
+
+    def __contains__(self, path):
+        return path in self.modified or (path in self.entries and path not in self.deleted)
+
+    def __iter__(self):
+        for path in self.entries:
+            if path not in self.deleted:
+                yield path
+        for path in self.modified:
+            if path not in self.entries:
+                yield path
+
+    def __len__(self):
+        return len(self.entries) - len(self.deleted) + sum(1 for path in self.modified if path not in self.entries)
+
+    def mark_written(self, path, directory=None):
+        """the assigned content of path was saved, under root unless directory is given, and can leave memory"""
+        if directory is not None and os.path.abspath(directory) != os.path.abspath(self.root):
+            return
+        content = self.modified.pop(path, None)
+        if content is None:
+            return
+        stat = os.stat(os.path.join(self.root, path))
+        self.entries[path] = (stat.st_size, stat.st_mtime_ns)
+        # the file holds exactly this content, keep it cached for the prompts that follow
+        self._cache_put(path, stat.st_mtime_ns, content)
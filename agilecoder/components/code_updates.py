@@ -0,0 +1,89 @@
+import difflib
+import json
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from agilecoder.online_log.app import send_msg
+from agilecoder.online_log.shipper import get_shipper
+
+# above this many changed lines only the summary is kept, the diff would be bigger than it is useful
+MAX_DIFF_LINES = 200
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agilecoder-diff")
+        return _executor
+
+
+@dataclass
+class CodeUpdate:
+    """
+    a change of one code file, the line counts are computed right away from line multisets,
+    the unified diff only on demand and never for more than max_diff_lines changed lines
+    """
+    filename: str
+    old: Optional[str]
+    new: str
+    max_diff_lines: int = MAX_DIFF_LINES
+    added: int = field(init=False)
+    removed: int = field(init=False)
+    _future: Optional[Future] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        old_lines = Counter(self.old.splitlines()) if self.old is not None else Counter()
+        new_lines = Counter(self.new.splitlines())
+        self.added = sum((new_lines - old_lines).values())
+        self.removed = sum((old_lines - new_lines).values())
+
+    @property
+    def truncated(self):
+        return self.added + self.removed > self.max_diff_lines
+
+    def to_dict(self):
+        return {"event": "code_update", "file": self.filename, "created": self.old is None,
+                "old_lines": 0 if self.old is None else self.old.count("\n") + 1,
+                "new_lines": self.new.count("\n") + 1, "added": self.added, "removed": self.removed}
+
+    def to_log(self):
+        return "**[Update Codes]**\n\n" + json.dumps(self.to_dict())
+
+    def _compute_diff(self):
+        if self.truncated:
+            return None
+        lines_old = self.old.splitlines() if self.old is not None else []
+        return "\n".join(difflib.unified_diff(lines_old, self.new.splitlines(), lineterm='', fromfile='Old', tofile='New'))
+
+    def prefetch(self):
+        """start computing the diff on the background thread"""
+        if self._future is None:
+            self._future = _get_executor().submit(self._compute_diff)
+        return self._future
+
+    def diff(self) -> Optional[str]:
+        """unified diff of the update, None when more lines changed than max_diff_lines"""
+        return self.prefetch().result()
+
+    def publish(self):
+        """send the update with its diff to the online log from the background thread"""
+        # the message would be dropped, diff() still computes the diff for a caller that asks for it
+        if not get_shipper().accepting:
+            return
+        def send():
+            diff = self.diff()
+            content = "{} updated: +{} -{} lines".format(self.filename, self.added, self.removed)
+            if diff is None:
+                content += ", diff omitted"
+            else:
+                content += "\n\n```\n" + diff + "\n```"
+            send_msg("System", "**[Update Codes]**\n\n" + content)
+        self.prefetch()
+        _get_executor().submit(send)
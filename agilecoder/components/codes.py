@@ -1,8 +1,22 @@
+import hashlib
+import logging
 import os
 import re
-from strsimpy.normalized_levenshtein import NormalizedLevenshtein
+import tempfile
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from agilecoder.components.code_edits import EditResult, apply_edit, parse_edits
+from agilecoder.components.code_history import CodeHistory, Version
+from agilecoder.components.code_parser import parse_code_blocks
+from agilecoder.components.code_store import CodeStore
+from agilecoder.components.code_updates import CodeUpdate
+from agilecoder.components.events import CodesUpdated, emit
+from agilecoder.components.similarity import best_match
+from agilecoder.components.symbols import FileSymbols, SymbolIndex
+from agilecoder.components.tracing import span, traced
+from agilecoder.components.unit_tests import is_unit_test_file
 from agilecoder.components.utils import log_and_print_online
-import difflib
+from agilecoder.components.versioning import GitRepository
 import ast
 def is_valid_syntax(code):
     try:
@@ -10,36 +24,41 @@ def is_valid_syntax(code):
         return True
     except SyntaxError:
         return False
-def extract_files(code_string):
-    """Extracts code and names for each file from the given string."""
+def content_digest(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+def atomic_write(filepath, content):
+    """write to a temporary file next to filepath and move it into place, readers never see a partial file"""
+    directory = os.path.dirname(filepath)
+    os.makedirs(directory, exist_ok=True)
+    mode = os.stat(filepath).st_mode & 0o777 if os.path.exists(filepath) else 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as writer:
+            writer.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+def extract_files(blocks):
+    """Extracts code and names for each file from code blocks headed by a "FILENAME: name" line."""
 
     files = {}
-    current_file = None
-    current_code = ""
-    flag = False
-    flag1 = False
-    for line in code_string.splitlines():
-    # Check for file header lines
-        if line.startswith('FILENAME:'):
-            if current_file:
-                files[current_file] = current_code
-            current_file = line.split()[1].strip()
-            current_code = ""
-            flag1 = True
-        elif line.startswith('DOCSTRING') or line.startswith('CODE'): continue
-        elif line.startswith('```'): 
-            if flag:
-                flag1 = False
-            flag = not flag
-            # continue
-        elif not line.startswith('LANGUAGE'):
-            if flag1:
-                current_code += line + "\n"
-
-  # Add the last file
-    if current_file and not flag:
-        files[current_file] = current_code
-
+    for block in blocks:
+        lines = block.header.split("\n")[:-1]
+        starts = [i for i, line in enumerate(lines) if line.startswith('FILENAME:')]
+        if len(starts) == 0:
+            continue
+        names = lines[starts[-1]][len('FILENAME:'):].split()
+        if len(names) == 0:
+            continue
+        # text between the header and the fence counts as code, LANGUAGE/DOCSTRING/CODE labels do not
+        code_lines = lines[starts[-1] + 1:] + block.body.split("\n")
+        if code_lines[-1] == "":
+            code_lines.pop()
+        files[names[0]] = "".join(line + "\n" for line in code_lines
+                                  if not line.startswith(('LANGUAGE', 'DOCSTRING', 'CODE')))
     return files
 class Codes:
     def __init__(self, generated_content=""):
@@ -47,6 +66,16 @@ class Codes:
         self.version: float = 1.0
         self.generated_content: str = generated_content
         self.codebooks = {}
+        # filename -> (digest, size, mtime_ns) of the content on disk, and the files written by the last rewrite
+        self.written_files: Dict[str, Tuple[str, int, int]] = {}
+        self.changed_files: Set[str] = set()
+        self.repository: Optional[GitRepository] = None
+        self._segments: Dict[str, Tuple[str, str]] = {}
+        self._view: Tuple[tuple, str] = ((), "")
+        self.updates: Deque[CodeUpdate] = deque(maxlen=100)
+        self.edit_results: List[EditResult] = []
+        self.symbols = SymbolIndex()
+        self.history = CodeHistory()
 
         def extract_filename_from_line(lines):
             file_name = ""
@@ -69,13 +98,15 @@ class Codes:
             return file_name
 
         if generated_content != "":
-            regex = r"FILENAME\n```.*?\n(.*?)```"
-            matches = re.finditer(regex, self.generated_content, re.DOTALL)
+            # tokenize the response once, then try the supported layouts in order of preference
+            blocks = [block for block in parse_code_blocks(self.generated_content) if block.closed]
             unmatched_codes = []
             flag = False
-            for match in matches:
+            for block in blocks:
+                if block.header_line is None or not block.header_line.endswith("FILENAME"):
+                    continue
                 flag = True
-                code = match.group(1)
+                code = block.body
                 if "CODE" in code:
                     continue
                 if "__main__" in code or 'main.py' in code:
@@ -86,24 +117,19 @@ class Codes:
                     self.codebooks[filename] = self._format_code(code)
                 else:
                     unmatched_codes.append(self._format_code(code))
-            normalized_levenshtein = NormalizedLevenshtein()
             for code in unmatched_codes:
-                scores = []
-                for filename, file_code in self.codebooks.items():
-                    scores.append((filename, code, normalized_levenshtein.similarity(code, file_code)))
-                if len(scores) > 0:
-                    scores = sorted(scores, key = lambda x: x[2], reverse = True)[0]
-                    if scores[2] > 0.7:
-                        self.codebooks[scores[0]] = scores[1]
+                match = best_match(code, self.codebooks, threshold=0.7)
+                if match is not None:
+                    self.codebooks[match[0]] = code
             
             if not flag:
-                regex = r"FILENAME: ([a-z_0-9]+\.\w+)\n```.*?\n(.*?)```"
-                matches = re.finditer(regex, self.generated_content, re.DOTALL)
-                
-                for match in matches:
+                for block in blocks:
+                    match = re.search(r"FILENAME: ([a-z_0-9]+\.\w+)$", block.header_line or "")
+                    if match is None:
+                        continue
                     flag = True
                     filename = match.group(1)
-                    code = match.group(2)
+                    code = block.body
                     if "CODE" in code:
                         continue
                     if filename is not None and code is not None and len(filename) > 0 and len(code) > 0:
@@ -114,18 +140,18 @@ class Codes:
                             self.codebooks[filename] = self._format_code(code)
                     
             if not flag:
-                regex = r"(.+?\.\w+)\n```.*?\n(.*?)```"
-                matches = re.finditer(regex, self.generated_content, re.DOTALL)
-                flag = False
-                for match in matches:
-                    code = match.group(2)
+                for block in blocks:
+                    # the text since the previous block has to end with a file name
+                    if block.header_line is None or not re.fullmatch(r".+?\.\w+", block.header[:-1], re.DOTALL):
+                        continue
+                    code = block.body
                     if "CODE" in code:
                         continue
                     flag = True
-                    group1 = match.group(1)
+                    group1 = block.header[:-1]
                     filename = extract_filename_from_line(group1)
                     old_filename = None
-                    if "__main__" in code or 'main.py' in code:
+                    if ("__main__" in code or 'main.py' in code) and not is_unit_test_file(filename):
                         new_filename = "main.py"
                         if new_filename != filename:
                             old_filename = filename
@@ -134,15 +160,10 @@ class Codes:
                         filename = extract_filename_from_code(code)
                     # assert filename != ""
                     if filename == '.py':
-                        scores = []
-                        normalized_levenshtein = NormalizedLevenshtein()
                         formatted_code = self._format_code(code)
-                        for _filename, file_code in self.codebooks.items():
-                            scores.append((_filename, formatted_code, normalized_levenshtein.similarity(formatted_code, file_code)))
-                        if len(scores) > 0:
-                            scores = sorted(scores, key = lambda x: x[2], reverse = True)[0]
-                            if scores[2] > 0.7:
-                                self.codebooks[scores[0]] = scores[1]
+                        match = best_match(formatted_code, self.codebooks, threshold=0.7)
+                        if match is not None:
+                            self.codebooks[match[0]] = formatted_code
                     elif filename is not None and code is not None and len(filename) > 0 and len(code) > 0:
                         if filename.endswith('.py'):
                             if is_valid_syntax(code):
@@ -153,7 +174,7 @@ class Codes:
                             self.codebooks[filename] = self._format_code(code)
 
             if not flag:
-                file_codes = extract_files(self.generated_content)
+                file_codes = extract_files(blocks)
                 for filename, filecode in file_codes.items():
                     if filename.endswith('.py'):
                         if is_valid_syntax(filecode):
@@ -169,69 +190,189 @@ class Codes:
         code = "\n".join([line for line in code.split("\n") if len(line.strip()) > 0])
         return code
 
-    def _update_codes(self, generated_content):
-        new_codes = Codes(generated_content)
-        differ = difflib.Differ()
-        flag = False
-        for key in new_codes.codebooks.keys():
-            if key not in self.codebooks.keys() or self.codebooks[key] != new_codes.codebooks[key]:
-                update_codes_content = "**[Update Codes]**\n\n"
-                update_codes_content += "{} updated.\n".format(key)
-                old_codes_content = self.codebooks[key] if key in self.codebooks.keys() else "# None"
-                new_codes_content = new_codes.codebooks[key]
+    def _set_code(self, filename, code):
+        # the log keeps a compact summary, the diff is computed and sent to the online log in the background
+        update = CodeUpdate(filename, self.codebooks.get(filename), code)
+        self.updates.append(update)
+        logging.info(update.to_log() + "\n")
+        update.publish()
+        self.history.record(filename, update.old, code)
+        self.codebooks[filename] = code
+        self.symbols.update(filename, code)
 
-                lines_old = old_codes_content.splitlines()
-                lines_new = new_codes_content.splitlines()
+    def _remove_code(self, filename):
+        self.history.record(filename, self.codebooks.pop(filename, None), None)
+        self.symbols.remove(filename)
+        self.written_files.pop(filename, None)
+        if self.directory is not None and os.path.exists(os.path.join(self.directory, filename)):
+            os.remove(os.path.join(self.directory, filename))
+            if self.repository is not None:
+                self.repository.stage([filename])
 
-                unified_diff = difflib.unified_diff(lines_old, lines_new, lineterm='', fromfile='Old', tofile='New')
-                unified_diff = '\n'.join(unified_diff)
-                update_codes_content = update_codes_content + "\n\n" + """```
-'''
+    def _roll_back(self, version: Version) -> None:
+        """assign the contents of version again, the rollback itself becomes the next version"""
+        contents = self.history.restore(version)
+        for filename, code in contents.items():
+            if code is None:
+                self._remove_code(filename)
+            elif self.codebooks.get(filename) != code:
+                self._set_code(filename, code)
+        log_and_print_online("**[Rollback]**\n\nback to version {} ({}), {} files restored".format(
+            version.number, version.label, len(contents)))
 
-'''\n""" + unified_diff + "\n```"
+    def _resolve_filename(self, filename):
+        # responses name files by their base name or a path, match them to the only known file that fits
+        if filename in self.codebooks:
+            return filename
+        matches = [name for name in self.codebooks
+                   if name.endswith("/" + filename) or os.path.basename(name) == os.path.basename(filename)]
+        return matches[0] if len(matches) == 1 else filename
 
-                log_and_print_online(update_codes_content)
-                self.codebooks[key] = new_codes.codebooks[key]
+    def _apply_edits(self, edits) -> List[EditResult]:
+        results = []
+        for edit in edits:
+            filename = self._resolve_filename(edit.filename)
+            code, detail = apply_edit(self.codebooks.get(filename), edit)
+            results.append(EditResult(edit, code is not None, detail))
+            if code is not None and code != self.codebooks.get(filename):
+                self._set_code(filename, self._format_code(code))
+        conflicts = [result for result in results if not result.applied]
+        if len(conflicts) > 0:
+            log_and_print_online("**[Edit Conflicts]**\n\n" + "\n".join(
+                "{}: {} ({})".format(result.edit.filename, result.detail,
+                                     next((line.strip() for line in result.edit.search if line.strip()), ""))
+                for result in conflicts))
+        return results
+
+    def _update_codes(self, generated_content):
+        # search/replace blocks and diffs are applied first, whole files in the rest of the response win over them
+        edits, generated_content = parse_edits(generated_content)
+        self.edit_results = self._apply_edits(edits)
+        new_codes = Codes(generated_content)
+        applied = [self._resolve_filename(result.edit.filename) for result in self.edit_results if result.applied]
+        flag = len(applied) > 0
+        updated = []
+        for key in new_codes.codebooks.keys():
+            filename = self._resolve_filename(key)
+            if filename not in self.codebooks or self.codebooks[filename] != new_codes.codebooks[key]:
+                self._set_code(filename, new_codes.codebooks[key])
+                updated.append(filename)
             flag = True
+        emit(CodesUpdated(sorted(set(applied + updated)), len(applied), len(self.edit_results) - len(applied)))
         return flag
         # return hasattr(new_codes, 'has_correct_format') and new_codes.has_correct_format
 
-    def _rewrite_codes(self, git_management) -> None:
+    def _dirty_files(self):
+        dirty = []
+        candidates = self.codebooks.keys()
+        if isinstance(self.codebooks, CodeStore) and os.path.abspath(self.codebooks.root) == os.path.abspath(self.directory):
+            # the files of the store that were not assigned are the files on disk
+            candidates = list(self.codebooks.modified)
+        for filename in candidates:
+            code = self.codebooks[filename]
+            state = self.written_files.get(filename)
+            if state is None or state[0] != content_digest(code) or self.file_digest(filename) is None:
+                dirty.append(filename)
+        return dirty
+
+    def file_digest(self, filename):
+        """digest of a file as last written by _rewrite_codes, None if it is unknown or was modified since"""
+        state = self.written_files.get(filename)
+        if state is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != state[1:]:
+            return None
+        return state[0]
+
+    def file_symbols(self, filename) -> FileSymbols:
+        """symbols of a file of the software directory, parsed only when the file is new or was changed"""
+        digest = self.file_digest(filename)
+        symbols = self.symbols.lookup(digest) if digest is not None else None
+        if symbols is None:
+            # written by something else than _rewrite_codes, or modified since
+            with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                symbols = self.symbols.update(filename, f.read())
+        return symbols
+
+    def _commit_codes(self, message) -> None:
+        if self.repository is not None:
+            # the documents and assets of the software are versioned with the codes
+            self.repository.stage_all()
+            sha = self.repository.commit(message)
+            if sha is not None:
+                log_and_print_online("**[Git Commit]**\n\n{} {}".format(sha[:7], message))
+
+    @traced("Codes.rewrite_codes")
+    def _rewrite_codes(self, git_management, commit=True) -> None:
         directory = self.directory
         rewrite_codes_content = "**[Rewrite Codes]**\n\n"
-        if os.path.exists(directory) and len(os.listdir(directory)) > 0:
-            self.version += 1.0
         if not os.path.exists(directory):
             os.mkdir(self.directory)
             rewrite_codes_content += "{} Created\n".format(directory)
+            self.written_files = {}
+        dirty = self._dirty_files()
+        if len(dirty) > 0 and len(os.listdir(directory)) > 0:
+            self.version += 1.0
 
-        for filename in self.codebooks.keys():
+        for filename in dirty:
             filepath = os.path.join(directory, filename)
-            with open(filepath, "w", encoding="utf-8") as writer:
-                writer.write(self.codebooks[filename])
-                rewrite_codes_content += os.path.join(directory, filename) + " Wrote\n"
+            content = self.codebooks[filename]
+            with span("Codes.write_file", file=filename, size=len(content)):
+                atomic_write(filepath, content)
+            stat = os.stat(filepath)
+            self.written_files[filename] = (content_digest(content), stat.st_size, stat.st_mtime_ns)
+            if isinstance(self.codebooks, CodeStore):
+                self.codebooks.mark_written(filename, directory)
+            rewrite_codes_content += filepath + " Wrote\n"
+        rewrite_codes_content += "{} files unchanged\n".format(len(self.codebooks) - len(dirty))
+        self.changed_files = set(dirty)
+        self.history.commit(str(self.version))
 
-        if git_management:
-            if self.version == 1.0:
-                os.system("cd {}; git init".format(self.directory))
-            os.system("cd {}; git add .".format(self.directory))
-            os.system("cd {}; git commit -m \"{}\"".format(self.directory, self.version))
+        if git_management and len(dirty) > 0:
+            if self.repository is None or self.repository.directory != directory:
+                self.repository = GitRepository(directory)
+            self.repository.stage(dirty)
+            if commit:
+                self._commit_codes(str(self.version))
 
         log_and_print_online(rewrite_codes_content)
 
-    def _get_codes(self) -> str:
-        content = ""
-        for filename in self.codebooks.keys():
-            content += "{}\n```{}\n{}\n```\n\n".format(filename,
-                                                       "python" if filename.endswith(".py") else filename.split(".")[
-                                                           -1], self.codebooks[filename])
-        return content
-
-    def _load_from_hardware(self, directory) -> None:
-        assert len([filename for filename in os.listdir(directory) if filename.endswith(".py")]) > 0
-        for root, directories, filenames in os.walk(directory):
-            for filename in filenames:
-                if filename.endswith(".py"):
-                    code = open(os.path.join(directory, filename), "r", encoding="utf-8").read()
-                    self.codebooks[filename] = self._format_code(code)
-        log_and_print_online("{} files read from {}".format(len(self.codebooks.keys()), directory))
+    def _render(self, filename):
+        # segments are cached per file and reused while the file content is unchanged
+        code = self.codebooks[filename]
+        cached = self._segments.get(filename)
+        if cached is None or (cached[0] is not code and cached[0] != code):
+            cached = (code, "{}\n```{}\n{}\n```\n\n".format(filename,
+                                                           "python" if filename.endswith(".py") else filename.split(".")[
+                                                               -1], code))
+            self._segments[filename] = cached
+        return cached[1]
+
+    def _get_codes(self, filenames=None) -> str:
+        """
+        markdown view of the code files
+        Args:
+            filenames: only render these files
+        """
+        # unchanged code strings are the same objects, so comparing keys is mostly identity checks
+        key = tuple((filename, code) for filename, code in self.codebooks.items()
+                    if filenames is None or filename in filenames)
+        if key != self._view[0]:
+            self._view = (key, "".join(self._render(filename) for filename, _ in key))
+        return self._view[1]
+
+    def _load_from_hardware(self, directory, **options) -> None:
+        """
+        use the source files under directory, including nested packages, as the codebooks
+        Args:
+            options: ignore patterns, max_file_size, max_files, cache_bytes of the CodeStore
+        """
+        self.codebooks = CodeStore(directory, formatter=self._format_code, **options)
+        assert len(self.codebooks) > 0
+        log_and_print_online("{} files read from {}{}".format(
+            len(self.codebooks), directory,
+            "".join("\n{} skipped: {}".format(path, reason) for path, reason in self.codebooks.skipped.items())))
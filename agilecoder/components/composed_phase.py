@@ -5,6 +5,8 @@ from collections import defaultdict
 
 from agilecoder.camel.typing import ModelType
 from agilecoder.components.chat_env import ChatEnv
+from agilecoder.components.events import PhaseStarted, emit
+from agilecoder.components.tracing import span
 from agilecoder.components.utils import log_and_print_online
 
 
@@ -115,6 +117,15 @@ class ComposedPhase(ABC):
         """
         pass
 
+    def review_phase_env(self, phase, chat_env) -> None:
+        """
+        hook called after the SimplePhase phase updated its phase environment, before the loop break check
+        Args:
+            phase: name of the SimplePhase
+            chat_env: global chat chain environment
+        """
+        pass
+
     def execute(self, chat_env) -> ChatEnv:
         """
         similar to Phase.execute, but add control for breaking the loop
@@ -135,6 +146,20 @@ class ComposedPhase(ABC):
         """
         self.update_phase_env(chat_env)
         for cycle_index in range(self.cycle_num):
+            emit(PhaseStarted(self.phase_name, composed=True, cycle=cycle_index))
+            chat_env, stop = self.execute_cycle(chat_env, cycle_index)
+            if stop:
+                return chat_env
+        chat_env = self.update_chat_env(chat_env)
+        return chat_env
+
+    def execute_cycle(self, chat_env, cycle_index):
+        """
+        one cycle of the SimplePhases of execute, in its span
+        Returns:
+            (chat_env, whether execute stops before the end of its cycles)
+        """
+        with span("ComposedPhase.cycle", phase=self.phase_name, cycle=cycle_index):
             for phase_item in self.composition:
                 if phase_item["phaseType"] == "SimplePhase":  # right now we do not support nested composition
                     phase = phase_item['phase']
@@ -145,19 +170,20 @@ class ComposedPhase(ABC):
                     if phase in self.phases:
                         self.phases[phase].phase_env = self.phase_env
                         self.phases[phase].update_phase_env(chat_env)
-                        
+                        self.review_phase_env(phase, chat_env)
+
                         if self.break_cycle(self.phases[phase].phase_env):
-                            return chat_env
+                            return chat_env, True
                         chat_env = self.phases[phase].execute(chat_env,
                                                             self.chat_turn_limit_default if max_turn_step <= 0 else max_turn_step,
                                                             need_reflect)
                         # print('@' * 20)
                         # print('self.phases[phase].phase_env', self.phases[phase].phase_env)
                         if self.break_cycle(self.phases[phase].phase_env):
-                            return chat_env
+                            return chat_env, True
                         # chat_env = self.phases[phase].update_chat_env(chat_env)
                         if chat_env.env_dict.get('end-sprint', False):
-                            return chat_env
+                            return chat_env, True
                     else:
                         print(f"Phase '{phase}' is not yet implemented. \
                                 Please write its config in phaseConfig.json \
@@ -177,10 +203,7 @@ class ComposedPhase(ABC):
                     chat_env = compose_phase_instance.execute(chat_env)
                 else:
                     raise NotImplementedError
-                
-
-        chat_env = self.update_chat_env(chat_env)
-        return chat_env
+        return chat_env, False
 
 class ProductBacklogUpdate(ComposedPhase):
     def __init__(self, **kwargs):
@@ -283,13 +306,23 @@ class SprintBacklogUpdate(ComposedPhase):
 class Test(ComposedPhase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.first_version = 0
 
     def update_phase_env(self, chat_env):
         self.phase_env = dict()
+        # the codes of this sprint are tested from here on, a rollback never discards them for an earlier sprint
+        head = chat_env.codes.history.head
+        self.first_version = head.number if head is not None else 0
 
     def update_chat_env(self, chat_env):
         return chat_env
 
+    def review_phase_env(self, phase, chat_env):
+        # TestErrorSummary just tested the codes, TestModification must not build on a regression
+        if phase == 'TestErrorSummary' and chat_env.config.rollback_on_regression:
+            if chat_env.roll_back_codes(since=self.first_version) is not None:
+                self.phases[phase].update_phase_env(chat_env)
+
     def break_cycle(self, phase_env) -> bool:
         if not phase_env.get('exist_bugs_flag', True):
             log_and_print_online(f"**[Test Info]**\n\nAI User (Software Test Engineer):\nTest Pass!\n")
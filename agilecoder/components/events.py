@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar, Dict, List, Optional
+
+# longest rendering of an argument of FunctionCalled
+MAX_VALUE_LENGTH = 2000
+
+
+@dataclass
+class Event:
+    """
+    a structured event of the chain, nothing is rendered before a sink at the level of the event exists
+    """
+    kind: ClassVar[str] = "event"
+    level: ClassVar[int] = logging.INFO
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"event": self.kind}
+        record.update((item.name, getattr(self, item.name)) for item in fields(self))
+        return record
+
+
+@dataclass
+class PhaseStarted(Event):
+    kind: ClassVar[str] = "phase_started"
+    phase: str
+    composed: bool = False
+    cycle: Optional[int] = None
+
+
+@dataclass
+class PhaseFinished(Event):
+    kind: ClassVar[str] = "phase_finished"
+    phase: str
+    duration: float
+    turns: int = 0
+    reflections: int = 0
+
+
+@dataclass
+class LLMCall(Event):
+    kind: ClassVar[str] = "llm_call"
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    duration: float
+    # name of the exception when the request failed
+    error: Optional[str] = None
+
+
+@dataclass
+class LLMRetry(Event):
+    kind: ClassVar[str] = "llm_retry"
+    model: str
+    attempt: int
+
+
+@dataclass
+class CodesUpdated(Event):
+    kind: ClassVar[str] = "codes_updated"
+    files: List[str]
+    edits_applied: int = 0
+    edit_conflicts: int = 0
+
+
+@dataclass
+class TestRun(Event):
+    kind: ClassVar[str] = "test_run"
+    command: str
+    passed: bool
+    duration: float
+    returncode: Optional[int] = None
+
+
+@dataclass
+class FunctionCalled(Event):
+    """the arguments are kept as they are and only turned into strings by a sink"""
+    kind: ClassVar[str] = "function_called"
+    level: ClassVar[int] = logging.DEBUG
+    function: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self):
+        return {"event": self.kind, "function": self.function,
+                "arguments": {name: str(value)[:MAX_VALUE_LENGTH] for name, value in self.arguments.items()}}
+
+
+class JsonLinesSink:
+    """appends one json object per event to a file"""
+
+    def __init__(self, path, level=logging.INFO):
+        self.path = path
+        self.level = level
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_sinks: List[JsonLinesSink] = []
+# lowest level of the sinks, events below it return right away
+_min_level = logging.CRITICAL + 1
+
+
+def _update_min_level():
+    global _min_level
+    _min_level = min((sink.level for sink in _sinks), default=logging.CRITICAL + 1)
+
+
+def add_sink(sink) -> None:
+    _sinks.append(sink)
+    _update_min_level()
+
+
+def remove_sink(sink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+        sink.close()
+    _update_min_level()
+
+
+def enabled(level=logging.INFO) -> bool:
+    """whether an event of this level would reach a sink, to skip building expensive events"""
+    return level >= _min_level
+
+
+def emit(event: Event) -> None:
+    if event.level < _min_level:
+        return
+    record = event.to_dict()
+    record["time"] = time.time()
+    for sink in _sinks:
+        if event.level >= sink.level:
+            sink.write(record)
+
+
+def install_sink(sink):
+    """add sink unless a sink of its class is installed already, for the sinks that live as long as the process"""
+    for installed in _sinks:
+        if type(installed) is type(sink):
+            return installed
+    add_sink(sink)
+    return sink
+
+
+def install_event_log(log_filepath, level=logging.INFO) -> JsonLinesSink:
+    """write the events of a run next to its log, replacing the file sink of a previous run in the process"""
+    for sink in list(_sinks):
+        if isinstance(sink, JsonLinesSink):
+            remove_sink(sink)
+    sink = JsonLinesSink(os.path.splitext(log_filepath)[0] + ".events.jsonl", level=level)
+    add_sink(sink)
+    return sink
@@ -0,0 +1,65 @@
+import logging
+import os
+from collections import deque
+from typing import Optional
+
+# number of formatted records kept, AGILECODER_LOG_BUFFER overrides it
+DEFAULT_CAPACITY = 1000
+
+
+def default_capacity():
+    try:
+        return int(os.environ.get("AGILECODER_LOG_BUFFER", DEFAULT_CAPACITY))
+    except ValueError:
+        return DEFAULT_CAPACITY
+
+
+class BufferHandler(logging.Handler):
+    """
+    keeps the last capacity formatted records in a ring buffer, log_and_print_online forwards the latest one
+    to the online log, capacity 1 turns the handler into a tap on the latest record
+    """
+
+    def __init__(self, level=logging.NOTSET, format=None, datefmt=None, encoding=None, capacity=None):
+        logging.Handler.__init__(self)
+        self.buffer = deque(maxlen=max(1, default_capacity() if capacity is None else capacity))
+
+        if format:
+            formatter = logging.Formatter(format, datefmt)
+            self.setFormatter(formatter)
+        if level:
+            self.setLevel(level)
+        if encoding:
+            self.encoding = encoding
+
+    @property
+    def capacity(self):
+        return self.buffer.maxlen
+
+    def emit(self, record):
+        self.buffer.append(self.format(record))
+
+    def latest(self) -> Optional[str]:
+        return self.buffer[-1] if len(self.buffer) > 0 else None
+
+
+def install_buffer_handler(capacity=None, level=logging.INFO, format='[%(asctime)s %(levelname)s] %(message)s',
+                           datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8") -> BufferHandler:
+    """
+    add a BufferHandler as the last handler of the root logger, replacing the one of a previous run
+    in the same process, so that repeated runs do not pile up handlers
+    """
+    for handler in list(logging.root.handlers):
+        if isinstance(handler, BufferHandler):
+            logging.root.removeHandler(handler)
+    handler = BufferHandler(level=level, format=format, datefmt=datefmt, encoding=encoding, capacity=capacity)
+    logging.root.addHandler(handler)
+    return handler
+
+
+def latest_record() -> Optional[str]:
+    """the last formatted record of the root logger, None when no BufferHandler is installed"""
+    for handler in reversed(logging.root.handlers):
+        if isinstance(handler, BufferHandler):
+            return handler.latest()
+    return None
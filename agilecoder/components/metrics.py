@@ -0,0 +1,216 @@
+import logging
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# seconds, from a fast test run to a slow phase
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = ['{}="{}"'.format(name, escape_label(value)) for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append('{}="{}"'.format(*extra))
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = ["# HELP {} {}".format(self.name, self.documentation), "# TYPE {} {}".format(self.name, self.type)]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self.values.items())
+        return ["{}{} {}".format(self.name, format_labels(self.labelnames, key), format_value(value))
+                for key, value in values]
+
+
+class Gauge(Metric):
+    """a value set by the code, or read from a function when the metrics are rendered"""
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.function: Optional[Callable[[], Dict[Tuple, float]]] = None
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], Dict[Tuple, float]]):
+        """
+        Args:
+            function: returns the values by tuple of label values
+        """
+        self.function = function
+
+    def samples(self):
+        with self._lock:
+            values = dict(self.values)
+        if self.function is not None:
+            values.update(self.function())
+        return ["{}{} {}".format(self.name, format_labels(self.labelnames, key), format_value(value))
+                for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (count in each bucket, sum, count)
+        self.values: Dict[Tuple, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append("{}_bucket{} {}".format(self.name, format_labels(self.labelnames, key,
+                                                                              ("le", format_value(bound))), cumulative))
+            lines.append("{}_sum{} {}".format(self.name, format_labels(self.labelnames, key), format_value(total)))
+            lines.append("{}_count{} {}".format(self.name, format_labels(self.labelnames, key), count))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """the metrics in the prometheus text format"""
+        return "\n".join(metric.render() for metric in list(self.metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LLM_SECONDS = REGISTRY.histogram("agilecoder_llm_request_seconds", "Latency of the requests to the LLM.", ["model"])
+LLM_PROMPT_TOKENS = REGISTRY.counter("agilecoder_llm_prompt_tokens_total", "Prompt tokens sent to the LLM.", ["model"])
+LLM_COMPLETION_TOKENS = REGISTRY.counter("agilecoder_llm_completion_tokens_total",
+                                         "Completion tokens received from the LLM.", ["model"])
+LLM_ERRORS = REGISTRY.counter("agilecoder_llm_errors_total", "Requests to the LLM that failed.", ["model", "error"])
+LLM_RETRIES = REGISTRY.counter("agilecoder_llm_retries_total", "Steps of an agent retried after an error.", ["model"])
+PHASE_SECONDS = REGISTRY.histogram("agilecoder_phase_seconds", "Duration of the phases.", ["phase"])
+PHASE_TURNS = REGISTRY.counter("agilecoder_phase_turns_total", "Chat turns of the phases.", ["phase"])
+PHASE_REFLECTIONS = REGISTRY.counter("agilecoder_phase_reflections_total", "Self reflections of the phases.",
+                                     ["phase"])
+TEST_SECONDS = REGISTRY.histogram("agilecoder_test_run_seconds", "Duration of the runs of the generated software.")
+TEST_RUNS = REGISTRY.counter("agilecoder_test_runs_total", "Runs of the generated software by exist_bugs.",
+                             ["outcome"])
+CODES_UPDATES = REGISTRY.counter("agilecoder_codes_updates_total", "Updates of the codes from an LLM response.")
+CODES_FILES = REGISTRY.counter("agilecoder_codes_files_updated_total", "Files changed by the updates of the codes.")
+CODES_EDITS = REGISTRY.counter("agilecoder_codes_edits_total", "Edits of the LLM applied to the codes, or in conflict.",
+                               ["result"])
+
+
+def observe(record: Dict):
+    """update the metrics from the record of a structured event, see agilecoder.components.events"""
+    kind = record.get("event")
+    if kind == "llm_call":
+        model = record.get("model")
+        if record.get("error"):
+            LLM_ERRORS.inc(model=model, error=record["error"])
+        else:
+            LLM_SECONDS.observe(record.get("duration", 0.0), model=model)
+            LLM_PROMPT_TOKENS.inc(record.get("prompt_tokens", 0), model=model)
+            LLM_COMPLETION_TOKENS.inc(record.get("completion_tokens", 0), model=model)
+    elif kind == "llm_retry":
+        LLM_RETRIES.inc(model=record.get("model"))
+    elif kind == "phase_finished":
+        PHASE_SECONDS.observe(record.get("duration", 0.0), phase=record.get("phase"))
+        PHASE_TURNS.inc(record.get("turns", 0), phase=record.get("phase"))
+        PHASE_REFLECTIONS.inc(record.get("reflections", 0), phase=record.get("phase"))
+    elif kind == "test_run":
+        TEST_SECONDS.observe(record.get("duration", 0.0))
+        TEST_RUNS.inc(outcome="passed" if record.get("passed") else "failed")
+    elif kind == "codes_updated":
+        CODES_UPDATES.inc()
+        CODES_FILES.inc(len(record.get("files", [])))
+        CODES_EDITS.inc(record.get("edits_applied", 0), result="applied")
+        CODES_EDITS.inc(record.get("edit_conflicts", 0), result="conflict")
+
+
+class MetricsSink:
+    """an event sink that updates the metrics of this process"""
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def write(self, record):
+        observe(record)
+
+    def close(self):
+        pass
@@ -1,13 +1,16 @@
-import os
 import re
+import time
 from abc import ABC, abstractmethod
 
 from agilecoder.camel.agents import RolePlaying
 from agilecoder.camel.messages import ChatMessage
 from agilecoder.camel.typing import TaskType, ModelType
 from agilecoder.components.chat_env import ChatEnv
+from agilecoder.components.events import PhaseFinished, PhaseStarted, emit
 from agilecoder.components.statistics import get_info
-from agilecoder.components.utils import log_and_print_online, log_arguments, get_classes_in_folder
+from agilecoder.components.tracebacks import TracebackIndex
+from agilecoder.components.tracing import current_span, span, traced
+from agilecoder.components.utils import log_and_print_online, log_arguments
 import glob
 
 class Phase(ABC):
@@ -129,7 +132,9 @@ class Phase(ABC):
             # 4. then input_assistant_msg send to LLM and get user_response
             # all above are done in role_play_session.step, which contains two interactions with LLM
             # the first interaction is logged in role_play_session.init_chat
-            assistant_response, user_response = role_play_session.step(input_user_msg, chat_turn_limit == 1)
+            with span("Phase.turn", phase=phase_name, turn=i):
+                assistant_response, user_response = role_play_session.step(input_user_msg, chat_turn_limit == 1)
+            self.turns = getattr(self, "turns", 0) + 1
 
             conversation_meta = "**" + assistant_role_name + "<->" + user_role_name + " on : " + str(
                 phase_name) + ", turn " + str(i) + "**\n\n"
@@ -222,6 +227,7 @@ class Phase(ABC):
         else:
             raise ValueError(f"Reflection of phase {phase_name}: Not Assigned.")
 
+        self.reflections = getattr(self, "reflections", 0) + 1
         # Reflections actually is a special phase between CEO and counselor
         # They read the whole chatting history of this phase and give refined conclusion of this phase
         reflected_content = \
@@ -280,6 +286,7 @@ class Phase(ABC):
         """
         pass
 
+    @traced("Phase.execute")
     def execute(self, chat_env, chat_turn_limit, need_reflect) -> ChatEnv:
         """
         execute the chatting in this phase
@@ -295,6 +302,10 @@ class Phase(ABC):
             chat_env: updated global chat chain environment using the conclusion from this phase execution
 
         """
+        current_span().set_attribute("phase", self.phase_name)
+        emit(PhaseStarted(self.phase_name))
+        start = time.perf_counter()
+        self.turns, self.reflections = 0, 0
         self.update_phase_env(chat_env)
         self.seminar_conclusion = \
             self.chatting(chat_env=chat_env,
@@ -310,6 +321,7 @@ class Phase(ABC):
                           placeholders=self.phase_env,
                           model_type=self.model_type)
         chat_env = self.update_chat_env(chat_env)
+        emit(PhaseFinished(self.phase_name, time.perf_counter() - start, self.turns, self.reflections))
         return chat_env
 
 
@@ -344,7 +356,6 @@ class LanguageChoose(Phase):
             chat_env.env_dict['language'] = "Python"
         return chat_env
 
-import re
 
 def check_if_string_starts_with_number(text):
     pattern = r"^\d"
@@ -520,7 +531,6 @@ class NextSprintBacklogCreating(Phase):
         print("chat_env.env_dict['current-sprint-goals']", chat_env.env_dict['current-sprint-goals'])
         return chat_env
 
-import re
 
 def extract_information(text):
     pattern = r"Backlog Item: (.*) - Member: (.*)"
@@ -706,9 +716,7 @@ class CodeComplete(Phase):
                                "unimplemented_file": ""})
         unimplemented_file = ""
         for filename in self.phase_env['pyfiles']:
-            code_content = open(os.path.join(chat_env.env_dict['directory'], filename)).read()
-            lines = [line.strip() for line in code_content.split("\n") if line.strip() == "pass"]
-            if len(lines) > 0 and self.phase_env['num_tried'][filename] < self.phase_env['max_num_implement']:
+            if chat_env.codes.file_symbols(filename).unimplemented and self.phase_env['num_tried'][filename] < self.phase_env['max_num_implement']:
                 unimplemented_file = filename
                 break
         self.phase_env['num_tried'][unimplemented_file] += 1
@@ -994,6 +1002,38 @@ class TestingPlan(Phase):
             # print('commands', commands)
         return chat_env
 
+class UnitTestCoding(Phase):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def update_phase_env(self, chat_env):
+        # the phase is in the Test phases of every chain, it does nothing unless unit_testing is set
+        if not chat_env.config.unit_testing:
+            return
+        self.phase_env.update({"task": chat_env.env_dict['task_prompt'],
+                               "modality": chat_env.env_dict['modality'],
+                               "language": chat_env.env_dict['language'],
+                               "codes": chat_env.get_codes(),
+                               "current_sprint_goals": chat_env.env_dict['current-sprint-goals'],
+                               'current_programming_task': chat_env.env_dict['current-programming-task'],
+                               })
+
+    def update_chat_env(self, chat_env) -> ChatEnv:
+        has_correct_format = chat_env.update_codes(self.seminar_conclusion)
+        if has_correct_format:
+            chat_env.rewrite_codes()
+            log_and_print_online("**[Software Info]**:\n\n {}".format(get_info(chat_env.env_dict['directory'],self.log_filepath)))
+        return chat_env
+
+    def execute(self, chat_env, chat_turn_limit, need_reflect) -> ChatEnv:
+        # unit tests are written once per sprint, the following Test cycles reuse them
+        if not chat_env.config.unit_testing:
+            return chat_env
+        if chat_env.env_dict.get('unit-tests-sprint') == chat_env.env_dict.get('num-sprints'):
+            return chat_env
+        chat_env.env_dict['unit-tests-sprint'] = chat_env.env_dict.get('num-sprints')
+        return super().execute(chat_env, chat_turn_limit, need_reflect)
+
 class TestErrorSummary(Phase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1007,28 +1047,36 @@ class TestErrorSummary(Phase):
                                "language": chat_env.env_dict['language'],
                                "codes": chat_env.get_codes(),
                                "test_reports": test_reports,
+                               "test_errors": TracebackIndex.parse(test_reports),
                                "exist_bugs_flag": exist_bugs_flag})
+        chat_env.record_test_outcome(exist_bugs_flag, self.phase_env['test_errors'])
         log_and_print_online("**[Test Reports]**:\n\n{}".format(test_reports))
 
     def update_chat_env(self, chat_env) -> ChatEnv:
         chat_env.env_dict['error_summary'] = self.seminar_conclusion
         chat_env.env_dict['test_reports'] = self.phase_env['test_reports']
+        chat_env.env_dict['test_errors'] = self.phase_env['test_errors']
 
         return chat_env
 
+    @traced("Phase.execute")
     def execute(self, chat_env, chat_turn_limit, need_reflect) -> ChatEnv:
+        current_span().set_attribute("phase", self.phase_name)
+        emit(PhaseStarted(self.phase_name))
+        start = time.perf_counter()
+        self.turns, self.reflections = 0, 0
         self.update_phase_env(chat_env)
         flag = True
-        if "ModuleNotFoundError" in self.phase_env['test_reports']:
-            installed_module = chat_env.fix_module_not_found_error(self.phase_env['test_reports'])
+        test_errors = self.phase_env['test_errors']
+        if test_errors.has("ModuleNotFoundError"):
+            installed_module = chat_env.fix_module_not_found_error(test_errors)
             if self.errors.get(installed_module, 0) == 0:
                 flag = False
                 
                 log_and_print_online(
                     f"Software Test Engineer found ModuleNotFoundError:\n{self.phase_env['test_reports']}\n")
                 pip_install_content = ""
-                for match in re.finditer(r"No module named '(\S+)'", self.phase_env['test_reports'], re.DOTALL):
-                    module = match.group(1)
+                for module in test_errors.missing_modules():
                     pip_install_content += "{}\n```{}\n{}\n```\n".format("cmd", "bash", f"pip install {module}")
                     log_and_print_online(f"Programmer resolve ModuleNotFoundError by:\n{pip_install_content}\n")
                 self.seminar_conclusion = "nothing need to do"
@@ -1048,45 +1096,60 @@ class TestErrorSummary(Phase):
                               chat_turn_limit=chat_turn_limit,
                               placeholders=self.phase_env)
         chat_env = self.update_chat_env(chat_env)
+        emit(PhaseFinished(self.phase_name, time.perf_counter() - start, self.turns, self.reflections))
         return chat_env
 
-def extract_file_names(traceback_str):
-    file_names = []
-    
-    # Define a regular expression pattern to match file names in tracebacks
-    file_name_pattern = r'File "(.*?)", line \d+, in '
-    
-    # Use re.finditer to find all matches in the traceback string
-    matches = re.finditer(file_name_pattern, traceback_str)
-    
-    # Extract file names from the matches
-    for match in matches:
-        file_names.append(match.group(1))
-    
-    return file_names
-def extract_code_and_filename(file_content):
-    # Define a regular expression pattern to match code sections
-    code_pattern = r'([\w.]+)\n```(.*?)```'
-    
-    # Use re.finditer to find all matches in the file content
-    matches = re.finditer(code_pattern, file_content, re.DOTALL)
-    
-    # Extract code sections from the matches
-    code_sections = []
-    for match in matches:
-        language = match.group(1)
-        code = match.group(2).strip()
-        code_sections.append((language, '```' + code + '\n```'))
-    
-    return code_sections
+# output formats of the prompts that TestModification builds for specific errors
+WHOLE_FILE_FORMAT = [
+    "Note that each file must strictly follow a markdown code block format, where the following tokens must be replaced such that \"FILENAME\" is the lowercase file name including the file extension, \"LANGUAGE\" in the programming language, \"DOCSTRING\" is a string literal specified in source code that is used to document a specific segment of code, and \"CODE\" is the original code:",
+    "FILENAME",
+    "```LANGUAGE",
+    "'''",
+    "DOCSTRING",
+    "'''",
+    "CODE",
+    "```",
+]
+PATCH_FORMAT = [
+    "To change an existing file, output its FILENAME followed by one or more search/replace blocks, where \"ORIGINAL\" are consecutive lines copied exactly from the current code, including their indentation, enough of them to occur only once in the file, and \"UPDATED\" are the lines that replace them. Format:",
+    "FILENAME",
+    "```LANGUAGE",
+    "<<<<<<< SEARCH",
+    "ORIGINAL",
+    "=======",
+    "UPDATED",
+    ">>>>>>> REPLACE",
+    "```",
+    "A unified diff of the file in a ```diff block is accepted as well. Only a new file is output completely, following the markdown code block format below, where \"FILENAME\" is the lowercase file name including the file extension, \"LANGUAGE\" in the programming language, \"DOCSTRING\" is a string literal specified in source code that is used to document a specific segment of code, and \"CODE\" is the original code:",
+    "FILENAME",
+    "```LANGUAGE",
+    "'''",
+    "DOCSTRING",
+    "'''",
+    "CODE",
+    "```",
+]
+
+
 class TestModification(Phase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.force_unsplit = True
+        self.configured_prompt = self.phase_prompt
 
     def update_phase_env(self, chat_env):
         test_reports = chat_env.env_dict['test_reports']
-        if 'FileNotFoundError' in test_reports:
+        test_errors = chat_env.env_dict.get('test_errors') or TracebackIndex.parse(test_reports)
+        # a prompt for a specific error only lasts for the test cycle of that error
+        self.phase_prompt = self.configured_prompt
+        # the prompts for specific errors ask for the same output format as the configured prompt
+        if chat_env.config.code_edit_format == "patch":
+            code_format = PATCH_FORMAT
+            output_instruction = "Output the edits that fix the codes based on the test reported and corresponding explanations (strictly follow the format defined above; incomplete \"TODO\" codes are strictly prohibited). If no bugs are reported, please return only one line like \"<INFO> Finished\"."
+        else:
+            code_format = WHOLE_FILE_FORMAT
+            output_instruction = "Output the codes that you fixed based on the test reported and corresponding explanations (strictly follow the format defined above, including FILENAME, LANGUAGE, DOCSTRING and CODE; incomplete \"TODO\" codes are strictly prohibited). If no bugs are reported, please return only one line like \"<INFO> Finished\"."
+        if test_errors.has('FileNotFoundError'):
             directory = chat_env.env_dict['directory']
             assets_paths = glob.glob(f'{directory}/*.png') + glob.glob(f'{directory}/*/*.png')
             assets_paths = list(map(lambda x: x.replace(directory, '.'), assets_paths))
@@ -1103,21 +1166,13 @@ class TestModification(Phase):
         "Existing assets' paths:",
       "\"{paths}\"",
     "As the {assistant_role}, in light of a error relevant to FileNotFound, to satisfy the new user's demand and make the software execute smoothly and robustly, you should modify the codes by considering the error summary and the paths of existing assets above to fix this error.",
-      "Note that each file must strictly follow a markdown code block format, where the following tokens must be replaced such that \"FILENAME\" is the lowercase file name including the file extension, \"LANGUAGE\" in the programming language, \"DOCSTRING\" is a string literal specified in source code that is used to document a specific segment of code, and \"CODE\" is the original code:",
-      "FILENAME",
-      "```LANGUAGE",
-      "'''",
-      "DOCSTRING",
-      "'''",
-      "CODE",
-      "```",
-      "Now, use the format exemplified above and modify the problematic codes based on the error summary. If you cannot find the assets from the existing paths, you should consider removing relevant code and features. Output the codes that you fixed based on the test reported and corresponding explanations (strictly follow the format defined above, including FILENAME, LANGUAGE, DOCSTRING and CODE; incomplete \"TODO\" codes are strictly prohibited). If no bugs are reported, please return only one line like \"<INFO> Finished\"."
+      *code_format,
+      "Now, use the format exemplified above and modify the problematic codes based on the error summary. If you cannot find the assets from the existing paths, you should consider removing relevant code and features. " + output_instruction
     ])
         else:
             assets_paths = ''
-        if 'NameError:' in test_reports or 'ImportError' in test_reports:
-            directory = chat_env.env_dict['directory']
-            module_dict = get_classes_in_folder(directory)
+        if test_errors.has('NameError', 'ImportError'):
+            module_dict = chat_env.get_classes()
             module_structure = []
             for k, classes in module_dict.items():
                 if len(classes) == 0: continue
@@ -1137,25 +1192,17 @@ class TestModification(Phase):
                 "Module Structure:",
                 "\"{module_structure}\"",
                 "As the {assistant_role}, in light of a error relevant to module structure, to satisfy the new user's demand and make the software execute smoothly and robustly, you should modify the codes by considering the error summary and the module structure above to fix this error. However, if the module structure does not include used classes, you implement missing code.",
-                "Note that each file must strictly follow a markdown code block format, where the following tokens must be replaced such that \"FILENAME\" is the lowercase file name including the file extension, \"LANGUAGE\" in the programming language, \"DOCSTRING\" is a string literal specified in source code that is used to document a specific segment of code, and \"CODE\" is the original code:",
-                "FILENAME",
-                "```LANGUAGE",
-                "'''",
-                "DOCSTRING",
-                "'''",
-                "CODE",
-                "```",
-                "Now, use the format exemplified above and modify the problematic codes. If you cannot fix this error, you should consider remove relevant code and features. Output the codes that you fixed based on the test reported and corresponding explanations (strictly follow the format defined above, including FILENAME, LANGUAGE, DOCSTRING and CODE; incomplete \"TODO\" codes are strictly prohibited). If no bugs are reported, please return only one line like \"<INFO> Finished\"."
+                *code_format,
+                "Now, use the format exemplified above and modify the problematic codes. If you cannot fix this error, you should consider remove relevant code and features. " + output_instruction
             ])
         else:
             module_structure = ''
         
         module = ''
         modules = ''
-        file_names = extract_file_names(test_reports)
-        if 'ModuleNotFoundError' in test_reports:
-            for match in re.finditer(r"No module named '(\S+)'", test_reports, re.DOTALL):
-                module = match.group(1)
+        file_names = test_errors.files()
+        if test_errors.has('ModuleNotFoundError'):
+            module = (test_errors.missing_modules() or [''])[-1]
             modules = list(map(lambda x: '- ' + x.split('.')[0], glob.glob(chat_env.env_dict['directory'] + '/.*py')))
             modules = '\n'.join(modules)
             self.phase_prompt = '\n'.join([
@@ -1168,33 +1215,22 @@ class TestModification(Phase):
                 "Error Summary of Test Reports:",
                 "\"{error_summary}\"",
                 "Available Modules:",
-                "\"{modules}\""
-                "Note that each file must strictly follow a markdown code block format, where the following tokens must be replaced such that \"FILENAME\" is the lowercase file name including the file extension, \"LANGUAGE\" in the programming language, \"DOCSTRING\" is a string literal specified in source code that is used to document a specific segment of code, and \"CODE\" is the original code:",
-                "FILENAME",
-                "```LANGUAGE",
-                "'''",
-                "DOCSTRING",
-                "'''",
-                "CODE",
-                "```",
+                "\"{modules}\"",
+                *code_format,
                 "As the {assistant_role}, to satisfy the new user's demand and make the software execute smoothly and robustly, you should modify the codes based on the error summary.",
                 "There is a raised issue relevant to ModuleNotFoundError because you have not implemented the required module {missing_module}. To fix this error, you must take a great care to current source code to implement the module {missing_module} accurately.",
-                "Now, use the format exemplified above and modify the problematic codes based on the error summary. If you cannot find the assets from the existing paths, you should consider remove relevant code and features. Output the codes that you fixed based on the test reported and corresponding explanations (strictly follow the format defined above, including FILENAME, LANGUAGE, DOCSTRING and CODE where FILENAME is the file name, LANGUAGE is the programming language and CODE is the source code; incomplete \"TODO\" codes are strictly prohibited). If no bugs are reported, please return only one line like \"<INFO> Finished\"."
+                "Now, use the format exemplified above and modify the problematic codes based on the error summary. If you cannot find the assets from the existing paths, you should consider remove relevant code and features. " + output_instruction
             ])
-        elif 'AttributeError' in test_reports:
-            error_line = test_reports.split('AttributeError')[1]
-            class_name = re.search(r"'(\w+)'", error_line).group(1)
-            for filename, code in chat_env.codes.codebooks.items():
-                if class_name.lower() in filename:
-                    file_names.append(filename)
-
-        if len(file_names) > 1:
-            all_relevant_code = []
-            code_sections = extract_code_and_filename(chat_env.get_codes())
-            for file_name, code in code_sections:
-                if file_name in file_names:
-                    all_relevant_code.extend([file_name, code, '\n'])
-            all_relevant_code = '\n'.join(all_relevant_code)
+        elif test_errors.has('AttributeError'):
+            for class_name in test_errors.owners('AttributeError')[:1]:
+                for filename in chat_env.codes.codebooks.keys():
+                    if class_name.lower() in filename and filename not in file_names:
+                        file_names.append(filename)
+
+        # only the files of the failing frames are shown to the model
+        file_names = [filename for filename in file_names if filename in chat_env.codes.codebooks]
+        if file_names:
+            all_relevant_code = chat_env.get_codes(filenames=set(file_names))
         else:
             all_relevant_code = chat_env.get_codes()
         
@@ -0,0 +1,410 @@
+import atexit
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+# interpreter of the generated programs and of their tests
+PYTHON = "python3"
+
+# sitecustomize injected into every generated program under test
+# it hooks the first call into a pygame frame/event loop or a tkinter mainloop
+# and writes a marker file, so the runner knows the program started fine
+PROBE_SOURCE = r'''
+import os
+import sys
+from importlib.abc import MetaPathFinder
+
+_probe_file = os.environ.get("AGILECODER_PROBE_FILE")
+
+
+def _signal(kind):
+    global _probe_file
+    if _probe_file is None:
+        return
+    try:
+        with open(_probe_file, "w") as f:
+            f.write(kind)
+    except OSError:
+        pass
+    _probe_file = None
+
+
+def _wrap(owner, name, kind):
+    original = getattr(owner, name, None)
+    if original is None or getattr(original, "_agilecoder_probe", False):
+        return
+
+    def wrapper(*args, **kwargs):
+        _signal(kind)
+        return original(*args, **kwargs)
+
+    wrapper._agilecoder_probe = True
+    try:
+        setattr(owner, name, wrapper)
+    except (AttributeError, TypeError):
+        pass
+
+
+_TARGETS = {
+    "pygame.display": [("flip", "frame"), ("update", "frame")],
+    "pygame.event": [("get", "loop"), ("poll", "loop"), ("wait", "loop")],
+    "tkinter": [("mainloop", "loop")],
+}
+
+
+def _patch(module):
+    for name, kind in _TARGETS[module.__name__]:
+        _wrap(module, name, kind)
+    if module.__name__ == "tkinter":
+        _wrap(module.Misc, "mainloop", "loop")
+
+
+class _ProbeFinder(MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in _TARGETS:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        if loader is None or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            _patch(module)
+
+        try:
+            loader.exec_module = exec_and_patch
+        except AttributeError:
+            pass
+        return spec
+
+
+if _probe_file:
+    sys.meta_path.insert(0, _ProbeFinder())
+
+
+def _import_shadowed():
+    # the sitecustomize of the site or virtualenv, which this one shadows on PYTHONPATH
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = sys.path[:]
+    sys.path[:] = [entry for entry in path if os.path.abspath(entry or os.curdir) != here]
+    this = sys.modules.pop("sitecustomize")
+    try:
+        import sitecustomize
+    except ImportError as e:
+        # the import system looks this module up in sys.modules once it ran
+        sys.modules["sitecustomize"] = this
+        if e.name != "sitecustomize":
+            raise
+    finally:
+        sys.path[:] = path
+
+
+_import_shadowed()
+'''
+
+
+# sets the limits given as json in its own process, then executes the command that follows, so that the limits
+# are not set between fork and exec of the runner, which is unsafe while other threads run
+LIMITS_WRAPPER = (
+    "import json, os, resource, sys\n"
+    "for limit, soft, hard in json.loads(sys.argv[1]):\n"
+    "    resource.setrlimit(limit, (soft, hard))\n"
+    "os.execvp(sys.argv[2], sys.argv[2:])\n"
+)
+
+
+@dataclass
+class ResourceLimits:
+    """optional hard limits applied to a program under test, None means unlimited"""
+    max_memory_mb: Optional[int] = None
+    max_cpu_seconds: Optional[int] = None
+    max_file_size_mb: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, config):
+        config = config or {}
+        return cls(**{key: config[key] for key in cls.__dataclass_fields__ if config.get(key) is not None})
+
+    def wrap(self, command):
+        """the command run with the limits, through LIMITS_WRAPPER"""
+        if resource is None or not self.is_set():
+            return command
+        limits = []
+        if self.max_memory_mb is not None:
+            limit = int(self.max_memory_mb) * 1024 * 1024
+            limits.append((resource.RLIMIT_AS, limit, limit))
+        if self.max_cpu_seconds is not None:
+            limit = int(self.max_cpu_seconds)
+            limits.append((resource.RLIMIT_CPU, limit, limit + 1))
+        if self.max_file_size_mb is not None:
+            limit = int(self.max_file_size_mb) * 1024 * 1024
+            limits.append((resource.RLIMIT_FSIZE, limit, limit))
+        return [sys.executable, "-c", LIMITS_WRAPPER, json.dumps(limits)] + command
+
+    def is_set(self):
+        return any(getattr(self, key) is not None for key in self.__dataclass_fields__)
+
+
+@dataclass
+class ResourceUsage:
+    wall_time: float = 0.0
+    user_time: float = 0.0
+    sys_time: float = 0.0
+    peak_rss_kb: int = 0
+    # largest number of processes observed at once, the program itself included
+    num_processes: int = 0
+    bytes_written: int = 0
+
+    def to_log(self):
+        return "\n".join("test_{}: {}".format(key, round(value, 3) if isinstance(value, float) else value)
+                         for key, value in self.__dict__.items())
+
+
+@dataclass
+class RunResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    # the program reached its main loop/first frame before the deadline
+    alive: bool
+    # the program was still running when it was stopped
+    killed: bool
+    duration: float
+    usage: ResourceUsage = field(default_factory=ResourceUsage)
+    # name of the hard limit that stopped the program, if any
+    limit_exceeded: Optional[str] = None
+
+
+_probe_directory: Optional[str] = None
+_probe_lock = threading.Lock()
+
+
+def _probe_dir():
+    """the directory of the probe sitecustomize, private to this process and removed when it exits"""
+    global _probe_directory
+    with _probe_lock:
+        if _probe_directory is None:
+            directory = tempfile.mkdtemp(prefix="agilecoder_probe_")
+            with open(os.path.join(directory, "sitecustomize.py"), "w", encoding="utf-8") as f:
+                f.write(PROBE_SOURCE)
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+            _probe_directory = directory
+        return _probe_directory
+
+
+def headless_env(probe_file):
+    """environment that lets GUI programs start without a screen or sound card"""
+    env = dict(os.environ)
+    env["SDL_VIDEODRIVER"] = "dummy"
+    env["SDL_AUDIODRIVER"] = "dummy"
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    env["MPLBACKEND"] = "Agg"
+    env["PYTHONUNBUFFERED"] = "1"
+    env["AGILECODER_PROBE_FILE"] = probe_file
+    env["PYTHONPATH"] = os.pathsep.join([_probe_dir()] + [p for p in [env.get("PYTHONPATH")] if p])
+    return env
+
+
+def _display_prefix(env):
+    # tkinter needs an X server; use a virtual one when we have no display
+    if os.name == "nt" or env.get("DISPLAY"):
+        return []
+    if shutil.which("xvfb-run"):
+        return ["xvfb-run", "-a"]
+    return []
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _reap(process, usage, block=False):
+    """
+    wait for the process with os.wait4 so that its cpu time and peak memory are not lost
+    Returns: whether the process has exited
+    """
+    if process.returncode is not None:
+        return True
+    if not hasattr(os, "wait4"):
+        if block:
+            process.wait()
+        return process.poll() is not None
+    try:
+        pid, status, rusage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+    except ChildProcessError:
+        return process.poll() is not None
+    if pid == 0:
+        return False
+    process.returncode = _exit_code(status)
+    usage.user_time = rusage.ru_utime
+    usage.sys_time = rusage.ru_stime
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    usage.peak_rss_kb = max(usage.peak_rss_kb, peak_rss_kb)
+    return True
+
+
+def _process_tree(pid):
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir("/proc/{}/task".format(current)):
+                with open("/proc/{}/task/{}/children".format(current, task)) as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return pids
+
+
+def _sample(pid, usage, written):
+    """sample memory, process count and written bytes of the process tree from /proc"""
+    if not os.path.isdir("/proc/{}".format(pid)):
+        return
+    pids = _process_tree(pid)
+    usage.num_processes = max(usage.num_processes, len(pids))
+    rss_kb = 0
+    for current in pids:
+        try:
+            with open("/proc/{}/status".format(current)) as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        rss_kb = max(rss_kb, int(line.split()[1]))
+                        break
+            with open("/proc/{}/io".format(current)) as f:
+                for line in f:
+                    if line.startswith("wchar:"):
+                        written[current] = max(written.get(current, 0), int(line.split()[1]))
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+    usage.peak_rss_kb = max(usage.peak_rss_kb, rss_kb)
+    usage.bytes_written = sum(written.values())
+
+
+def _terminate(process, usage):
+    if _reap(process, usage):
+        return
+    try:
+        if "killpg" in dir(os):
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        else:
+            process.terminate()
+        deadline = time.time() + 1
+        while time.time() < deadline:
+            if _reap(process, usage):
+                return
+            time.sleep(0.01)
+        if "killpg" in dir(os):
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+    _reap(process, usage, block=True)
+
+
+def _limit_exceeded(returncode, limits):
+    if limits is None or returncode is None or returncode >= 0:
+        return None
+    if hasattr(signal, "SIGXCPU") and -returncode == signal.SIGXCPU:
+        return "max_cpu_seconds"
+    if hasattr(signal, "SIGXFSZ") and -returncode == signal.SIGXFSZ:
+        return "max_file_size_mb"
+    if -returncode == signal.SIGKILL and limits.max_cpu_seconds is not None:
+        return "max_cpu_seconds"
+    return None
+
+
+def run_program(directory, filename, timeout=3.0, settle=1.0, poll_interval=0.02, limits=None,
+                args=None, stop_when_alive=True):
+    """
+    run a generated program headlessly and stop it as soon as it is known to be healthy
+    Args:
+        directory: software directory, used as working directory
+        filename: python file to run
+        timeout: upper bound on how long a program that never exits is observed
+        settle: how long to keep observing after the main loop was reached, to catch errors in the first frames
+        poll_interval: interval for checking the process and the probe
+        limits: optional ResourceLimits enforced on the program
+        args: arguments for the interpreter, defaults to [filename]
+        stop_when_alive: stop the program once it reached its main loop, disable to let it run to completion
+
+    Returns:
+        RunResult
+    """
+    fd, probe_file = tempfile.mkstemp(prefix="agilecoder_probe_")
+    os.close(fd)
+    os.remove(probe_file)
+    env = headless_env(probe_file)
+    command = _display_prefix(env) + [PYTHON] + (args or [filename])
+    if limits is not None:
+        command = limits.wrap(command)
+    stdout_file = tempfile.TemporaryFile()
+    stderr_file = tempfile.TemporaryFile()
+    usage = ResourceUsage()
+    written = {}
+    start = time.time()
+    process = subprocess.Popen(command,
+                               cwd=directory,
+                               env=env,
+                               start_new_session=os.name != "nt",
+                               stdout=stdout_file,
+                               stderr=stderr_file)
+    alive = False
+    deadline = start + timeout
+    while time.time() < deadline:
+        _sample(process.pid, usage, written)
+        if _reap(process, usage):
+            break
+        if not alive and os.path.exists(probe_file):
+            alive = True
+            if stop_when_alive:
+                deadline = min(deadline, time.time() + settle)
+        time.sleep(poll_interval)
+    killed = process.returncode is None
+    _terminate(process, usage)
+    duration = time.time() - start
+    usage.wall_time = duration
+    usage.num_processes = max(usage.num_processes, 1)
+    if os.path.exists(probe_file):
+        alive = True
+        os.remove(probe_file)
+
+    def read(f):
+        f.seek(0)
+        content = f.read().decode("utf-8", errors="replace")
+        f.close()
+        return content
+
+    return RunResult(returncode=process.returncode,
+                     stdout=read(stdout_file),
+                     stderr=read(stderr_file),
+                     alive=alive,
+                     killed=killed,
+                     duration=duration,
+                     usage=usage,
+                     limit_exceeded=None if killed else _limit_exceeded(process.returncode, limits))
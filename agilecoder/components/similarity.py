@@ -0,0 +1,112 @@
+from collections import Counter
+from functools import lru_cache
+
+try:
+    from rapidfuzz.distance import Levenshtein as _rapidfuzz_levenshtein
+except ImportError:  # optional accelerator
+    _rapidfuzz_levenshtein = None
+
+QGRAM = 3
+
+
+def _myers_distance(a, b, max_distance=None):
+    # bit-parallel levenshtein distance (Myers 1999, Hyyro 2001), one big int per column
+    if len(a) > len(b):
+        a, b = b, a
+    m = len(a)
+    if m == 0:
+        return len(b)
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    remaining = len(b)
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        remaining -= 1
+        if max_distance is not None and score - remaining > max_distance:
+            return score - remaining
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def levenshtein(a, b, max_distance=None):
+    """
+    edit distance between two strings
+    Args:
+        max_distance: when given, any value above it may be returned as soon as the distance is known to exceed it
+    """
+    if _rapidfuzz_levenshtein is not None:
+        return _rapidfuzz_levenshtein.distance(a, b, score_cutoff=max_distance)
+    return _myers_distance(a, b, max_distance)
+
+
+def normalized_similarity(a, b):
+    """same value as strsimpy's NormalizedLevenshtein.similarity"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / longest
+
+
+@lru_cache(maxsize=256)
+def _profile(text):
+    return Counter(text), Counter(text[i:i + QGRAM] for i in range(len(text) - QGRAM + 1))
+
+
+def _distance_lower_bound(a, b):
+    # the length difference, the character bag distance and the q-gram lemma all bound the edit distance from below
+    chars_a, grams_a = _profile(a)
+    chars_b, grams_b = _profile(b)
+    longest = max(len(a), len(b))
+    bag = max(sum((chars_a - chars_b).values()), sum((chars_b - chars_a).values()))
+    common = sum((grams_a & grams_b).values())
+    qgram = -(-(longest - QGRAM + 1 - common) // QGRAM)
+    return max(abs(len(a) - len(b)), bag, qgram)
+
+
+def best_match(code, candidates, threshold=0.7):
+    """
+    find the candidate most similar to code by normalized levenshtein similarity
+    gives the same answer as scoring every candidate exactly, but skips the edit distance
+    for candidates whose similarity bound cannot beat the threshold or the best so far
+    Args:
+        code: string to match
+        candidates: dict of name to string, ties go to the first name
+        threshold: minimum similarity, exclusive
+
+    Returns:
+        (name, similarity) of the best candidate above threshold, or None
+    """
+    bounds = []
+    for index, (name, text) in enumerate(candidates.items()):
+        longest = max(len(code), len(text))
+        upper = 1.0 if longest == 0 else 1.0 - _distance_lower_bound(code, text) / longest
+        if upper > threshold:
+            bounds.append((upper, index, name, text, longest))
+    best = None
+    for upper, index, name, text, longest in sorted(bounds, key=lambda x: (-x[0], x[1])):
+        if best is not None and (upper < best[1] or (upper == best[1] and index > best[2])):
+            break
+        if longest == 0:
+            score = 1.0
+        else:
+            floor = threshold if best is None else best[1]
+            distance = levenshtein(code, text, max_distance=int((1.0 - floor) * longest) + 1)
+            score = 1.0 - distance / longest
+        if score > threshold and (best is None or score > best[1] or (score == best[1] and index < best[2])):
+            best = (name, score, index)
+    return None if best is None else best[:2]
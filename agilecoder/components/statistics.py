@@ -1,6 +1,137 @@
+import logging
 import os
-
-import numpy as np
+from typing import Callable, Dict, Tuple
+
+
+class RunStatistics:
+    """
+    the counters of get_info for one log, updated line by line as the records are logged,
+    so that a snapshot does not read the log again
+    """
+
+    def __init__(self):
+        self.num_start_chats = 0
+        self.num_chat_lines = 0
+        self.num_reflection = 0
+        # -1 until a line with the count was logged, like get_info always reported
+        self.num_prompt_tokens = -1
+        self.num_completion_tokens = -1
+        self.num_total_tokens = -1
+        self.num_test_runs = 0
+        self.test_wall_time = 0.0
+        self.test_cpu_time = 0.0
+        self.test_peak_rss_kb = 0
+        self.num_performance_regressions = 0
+        self.num_file_writes = 0
+
+    def update_line(self, line, record_start=False):
+        """
+        Args:
+            record_start: the line starts a record, in the log file it follows the time and level of the record
+        """
+        if "**[Start Chat]**" in line:
+            self.num_start_chats += 1
+        if "<->" in line:
+            self.num_chat_lines += 1
+        if "on : Reflection" in line:
+            self.num_reflection += 1
+        if "**[Performance Regression]**" in line:
+            self.num_performance_regressions += 1
+        if line.endswith(" Wrote"):
+            self.num_file_writes += 1
+        if record_start or not line.startswith(("prompt_tokens:", "completion_tokens:", "total_tokens:", "test_")):
+            return
+        value = line.split(": ")[-1]
+        if line.startswith("prompt_tokens:"):
+            self.num_prompt_tokens = max(self.num_prompt_tokens, 0) + int(value)
+        elif line.startswith("completion_tokens:"):
+            self.num_completion_tokens = max(self.num_completion_tokens, 0) + int(value)
+        elif line.startswith("total_tokens:"):
+            self.num_total_tokens = max(self.num_total_tokens, 0) + int(value)
+        elif line.startswith("test_wall_time:"):
+            self.num_test_runs += 1
+            self.test_wall_time += float(value)
+        elif line.startswith(("test_user_time:", "test_sys_time:")):
+            self.test_cpu_time += float(value)
+        elif line.startswith("test_peak_rss_kb:"):
+            self.test_peak_rss_kb = max(self.test_peak_rss_kb, int(value))
+
+    def update_record(self, message):
+        for i, line in enumerate(message.split("\n")):
+            self.update_line(line, record_start=i == 0)
+
+    @classmethod
+    def from_log(cls, log_filepath) -> "RunStatistics":
+        statistics = cls()
+        if os.path.exists(log_filepath):
+            with open(log_filepath, "r", encoding="utf8") as f:
+                for line in f:
+                    statistics.update_line(line.rstrip("\n"))
+        return statistics
+
+
+class StatisticsHandler(logging.Handler):
+    """feeds the records of the root logger to the statistics of the log of the run"""
+
+    def __init__(self, log_filepath, level=logging.NOTSET):
+        # every record that reaches the file of the log is counted
+        logging.Handler.__init__(self, level)
+        self.log_filepath = os.path.abspath(log_filepath)
+        # the lines logged before the handler was installed
+        self.statistics = RunStatistics.from_log(log_filepath)
+
+    def emit(self, record):
+        try:
+            self.statistics.update_record(record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+def install_statistics(log_filepath) -> StatisticsHandler:
+    """count the statistics of log_filepath as it is written, replacing the handler of a previous run"""
+    for handler in list(logging.root.handlers):
+        if isinstance(handler, StatisticsHandler):
+            logging.root.removeHandler(handler)
+    handler = StatisticsHandler(log_filepath)
+    logging.root.addHandler(handler)
+    return handler
+
+
+def run_statistics(log_filepath) -> RunStatistics:
+    log_filepath = os.path.abspath(log_filepath)
+    for handler in logging.root.handlers:
+        if isinstance(handler, StatisticsHandler) and handler.log_filepath == log_filepath:
+            return handler.statistics
+    # no run is logging to it, read it once
+    return RunStatistics.from_log(log_filepath)
+
+
+# (path, parser) -> (size, mtime_ns, parsed value), the project files are only read again when they changed
+_parsed_files: Dict[Tuple[str, str], Tuple[int, int, object]] = {}
+MAX_PARSED_FILES = 4096
+
+
+def parse_file(path, parser: Callable[[str], object]):
+    stat = os.stat(path)
+    key = (path, parser.__name__)
+    cached = _parsed_files.get(key)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    with open(path, "r", encoding="utf8") as f:
+        value = parser(f.read())
+    if len(_parsed_files) >= MAX_PARSED_FILES:
+        _parsed_files.clear()
+    _parsed_files[key] = (stat.st_size, stat.st_mtime_ns, value)
+    return value
+
+
+def count_lines(content):
+    return len([line for line in content.split("\n") if len(line.strip()) > 0])
+
+
+def code_version(content):
+    lines = content.split("\n")
+    return float([lines[i + 1] for i, line in enumerate(lines) if "Code_Version" in line][0]) + 1
 
 
 def get_info(dir, log_filepath):
@@ -13,12 +144,17 @@ def get_info(dir, log_filepath):
     code_lines = -1
     env_lines = -1
     manual_lines = -1
-    duration = -1
     num_utterance = -1
     num_reflection = -1
     num_prompt_tokens = -1
     num_completion_tokens = -1
     num_total_tokens = -1
+    num_test_runs = -1
+    test_wall_time = -1
+    test_cpu_time = -1
+    test_peak_rss_kb = -1
+    num_performance_regressions = -1
+    num_file_writes = -1
 
     if os.path.exists(dir):
         filenames = os.listdir(dir)
@@ -40,22 +176,19 @@ def get_info(dir, log_filepath):
         # print("num_doc_files:", num_doc_files)
 
         if "meta.txt" in filenames:
-            lines = open(os.path.join(dir, "meta.txt"), "r", encoding="utf8").read().split("\n")
-            version_updates = float([lines[i + 1] for i, line in enumerate(lines) if "Code_Version" in line][0]) + 1
+            version_updates = parse_file(os.path.join(dir, "meta.txt"), code_version)
         else:
             version_updates = -1
         # print("version_updates: ", version_updates)
 
         if "requirements.txt" in filenames:
-            lines = open(os.path.join(dir, "requirements.txt"), "r", encoding="utf8").read().split("\n")
-            env_lines = len([line for line in lines if len(line.strip()) > 0])
+            env_lines = parse_file(os.path.join(dir, "requirements.txt"), count_lines)
         else:
             env_lines = -1
         # print("env_lines:", env_lines)
 
         if "manual.md" in filenames:
-            lines = open(os.path.join(dir, "manual.md"), "r", encoding="utf8").read().split("\n")
-            manual_lines = len([line for line in lines if len(line.strip()) > 0])
+            manual_lines = parse_file(os.path.join(dir, "manual.md"), count_lines)
         else:
             manual_lines = -1
         # print("manual_lines:", manual_lines)
@@ -64,45 +197,22 @@ def get_info(dir, log_filepath):
         for filename in filenames:
             if filename.endswith(".py"):
                 # print("......filename:", filename)
-                lines = open(os.path.join(dir, filename), "r", encoding="utf8").read().split("\n")
-                code_lines += len([line for line in lines if len(line.strip()) > 0])
+                code_lines += parse_file(os.path.join(dir, filename), count_lines)
         # print("code_lines:", code_lines)
 
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-        start_lines = [line for line in lines if "**[Start Chat]**" in line]
-        chat_lines = [line for line in lines if "<->" in line]
-        num_utterance = len(start_lines) + len(chat_lines)
-        # print("num_utterance:", num_utterance)
-
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-        sublines = [line for line in lines if line.startswith("prompt_tokens:")]
-        if len(sublines) > 0:
-            nums = [int(line.split(": ")[-1]) for line in sublines]
-            num_prompt_tokens = np.sum(nums)
-            # print("num_prompt_tokens:", num_prompt_tokens)
-
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-        sublines = [line for line in lines if line.startswith("completion_tokens:")]
-        if len(sublines) > 0:
-            nums = [int(line.split(": ")[-1]) for line in sublines]
-            num_completion_tokens = np.sum(nums)
-            # print("num_completion_tokens:", num_completion_tokens)
-
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-        sublines = [line for line in lines if line.startswith("total_tokens:")]
-        if len(sublines) > 0:
-            nums = [int(line.split(": ")[-1]) for line in sublines]
-            num_total_tokens = np.sum(nums)
-            # print("num_total_tokens:", num_total_tokens)
-
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-
-        lines = open(log_filepath, "r", encoding="utf8").read().split("\n")
-        num_reflection = 0
-        for line in lines:
-            if "on : Reflection" in line:
-                num_reflection += 1
-        # print("num_reflection:", num_reflection)
+        statistics = run_statistics(log_filepath)
+        num_utterance = statistics.num_start_chats + statistics.num_chat_lines
+        num_prompt_tokens = statistics.num_prompt_tokens
+        num_completion_tokens = statistics.num_completion_tokens
+        num_total_tokens = statistics.num_total_tokens
+        num_reflection = statistics.num_reflection
+        num_test_runs = statistics.num_test_runs
+        if num_test_runs > 0:
+            test_wall_time = round(statistics.test_wall_time, 3)
+            test_cpu_time = round(statistics.test_cpu_time, 3)
+            test_peak_rss_kb = statistics.test_peak_rss_kb
+        num_performance_regressions = statistics.num_performance_regressions
+        num_file_writes = statistics.num_file_writes
 
     cost = 0.0
     if num_png_files != -1:
@@ -114,7 +224,7 @@ def get_info(dir, log_filepath):
 
     # info = f"🕑duration={duration}s 💰cost=${cost} 🔨version_updates={version_updates} 📃num_code_files={num_code_files} 🏞num_png_files={num_png_files} 📚num_doc_files={num_doc_files} 📃code_lines={code_lines} 📋env_lines={env_lines} 📒manual_lines={manual_lines} 🗣num_utterances={num_utterance} 🤔num_self_reflections={num_reflection} ❓num_prompt_tokens={num_prompt_tokens} ❗num_completion_tokens={num_completion_tokens} ⁉️num_total_tokens={num_total_tokens}"
 
-    info = "\n\n💰**cost**=${:.6f}\n\n🔨**version_updates**={}\n\n📃**num_code_files**={}\n\n🏞**num_png_files**={}\n\n📚**num_doc_files**={}\n\n📃**code_lines**={}\n\n📋**env_lines**={}\n\n📒**manual_lines**={}\n\n🗣**num_utterances**={}\n\n🤔**num_self_reflections**={}\n\n❓**num_prompt_tokens**={}\n\n❗**num_completion_tokens**={}\n\n🌟**num_total_tokens**={}" \
+    info = "\n\n💰**cost**=${:.6f}\n\n🔨**version_updates**={}\n\n📃**num_code_files**={}\n\n🏞**num_png_files**={}\n\n📚**num_doc_files**={}\n\n📃**code_lines**={}\n\n📋**env_lines**={}\n\n📒**manual_lines**={}\n\n🗣**num_utterances**={}\n\n🤔**num_self_reflections**={}\n\n❓**num_prompt_tokens**={}\n\n❗**num_completion_tokens**={}\n\n🌟**num_total_tokens**={}\n\n🧪**num_test_runs**={}\n\n⏱**test_wall_time**={}s\n\n⚙️**test_cpu_time**={}s\n\n🧠**test_peak_rss_kb**={}\n\n🐢**num_performance_regressions**={}\n\n✍️**num_file_writes**={}" \
         .format(cost,
                 version_updates,
                 num_code_files,
@@ -127,6 +237,12 @@ def get_info(dir, log_filepath):
                 num_reflection,
                 num_prompt_tokens,
                 num_completion_tokens,
-                num_total_tokens)
+                num_total_tokens,
+                num_test_runs,
+                test_wall_time,
+                test_cpu_time,
+                test_peak_rss_kb,
+                num_performance_regressions,
+                num_file_writes)
 
     return info
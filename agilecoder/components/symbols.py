@@ -0,0 +1,116 @@
+import ast
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class FileSymbols:
+    """what the consumers of the code need to know about a file, computed from a single parse"""
+    classes: List[str] = field(default_factory=list)
+    functions: List[str] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+    entry_point: bool = False
+    # functions whose body is only pass or ..., besides a docstring
+    stubs: List[str] = field(default_factory=list)
+    # a line that is only "pass", as CodeComplete looked for before the index existed
+    has_pass: bool = False
+    syntax_error: Optional[str] = None
+
+    @property
+    def unimplemented(self):
+        return len(self.stubs) > 0 if self.syntax_error is None else self.has_pass
+
+
+def _is_stub(body):
+    placeholders = 0
+    for node in body:
+        if isinstance(node, ast.Pass):
+            placeholders += 1
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and node.value.value is Ellipsis:
+            placeholders += 1
+        elif not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+            return False
+    return placeholders > 0
+
+
+def _has_entry_point(tree):
+    # standalone code, including if __name__ == "__main__":, outside of functions and classes
+    for node in ast.iter_child_nodes(tree):
+        if not isinstance(node, (ast.Expr, ast.Import, ast.ImportFrom, ast.Module, ast.FunctionDef, ast.ClassDef)):
+            return True
+    return False
+
+
+def _walk(node):
+    # depth first, so that names come in the order of the source
+    yield node
+    for child in ast.iter_child_nodes(node):
+        yield from _walk(child)
+
+
+def summarize(code, filename="<unknown>") -> FileSymbols:
+    """parse a python file once and collect its classes, functions, imports, entry point and stubs"""
+    symbols = FileSymbols(has_pass=any(line.strip() == "pass" for line in code.split("\n")))
+    try:
+        tree = ast.parse(code, filename=filename)
+    except (SyntaxError, ValueError) as e:
+        symbols.syntax_error = str(e)
+        return symbols
+    symbols.entry_point = _has_entry_point(tree)
+    for node in _walk(tree):
+        if isinstance(node, ast.ClassDef):
+            symbols.classes.append(node.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.functions.append(node.name)
+            if _is_stub(node.body):
+                symbols.stubs.append(node.name)
+        elif isinstance(node, ast.Import):
+            symbols.imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            symbols.imports.append("." * node.level + (node.module or ""))
+    return symbols
+
+
+class SymbolIndex:
+    """
+    symbols of the files of the software keyed by the digest of their content,
+    a file is parsed when its content changes and every consumer reads the same summary
+    """
+
+    def __init__(self, max_summaries=256):
+        # filename -> digest of its latest content
+        self.files: Dict[str, str] = {}
+        # digest -> symbols, the content on disk and in memory may differ until the next rewrite
+        self.summaries: Dict[str, FileSymbols] = {}
+        self.max_summaries = max_summaries
+        self.num_parses = 0
+
+    @staticmethod
+    def digest(code):
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def update(self, filename, code, digest=None) -> FileSymbols:
+        """index the new content of filename, parsing it only when this content was never seen"""
+        digest = digest or self.digest(code)
+        self.files[filename] = digest
+        symbols = self.summaries.get(digest)
+        if symbols is None:
+            symbols = summarize(code, filename) if filename.endswith(".py") else FileSymbols()
+            self.num_parses += 1
+            if len(self.summaries) >= self.max_summaries:
+                current = set(self.files.values())
+                self.summaries = {key: value for key, value in self.summaries.items() if key in current}
+            self.summaries[digest] = symbols
+        return symbols
+
+    def lookup(self, digest) -> Optional[FileSymbols]:
+        return self.summaries.get(digest)
+
+    def get(self, filename) -> Optional[FileSymbols]:
+        """symbols of the latest content of filename"""
+        digest = self.files.get(filename)
+        return None if digest is None else self.summaries.get(digest)
+
+    def remove(self, filename):
+        self.files.pop(filename, None)
@@ -0,0 +1,137 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+FRAME_PATTERN = re.compile(r'^\s*File "(.*?)", line (\d+)(?:, in (.*))?$')
+EXCEPTION_PATTERN = re.compile(r'^([A-Za-z_][\w.]*)(?::\s?(.*))?$')
+SECTION_PATTERN = re.compile(r'^Error Traceback for Running (.*?):$')
+ENTRY_POINT_ERROR = "[Error] the software lacks an entry point to start"
+
+MISSING_MODULE_PATTERN = re.compile(r"No module named '([^']+)'")
+CANNOT_IMPORT_PATTERN = re.compile(r"cannot import name '(\w+)' from '([\w.]+)'")
+NAME_PATTERN = re.compile(r"name '(\w+)' is not defined")
+ATTRIBUTE_PATTERN = re.compile(r"(?:module |type object )?'([\w.]+)'(?: object)? has no attribute '(\w+)'")
+
+
+@dataclass
+class Frame:
+    filename: str
+    lineno: int
+    function: str
+    source: str = ""
+
+
+@dataclass
+class ErrorRecord:
+    exception_type: str
+    message: str
+    # the program whose run produced this error
+    command: str = ""
+    frames: List[Frame] = field(default_factory=list)
+    missing_module: Optional[str] = None
+    # undefined name, name that cannot be imported or missing attribute
+    missing_symbol: Optional[str] = None
+    # class or module that misses missing_symbol, for AttributeError/ImportError
+    owner: Optional[str] = None
+
+    @property
+    def files(self):
+        return [frame.filename for frame in self.frames]
+
+
+def _fill_details(record):
+    message = record.message
+    match = MISSING_MODULE_PATTERN.search(message)
+    if match:
+        record.missing_module = match.group(1)
+        return
+    match = CANNOT_IMPORT_PATTERN.search(message)
+    if match:
+        record.missing_symbol, record.owner = match.group(1), match.group(2)
+        return
+    match = NAME_PATTERN.search(message)
+    if match:
+        record.missing_symbol = match.group(1)
+        return
+    match = ATTRIBUTE_PATTERN.search(message)
+    if match:
+        record.owner, record.missing_symbol = match.group(1), match.group(2)
+
+
+def parse_test_reports(test_reports):
+    """turn the output of ChatEnv.exist_bugs into a list of ErrorRecord"""
+    records = []
+    command = ""
+    frames = None
+    lines = test_reports.splitlines()
+    for i, line in enumerate(lines):
+        section = SECTION_PATTERN.match(line)
+        if section:
+            command = section.group(1)
+            frames = None
+            continue
+        if line.strip() == ENTRY_POINT_ERROR:
+            records.append(ErrorRecord("EntryPointError", line.strip(), command=command))
+            continue
+        if line.startswith("Traceback (most recent call last)"):
+            frames = []
+            continue
+        if frames is None:
+            continue
+        frame = FRAME_PATTERN.match(line)
+        if frame:
+            frames.append(Frame(frame.group(1), int(frame.group(2)), (frame.group(3) or "").strip()))
+            continue
+        if line.startswith(" "):
+            # source line of the previous frame, or a caret marker
+            if frames and not frames[-1].source and line.strip().strip("^~ "):
+                frames[-1].source = line.strip()
+            continue
+        exception = EXCEPTION_PATTERN.match(line)
+        if exception:
+            record = ErrorRecord(exception.group(1), (exception.group(2) or "").strip(), command=command, frames=frames)
+            _fill_details(record)
+            records.append(record)
+            frames = None
+    return records
+
+
+class TracebackIndex:
+    """
+    structured view over a test report, built once and queried by the test phases
+    records are indexed by exception type and by file of any of their frames
+    """
+
+    def __init__(self, records: List[ErrorRecord] = None):
+        self.records: List[ErrorRecord] = records or []
+        self.by_type: Dict[str, List[ErrorRecord]] = defaultdict(list)
+        self.by_file: Dict[str, List[ErrorRecord]] = defaultdict(list)
+        for record in self.records:
+            self.by_type[record.exception_type.split(".")[-1]].append(record)
+            for filename in dict.fromkeys(record.files):
+                self.by_file[filename].append(record)
+
+    @classmethod
+    def parse(cls, test_reports):
+        return cls(parse_test_reports(test_reports or ""))
+
+    def __len__(self):
+        return len(self.records)
+
+    def has(self, *exception_types):
+        return any(exception_type in self.by_type for exception_type in exception_types)
+
+    def of_type(self, exception_type):
+        return self.by_type.get(exception_type, [])
+
+    def files(self, project_only=True):
+        """files appearing in the frames, in order of first appearance"""
+        return [filename for filename in self.by_file
+                if not project_only or not (filename.startswith("/") or filename.startswith("<"))]
+
+    def missing_modules(self):
+        return [record.missing_module for record in self.records if record.missing_module]
+
+    def owners(self, exception_type):
+        return [record.owner for record in self.of_type(exception_type) if record.owner]
@@ -0,0 +1,213 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SERVICE_NAME = "agilecoder"
+
+
+class Span:
+    """a timed operation of a run, in the span model of OpenTelemetry, used as a context manager"""
+    __slots__ = ("tracer", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "thread_id", "error",
+                 "_token")
+
+    def __init__(self, tracer, name, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start_ns = self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = "{}: {}".format(exc_type.__name__, exc_value)
+        self.tracer.exporter.export(self, self.tracer)
+        return False
+
+
+class NoopSpan:
+    """the span of a run that is not traced, does nothing"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("agilecoder_span", default=None)
+
+
+def to_otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class ChromeTraceExporter:
+    """
+    writes the spans as complete events of the chrome trace format, the file opens as a flame chart in
+    chrome://tracing or ui.perfetto.dev, which also accept the file of a run that did not close it
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._first = True
+        self._pid = os.getpid()
+
+    def export(self, span: Span, tracer):
+        event = {"name": span.name, "cat": SERVICE_NAME, "ph": "X", "ts": span.start_ns / 1000,
+                 "dur": (span.end_ns - span.start_ns) / 1000, "pid": self._pid, "tid": span.thread_id,
+                 "args": dict(span.attributes, error=span.error) if span.error else span.attributes}
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line if self._first else ",\n" + line)
+            self._first = False
+
+    def close(self):
+        with self._lock:
+            self._file.write("\n]\n")
+            self._file.close()
+
+
+class OTLPJsonExporter:
+    """writes the spans in the OTLP/JSON encoding, one ExportTraceServiceRequest of up to batch_size spans a line"""
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._spans: List[Dict[str, Any]] = []
+
+    def export(self, span: Span, tracer):
+        otlp_span = {"traceId": tracer.trace_id, "spanId": span.span_id, "name": span.name, "kind": 1,
+                     "startTimeUnixNano": str(span.start_ns), "endTimeUnixNano": str(span.end_ns),
+                     "attributes": [{"key": key, "value": to_otlp_value(value)} for key, value in span.attributes.items()],
+                     "status": {"code": 2, "message": span.error} if span.error else {"code": 1}}
+        if span.parent_id is not None:
+            otlp_span["parentSpanId"] = span.parent_id
+        with self._lock:
+            self._spans.append(otlp_span)
+            if len(self._spans) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": self._spans}]}]}
+        self._file.write(json.dumps(request, default=str) + "\n")
+        self._file.flush()
+        self._spans = []
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+
+EXPORTERS = {"chrome": (ChromeTraceExporter, ".trace.json"), "otlp": (OTLPJsonExporter, ".otlp.jsonl")}
+
+
+class Tracer:
+    def __init__(self, exporter):
+        self.exporter = exporter
+        # one trace a run
+        self.trace_id = os.urandom(16).hex()
+
+    def start_span(self, name, attributes) -> Span:
+        return Span(self, name, _current.get(), attributes)
+
+
+# None when the run is not traced, then the spans cost a global lookup
+_tracer: Optional[Tracer] = None
+
+
+def span(name, **attributes):
+    """
+    a span around the block of a with statement, nested in the span of the enclosing block
+    Returns:
+        the span, which does nothing when the run is not traced
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start_span(name, attributes)
+
+
+def current_span():
+    """the innermost open span, to add attributes known only inside of it"""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name):
+    """run the decorated function in a span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.start_span(name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def install_tracing(log_filepath, format="chrome", sample_rate=1.0) -> Optional[Tracer]:
+    """
+    trace the run into a file next to its log, a run is traced with probability sample_rate
+    Returns:
+        the tracer, None when the run was not sampled
+    """
+    global _tracer
+    shutdown_tracing()
+    if random.random() >= sample_rate:
+        return None
+    exporter_class, suffix = EXPORTERS[format]
+    _tracer = Tracer(exporter_class(os.path.splitext(log_filepath)[0] + suffix))
+    return _tracer
+
+
+def shutdown_tracing():
+    """write the pending spans and stop tracing"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.exporter.close()
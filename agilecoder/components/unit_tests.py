@@ -0,0 +1,240 @@
+import fnmatch
+import functools
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agilecoder.components.runner import PYTHON, run_program
+
+UNIT_TEST_PATTERNS = ["test_*.py", "*_test.py"]
+
+# executed in a fresh interpreter for every test file, it runs unittest cases and
+# plain test_* functions one by one and writes per-test results as json
+DRIVER_SOURCE = r'''
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+import traceback
+import unittest
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def run_file(path):
+    results = []
+    name = os.path.splitext(os.path.basename(path))[0]
+    start = time.time()
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    except BaseException:
+        return [{"name": name, "outcome": "error", "duration": time.time() - start, "message": traceback.format_exc()}]
+
+    for test in iter_tests(unittest.defaultTestLoader.loadTestsFromModule(module)):
+        result = unittest.TestResult()
+        start = time.time()
+        test.run(result)
+        outcome, message = "passed", ""
+        if result.failures:
+            outcome, message = "failed", result.failures[0][1]
+        elif result.errors:
+            outcome, message = "error", result.errors[0][1]
+        elif result.skipped:
+            outcome, message = "skipped", result.skipped[0][1]
+        results.append({"name": test.id().split(".", 1)[-1], "outcome": outcome,
+                        "duration": time.time() - start, "message": message})
+
+    for function_name, function in inspect.getmembers(module, inspect.isfunction):
+        if not function_name.startswith("test") or function.__module__ != module.__name__:
+            continue
+        if any(parameter.default is inspect.Parameter.empty for parameter in inspect.signature(function).parameters.values()):
+            continue
+        start = time.time()
+        outcome, message = "passed", ""
+        try:
+            function()
+        except AssertionError:
+            outcome, message = "failed", traceback.format_exc()
+        except BaseException:
+            outcome, message = "error", traceback.format_exc()
+        results.append({"name": function_name, "outcome": outcome, "duration": time.time() - start, "message": message})
+    return results
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    output = run_file(sys.argv[1])
+    with open(sys.argv[2], "w") as f:
+        json.dump(output, f)
+'''
+
+
+@dataclass
+class UnitTestResult:
+    file: str
+    name: str
+    # passed, failed, error or skipped
+    outcome: str
+    duration: float
+    message: str = ""
+
+    @property
+    def ok(self):
+        return self.outcome in ("passed", "skipped")
+
+
+def is_unit_test_file(filename):
+    # also accepts commands such as "-m pytest test_game.py"
+    filename = filename.split()[-1] if filename.strip() else filename
+    return any(fnmatch.fnmatch(os.path.basename(filename), pattern) for pattern in UNIT_TEST_PATTERNS)
+
+
+def project_traceback(message, directory):
+    """drop the frames of the test framework and the standard library from a traceback"""
+    lines = []
+    skipping = False
+    for line in message.replace(directory + "/", "").splitlines():
+        frame = re.match(r'^\s*File "(.*?)", line \d+', line)
+        if frame:
+            skipping = os.path.isabs(frame.group(1))
+            if skipping:
+                continue
+        elif skipping and line.startswith("    "):
+            continue
+        else:
+            skipping = False
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _driver_path():
+    path = os.path.join(tempfile.gettempdir(), "agilecoder_probe", "agilecoder_unit_driver.py")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path) or open(path, encoding="utf-8").read() != DRIVER_SOURCE:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as writer:
+            writer.write(DRIVER_SOURCE)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _run_file(directory, test_file, timeout, limits):
+    fd, output_path = tempfile.mkstemp(prefix="agilecoder_unit_", suffix=".json")
+    os.close(fd)
+    try:
+        result = run_program(directory, test_file, timeout=timeout, limits=limits,
+                             args=[_driver_path(), test_file, output_path], stop_when_alive=False)
+        with open(output_path, encoding="utf-8") as f:
+            content = f.read()
+        if result.killed:
+            return [UnitTestResult(test_file, test_file, "error", result.duration,
+                                   "[Error] the tests did not finish within {} seconds".format(timeout))]
+        if len(content) == 0:
+            return [UnitTestResult(test_file, test_file, "error", result.duration, result.stderr)]
+        return [UnitTestResult(file=test_file, **item) for item in json.loads(content)]
+    finally:
+        os.remove(output_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _interpreter_has_module(interpreter, name):
+    try:
+        completed = subprocess.run([interpreter, "-c", "import importlib.util, sys; "
+                                    "sys.exit(importlib.util.find_spec(sys.argv[1]) is None)", name],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return completed.returncode == 0
+
+
+def _has_module(name):
+    """whether the interpreter that runs the tests can import name"""
+    interpreter = shutil.which(PYTHON)
+    return interpreter is not None and _interpreter_has_module(interpreter, name)
+
+
+def _run_pytest(directory, test_files, timeout, limits, workers):
+    fd, report_path = tempfile.mkstemp(prefix="agilecoder_junit_", suffix=".xml")
+    os.close(fd)
+    args = ["-m", "pytest", "-q", "-p", "no:cacheprovider", "--tb=native", "--junitxml", report_path]
+    if _has_module("xdist") and workers > 1:
+        args += ["-n", str(workers)]
+    try:
+        result = run_program(directory, test_files[0], timeout=timeout, limits=limits,
+                             args=args + list(test_files), stop_when_alive=False)
+        if result.killed:
+            return [UnitTestResult(test_file, test_file, "error", result.duration,
+                                   "[Error] the tests did not finish within {} seconds".format(timeout))
+                    for test_file in test_files]
+        results = parse_junit_xml(report_path)
+        # exit code 5: no tests were collected
+        if len(results) == 0 and result.returncode not in (0, 5):
+            return [UnitTestResult(test_files[0], test_files[0], "error", result.duration, result.stderr or result.stdout)]
+        return results
+    finally:
+        os.remove(report_path)
+
+
+def parse_junit_xml(path):
+    results = []
+    try:
+        root = ET.parse(path).getroot()
+    except (ET.ParseError, OSError):
+        return results
+    for case in root.iter("testcase"):
+        classname = case.get("classname", "")
+        file = case.get("file") or classname.split(".")[0] + ".py"
+        outcome, message = "passed", ""
+        for tag, name in [("failure", "failed"), ("error", "error"), ("skipped", "skipped")]:
+            element = case.find(tag)
+            if element is not None:
+                outcome, message = name, element.text or element.get("message", "")
+                break
+        results.append(UnitTestResult(file=file, name=case.get("name", ""), outcome=outcome,
+                                      duration=float(case.get("time", 0) or 0), message=message))
+    return results
+
+
+def run_unit_tests(directory, test_files, timeout=60.0, limits=None, workers=None, use_pytest=True):
+    """
+    run generated unit test files in parallel
+    Args:
+        directory: software directory
+        test_files: test files relative to directory
+        timeout: time budget for each test file (or the whole pytest session)
+        limits: optional ResourceLimits for every worker process
+        workers: number of parallel workers, defaults to the number of cpus
+        use_pytest: use pytest (with pytest-xdist workers when installed) if it is available
+
+    Returns:
+        list of UnitTestResult
+    """
+    test_files = sorted(test_files)
+    if len(test_files) == 0:
+        return []
+    workers = workers or os.cpu_count() or 1
+    if use_pytest and _has_module("pytest"):
+        return _run_pytest(directory, test_files, timeout, limits, workers)
+    results = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(test_files))) as executor:
+        for file_results in executor.map(lambda test_file: _run_file(directory, test_file, timeout, limits), test_files):
+            results.extend(file_results)
+    return results
+
@@ -1,69 +1,47 @@
-import html
 import logging
-import re
 import time
 
-import markdown
 import inspect
 from agilecoder.camel.messages.system_messages import SystemMessage
+from agilecoder.components import events
+from agilecoder.components.log_buffer import latest_record
 from agilecoder.online_log.app import send_msg, send_online_log
+from agilecoder.online_log.shipper import get_shipper
 
 
-import ast
-import os
-import glob
-class ClassCollector(ast.NodeVisitor):
-    def __init__(self):
-        self.classes = []
-
-    def visit_ClassDef(self, node):
-        self.classes.append(node.name)
-        self.generic_visit(node)
-
-def get_classes_in_file(file_path):
-    with open(file_path, 'r') as file:
-        try:
-            tree = ast.parse(file.read(), filename=file_path)
-        except SyntaxError as e:
-            print(f"Syntax error in file {file_path}: {e}")
-            return None
-
-    class_collector = ClassCollector()
-    class_collector.visit(tree)
-
-    return class_collector.classes
-def get_classes_in_folder(folder_path):
-    paths = glob.glob(f'{folder_path}/*.py')
-    outputs = {}
-    for path in paths:
-        outputs[os.path.basename(path)] = get_classes_in_file(path)
-    return outputs
-
 def now():
     return time.strftime("%Y%m%d%H%M%S", time.localtime())
 
 
+def send_latest_log():
+    record = latest_record()
+    if record is not None:
+        send_online_log(record)
+
+
+def table_cell(value):
+    # the viewer renders the markdown, a value only has to fit in one cell
+    return str(value).replace("\n", " ").replace("|", "\\|")
+
+
 def log_and_print_online(role, content=None):
     if not content:
-        logging.info(role + "\n")
-        send_online_log(logging.root.handlers[-1].buffer[-1])
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info(role + "\n")
+            send_latest_log()
         send_msg("System", role)
         # print(role + "\n")
     else:
         # print(str(role) + ": " + str(content) + "\n")
-        logging.info(str(role) + ": " + str(content) + "\n")
-        send_online_log(logging.root.handlers[-1].buffer[-1])
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info(str(role) + ": " + str(content) + "\n")
+            send_latest_log()
+        if not get_shipper().accepting:
+            # the online log is down, nothing to render for it
+            return
         if isinstance(content, SystemMessage):
-            records_kv = []
             content.meta_dict["content"] = content.content
-            for key in content.meta_dict:
-                value = content.meta_dict[key]
-                value = str(value) 
-                value = html.unescape(value)
-                value = markdown.markdown(value)
-                value = re.sub(r'<[^>]*>', '', value)
-                value = value.replace("\n", " ")
-                records_kv.append([key, value])
+            records_kv = [[key, table_cell(value)] for key, value in content.meta_dict.items()]
             content = "**[SystemMessage**]\n\n" + convert_to_markdown_table(records_kv)
         else:
             role = str(role)
@@ -85,26 +63,19 @@ def convert_to_markdown_table(records_kv):
 
 
 def log_arguments(func):
+    """emit the arguments of each call as a FunctionCalled event, they are only rendered by a debug level sink"""
+    names = None
+
     def wrapper(*args, **kwargs):
-        sig = inspect.signature(func)
-        params = sig.parameters
-
-        all_args = {}
-        all_args.update({name: value for name, value in zip(params.keys(), args)})
-        all_args.update(kwargs)
-
-        records_kv = []
-        for name, value in all_args.items():
-            if name in ["self", "chat_env", "task_type"]:
-                continue
-            value = str(value)
-            value = html.unescape(value)
-            value = markdown.markdown(value)
-            value = re.sub(r'<[^>]*>', '', value)
-            value = value.replace("\n", " ")
-            records_kv.append([name, value])
-        records = f"**[{func.__name__}]**\n\n" + convert_to_markdown_table(records_kv)
-        # log_and_print_online("System", records)
+        nonlocal names
+        if events.enabled(logging.DEBUG):
+            if names is None:
+                names = list(inspect.signature(func).parameters.keys())
+            all_args = {name: value for name, value in zip(names, args)}
+            all_args.update(kwargs)
+            for name in ["self", "chat_env", "task_type"]:
+                all_args.pop(name, None)
+            events.emit(events.FunctionCalled(func.__name__, all_args))
 
         return func(*args, **kwargs)
 
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import struct
+import subprocess
+import tempfile
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+FILE_MODE = "100644"
+EXECUTABLE_MODE = "100755"
+TREE_MODE = "40000"
+# never versioned, like the .gitignore of a python project
+IGNORED_DIRECTORIES = {".git", "__pycache__"}
+
+
+class GitRepository:
+    """
+    writes git objects, the index and the branch ref directly, so that a snapshot of the
+    software costs a few file writes instead of spawning git processes
+    only the files staged or changed since they were staged are hashed, the other tracked files keep the blobs
+    of the previous commit
+    """
+
+    def __init__(self, directory, branch="main"):
+        self.directory = directory
+        self.git_dir = os.path.join(directory, ".git")
+        self.branch = branch
+        # tracked path -> (mode, blob sha)
+        self.entries: Dict[str, Tuple[str, str]] = {}
+        # tracked path -> (size, mtime) when it was hashed
+        self.stats: Dict[str, Tuple[int, int]] = {}
+        self.staged = set()
+        self.head: Optional[str] = None
+        self.detached = False
+        if os.path.exists(os.path.join(self.git_dir, "HEAD")):
+            self._load()
+        else:
+            self._init()
+
+    def _init(self):
+        for name in ["objects", os.path.join("refs", "heads"), os.path.join("refs", "tags")]:
+            os.makedirs(os.path.join(self.git_dir, name), exist_ok=True)
+        self._write_file("HEAD", "ref: refs/heads/{}\n".format(self.branch).encode())
+        self._write_file("config", b"[core]\n\trepositoryformatversion = 0\n\tfilemode = true\n\tbare = false\n")
+        os.makedirs(os.path.join(self.git_dir, "info"), exist_ok=True)
+        self._write_file(os.path.join("info", "exclude"),
+                         "".join(name + "/\n" for name in sorted(IGNORED_DIRECTORIES - {".git"})).encode())
+
+    def _load(self):
+        with open(os.path.join(self.git_dir, "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            self.head, self.detached = head, True
+        else:
+            self.branch = head[len("ref: refs/heads/"):]
+            self.head = self._read_ref(head[len("ref: "):])
+        if self.head is None:
+            return
+        try:
+            tree = self._read_object(self.head).split(b"\n", 1)[0].split()[1].decode()
+            self._load_tree(tree, "")
+        except (OSError, zlib.error, IndexError):
+            # packed objects, let git list the tree once
+            self.entries = {}
+            try:
+                output = subprocess.run(["git", "ls-tree", "-r", "-z", self.head], cwd=self.directory,
+                                        capture_output=True, check=True).stdout.decode("utf-8")
+            except (OSError, subprocess.CalledProcessError):
+                return
+            for line in filter(None, output.split("\0")):
+                meta, path = line.split("\t", 1)
+                mode, _, sha = meta.split()
+                self.entries[path] = (mode, sha)
+
+    def _read_ref(self, ref):
+        path = os.path.join(self.git_dir, ref)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read().strip()
+        packed = os.path.join(self.git_dir, "packed-refs")
+        if os.path.exists(packed):
+            with open(packed, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip().endswith(" " + ref):
+                        return line.split()[0]
+        return None
+
+    def _read_object(self, sha):
+        with open(os.path.join(self.git_dir, "objects", sha[:2], sha[2:]), "rb") as f:
+            data = zlib.decompress(f.read())
+        return data[data.index(b"\0") + 1:]
+
+    def _load_tree(self, sha, prefix):
+        data = self._read_object(sha)
+        position = 0
+        while position < len(data):
+            space = data.index(b" ", position)
+            nul = data.index(b"\0", space)
+            mode, name = data[position:space].decode(), data[space + 1:nul].decode("utf-8")
+            entry_sha = data[nul + 1:nul + 21].hex()
+            position = nul + 21
+            if mode == TREE_MODE:
+                self._load_tree(entry_sha, prefix + name + "/")
+            else:
+                self.entries[prefix + name] = (mode, entry_sha)
+
+    def _write_file(self, name, content: bytes):
+        path = os.path.join(self.git_dir, name)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _write_object(self, kind, content: bytes) -> str:
+        data = "{} {}\0".format(kind, len(content)).encode() + content
+        sha = hashlib.sha1(data).hexdigest()
+        path = os.path.join(self.git_dir, "objects", sha[:2], sha[2:])
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_file(os.path.relpath(path, self.git_dir), zlib.compress(data, 1))
+        return sha
+
+    def _hash_file(self, path) -> Tuple[str, str]:
+        filepath = os.path.join(self.directory, path)
+        stat = os.stat(filepath)
+        with open(filepath, "rb") as f:
+            sha = self._write_object("blob", f.read())
+        self.stats[path] = (stat.st_size, stat.st_mtime_ns)
+        return EXECUTABLE_MODE if os.access(filepath, os.X_OK) else FILE_MODE, sha
+
+    def stage(self, paths):
+        """hash the given files of the working directory, paths are relative to the directory"""
+        for path in paths:
+            path = path.replace(os.sep, "/")
+            if not os.path.exists(os.path.join(self.directory, path)):
+                self.entries.pop(path, None)
+                self.stats.pop(path, None)
+            else:
+                self.entries[path] = self._hash_file(path)
+            self.staged.add(path)
+
+    def stage_all(self):
+        """stage the files of the working directory that were added, changed or removed, like git add ."""
+        present = set()
+        for root, dirnames, filenames in os.walk(self.directory):
+            dirnames[:] = [dirname for dirname in dirnames if dirname not in IGNORED_DIRECTORIES]
+            for filename in filenames:
+                filepath = os.path.join(root, filename)
+                path = os.path.relpath(filepath, self.directory).replace(os.sep, "/")
+                present.add(path)
+                stat = os.stat(filepath)
+                if self.stats.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                entry = self._hash_file(path)
+                if self.entries.get(path) != entry:
+                    self.entries[path] = entry
+                    self.staged.add(path)
+        for path in list(self.entries):
+            if path not in present:
+                del self.entries[path]
+                self.stats.pop(path, None)
+                self.staged.add(path)
+
+    def _write_tree(self, entries):
+        children = {}
+        files = {}
+        for path, entry in entries.items():
+            if "/" in path:
+                directory, rest = path.split("/", 1)
+                children.setdefault(directory, {})[rest] = entry
+            else:
+                files[path] = entry
+        items = [(name, mode, sha) for name, (mode, sha) in files.items()]
+        items += [(name, TREE_MODE, self._write_tree(child)) for name, child in children.items()]
+        # git orders directories as if their name ended with a slash
+        items.sort(key=lambda item: item[0] + "/" if item[1] == TREE_MODE else item[0])
+        content = b"".join("{} {}\0".format(mode, name).encode("utf-8") + bytes.fromhex(sha) for name, mode, sha in items)
+        return self._write_object("tree", content)
+
+    def _write_index(self):
+        entries = []
+        for path in sorted(self.entries, key=lambda path: path.encode("utf-8")):
+            mode, sha = self.entries[path]
+            try:
+                stat = os.stat(os.path.join(self.directory, path))
+                fields = [int(stat.st_ctime), stat.st_ctime_ns % 10 ** 9, int(stat.st_mtime), stat.st_mtime_ns % 10 ** 9,
+                          stat.st_dev, stat.st_ino, int(mode, 8), stat.st_uid, stat.st_gid, stat.st_size]
+            except OSError:
+                fields = [0] * 6 + [int(mode, 8), 0, 0, 0]
+            name = path.encode("utf-8")
+            entry = struct.pack(">10I20sH", *[field & 0xFFFFFFFF for field in fields], bytes.fromhex(sha),
+                                min(len(name), 0xFFF)) + name
+            entries.append(entry + b"\0" * (8 - len(entry) % 8))
+        content = b"DIRC" + struct.pack(">II", 2, len(entries)) + b"".join(entries)
+        self._write_file("index", content + hashlib.sha1(content).digest())
+
+    def commit(self, message) -> Optional[str]:
+        """commit the staged files, returns the new commit sha or None when nothing was staged"""
+        if len(self.staged) == 0:
+            return None
+        tree = self._write_tree(self.entries)
+        name = os.environ.get("GIT_AUTHOR_NAME", "AgileCoder")
+        email = os.environ.get("GIT_AUTHOR_EMAIL", "agilecoder@localhost")
+        signature = "{} <{}> {} +0000".format(name, email, int(time.time()))
+        lines = ["tree " + tree] + (["parent " + self.head] if self.head else [])
+        lines += ["author " + signature, "committer " + signature, "", message, ""]
+        self.head = self._write_object("commit", "\n".join(lines).encode("utf-8"))
+        self._write_file("HEAD" if self.detached else os.path.join("refs", "heads", self.branch), (self.head + "\n").encode())
+        self._write_index()
+        self.staged = set()
+        return self.head
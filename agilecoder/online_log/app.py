@@ -1,18 +1,22 @@
 import sys
 import base64
 sys.path.append('..')
+import itertools
+import json
 import logging
+import re
+import threading
 import base64
 from flask import send_file
-from io import BytesIO
-import zipfile
-from zipfile import ZipFile
-import requests
 import subprocess
 import os
 import argparse
-import concurrent.futures
-from flask import Flask, send_from_directory, request, jsonify, redirect, render_template, url_for, make_response
+from flask import Flask, Response, send_from_directory, request, jsonify, redirect, render_template, url_for, make_response
+from agilecoder.components import metrics
+from agilecoder.online_log.archive import ArchiveCache
+from agilecoder.online_log.jobs import FINISHED, JobQueue
+from agilecoder.online_log.event_store import KINDS, EventStore, default_store_path
+from agilecoder.online_log.shipper import get_shipper
 
 
 app = Flask(__name__, static_folder='static')
@@ -22,32 +26,34 @@ app.logger.setLevel(logging.ERROR)
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 
-messages = []
-logs = []
-num_logs = 0
+# messages and logs of all the runs, ids keep increasing across runs so that the cursor of a viewer
+# never skips the events of a new run
+store = None
+# the run shown by default, events that do not name their run belong to it
+current_run = None
+# runs registered in the store by this server, a run is registered when its first event arrives
+known_runs = set()
+# notified when events are added, wakes up the streams
+events_added = threading.Condition()
+# number of appends to the store, a stream waits for it to change, the store is never queried under events_added
+num_appends = 0
+# seconds between two keep-alive comments of an idle stream
+KEEPALIVE = 15
+# most events sent at once by a stream
+STREAM_CHUNK = 500
+# names of the software and of the organization of a task, they become a directory of the warehouse
+SAFE_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
 
-folder_name = None
+# runs of the tasks submitted to /process-task
+jobs = None
+# zips of the downloaded projects, by fingerprint of their tree
+archives = None
+# both only queue the event, the shipper thread posts it in a batch to /send_batch
 def send_msg(role, text):
-    try:
-        data = {"role": role, "text": text}
-        response = requests.post("http://127.0.0.1:8000/send_message", json=data)
-        # if response.status_code == 200:
-        #     print("Message sent successfully!")
-        # else:
-        #     print("Failed to send message.")
-    except:
-        logging.info("flask app.py did not start for online log")
+    get_shipper().submit("message", role=role, text=text)
 
 def send_online_log(log):
-    try:
-        data = {"log": log}
-        response = requests.post("http://127.0.0.1:8000/send_log", json=data)
-        # if response.status_code == 200:
-        #     print("LOGGG sent successfully!")
-        # else:
-        #     print("Failed to send message.")
-    except:
-        logging.info("flask app.py did not start for online log")
+    get_shipper().submit("log", log=log)
 
 # @app.route("/")
 # def index():
@@ -63,97 +69,288 @@ def send_online_log(log):
 # def replay():
 #     return render_template("replay.html", file = None, folder_name = None)
 
+def get_store():
+    # opened on first use, the runs import this module only to send their logs
+    global store
+    if store is not None:
+        return store
+    with events_added:
+        if store is None:
+            store = EventStore(default_store_path())
+        return store
+
+
+def start_run(run=None):
+    """make run, a new one by default, the current run"""
+    global current_run
+    with events_added:
+        current_run = get_store().new_run(run)
+        known_runs.add(current_run)
+        return current_run
+
+
+def events_after(kind, after=None, limit=None, run=None):
+    """
+    the events of kind "messages" or "logs" with an id greater than after
+    Args:
+        after: the id of the last event a viewer has, None for all of them
+        limit: at most that many events
+        run: the current run by default
+    """
+    run = run or current_run
+    if run is None:
+        return []
+    return get_store().after(run, kind, after, limit)
+
+
+def query_events(kind):
+    return jsonify(events_after(kind, request.args.get("after", type=int), request.args.get("limit", type=int),
+                                request.args.get("run")))
+
+
 @app.route("/get_messages")
 def get_messages():
-    return jsonify(messages)
+    return query_events("messages")
 
 
 @app.route("/get_logs")
 def get_logs():
-    return jsonify(logs)
+    return query_events("logs")
+
+
+@app.route("/runs")
+def runs():
+    runs = get_store().runs()
+    latest = max(runs, key=lambda run: run["created"])["run"] if runs else None
+    return jsonify({"current": current_run, "latest": latest, "runs": runs})
 
 
+@app.route("/stream/<kind>")
+def stream(kind):
+    """
+    server-sent events of kind "messages" or "logs", starting after the id given by ?after= or by the
+    Last-Event-ID header of a reconnecting EventSource, of the run given by ?run= or else of the current run
+    """
+    if kind not in KINDS:
+        return "unknown stream", 404
+    after = request.args.get("after", type=int)
+    run = request.args.get("run")
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id is not None and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    def generate(after):
+        while True:
+            seen = num_appends
+            pending = events_after(kind, after, STREAM_CHUNK, run)
+            if len(pending) == 0:
+                with events_added:
+                    # events appended since the query changed num_appends, then it does not wait
+                    events_added.wait_for(lambda: num_appends != seen, timeout=KEEPALIVE)
+                pending = events_after(kind, after, STREAM_CHUNK, run)
+            if len(pending) == 0:
+                yield ": keep-alive\n\n"
+                continue
+            yield "".join("id: {}\nevent: {}\ndata: {}\n\n".format(event["id"], kind, json.dumps(event))
+                          for event in pending)
+            after = pending[-1]["id"]
+
+    return Response(generate(after), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+
+def get_jobs():
+    global jobs
+    with events_added:
+        if jobs is None:
+            from run_api import run_task
+            jobs = JobQueue(run_task, default_store_path(), max_workers=int(os.environ.get("AGILECODER_MAX_JOBS", 2)))
+            metrics.REGISTRY.gauge("agilecoder_jobs", "Jobs of the server by status.", ["status"]).set_function(
+                lambda: {(status,): count for status, count in jobs.counts().items()})
+            # the jobs queued before a restart
+            jobs.start()
+        return jobs
+
+def invalid_argument(args):
+    """the error of the arguments of a task, None when they are valid"""
+    from run_api import args2type
+    if not isinstance(args["task"], str):
+        return "task must be a string"
+    for key in ("name", "org"):
+        if not isinstance(args[key], str) or not SAFE_NAME.fullmatch(args[key]):
+            return "{} must be 1 to 64 letters, digits, '_' or '-'".format(key)
+    config_root = os.path.join(os.path.dirname(os.path.dirname(__file__)), "CompanyConfig")
+    if args["config"] not in os.listdir(config_root):
+        return "unknown config {!r}".format(args["config"])
+    if not isinstance(args["model"], str) or args["model"] not in args2type:
+        return "unknown model {!r}".format(args["model"])
+    return None
+
+def job_state(job):
+    state = job.to_dict()
+    state["position"] = get_jobs().position(job)
+    return state
 
 @app.route('/process-task', methods = ['POST'])
 def process_task():
-    global messages, logs, folder_name
-    if request.method == 'POST':
-        logs, messages = [], []
-        # print(request.get_json())
-        task = request.get_json().get('task')
-        # project = request.get_json().get('project')
-
-        parser = argparse.ArgumentParser(description='argparse')
-        parser.add_argument('--config', type=str, default="Agile",
-                            help="Name of config, which is used to load configuration under CompanyConfig/")
-        parser.add_argument('--org', type=str, default="DefaultOrganization",
-                            help="Name of organization, your software will be generated in WareHouse/name_org_timestamp")
-        parser.add_argument('--task', type=str, default="Develop a basic Gomoku game.",
-                            help="Prompt of software")
-        parser.add_argument('--name', type=str, default="Gomoku",
-                            help="Name of software, your software will be generated in WareHouse/name_org_timestamp")
-        parser.add_argument('--model', type=str, default="GPT_3_5_AZURE",
-                            help="GPT Model, choose from {'GPT_3_5_TURBO','GPT_4','GPT_4_32K', 'GPT_3_5_AZURE'}")
-        args = parser.parse_args()
-        args.task = task
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(run_task, args)
-            return_value = future.result()
-            folder_name = return_value
-    #     folder_name = os.path.basename(dir_path)
-    #     full_path = os.path.join(dir_path, folder_name + '.log')
-    #     with open(full_path) as f:
-    #         content = f.read().encode()
-    #     content = base64.b64encode(content).decode('utf-8')
-    #     return render_template("replay.html", file = content, folder_name = dir_path)
-    # else:
-    return 'Form data received successfully!'
+    # print(request.get_json())
+    data = request.get_json()
+    # project = request.get_json().get('project')
+
+    parser = argparse.ArgumentParser(description='argparse')
+    parser.add_argument('--config', type=str, default="Agile",
+                        help="Name of config, which is used to load configuration under CompanyConfig/")
+    parser.add_argument('--org', type=str, default="DefaultOrganization",
+                        help="Name of organization, your software will be generated in WareHouse/name_org_timestamp")
+    parser.add_argument('--task', type=str, default="Develop a basic Gomoku game.",
+                        help="Prompt of software")
+    parser.add_argument('--name', type=str, default="Gomoku",
+                        help="Name of software, your software will be generated in WareHouse/name_org_timestamp")
+    parser.add_argument('--model', type=str, default="GPT_3_5_AZURE",
+                        help="GPT Model, choose from {'GPT_3_5_TURBO','GPT_4','GPT_4_32K', 'GPT_3_5_AZURE'}")
+    args = vars(parser.parse_args())
+    args.update((key, data[key]) for key in ("task", "name", "org", "config", "model") if data.get(key))
+    error = invalid_argument(args)
+    if error is not None:
+        return error, 400
+    # the request returns right away, the run goes on in a worker process of the job queue
+    job = get_jobs().submit(args)
+    # the events of the run are stored under the id of the job
+    start_run(job.id)
+    return jsonify(job_state(job)), 202
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify([job_state(job) for job in get_jobs().list()])
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return "unknown job", 404
+    return jsonify(job_state(job))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if get_jobs().get(job_id) is None:
+        return "unknown job", 404
+    get_jobs().cancel(job_id)
+    return jsonify(job_state(get_jobs().get(job_id)))
+
+@app.route('/jobs/<job_id>/stream')
+def stream_job(job_id):
+    """server-sent events with the state of the job at each change, until it finished"""
+    job = get_jobs().get(job_id)
+    if job is None:
+        return "unknown job", 404
+
+    def generate():
+        state = None
+        while state is None or state["status"] not in FINISHED:
+            new_state = get_jobs().wait(job_id, state, timeout=KEEPALIVE)
+            if new_state == state:
+                yield ": keep-alive\n\n"
+                continue
+            state = new_state
+            state["position"] = get_jobs().position(get_jobs().get(job_id))
+            yield "event: job\ndata: {}\n\n".format(json.dumps(state))
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/download')
 def download():
-    # folder_name = request.args.get('folder_name')
-    all_files = os.listdir(folder_name)
-    stream = BytesIO()
-    with ZipFile(stream, 'w') as zf:
-        for file in all_files:
-            zf.write(os.path.join(folder_name, file), os.path.basename(file))
-    stream.seek(0)
-
-    return send_file(
-        stream,
-        download_name='downloaded.zip',
-        as_attachment=True,
-        mimetype='application/zip'
-    )
+    # the project of the given job, or of the latest job that succeeded
+    job = get_jobs().get(request.args.get('job', ''))
+    folder_name = job.result if job is not None else get_jobs().latest_result()
+    if folder_name is None:
+        return "no project to download", 404
+    archive = get_archives().get(folder_name)
+    if archive is not None:
+        return send_file(
+            archive,
+            download_name='downloaded.zip',
+            as_attachment=True,
+            mimetype='application/zip'
+        )
+    # streamed with chunked transfer while it is written to the cache
+    return Response(get_archives().stream(folder_name), mimetype='application/zip',
+                    headers={"Content-Disposition": "attachment; filename=downloaded.zip"})
 
-@app.route("/send_message", methods=["POST"])
-def send_message():
-    data = request.get_json()
-    role = data.get("role")
-    text = data.get("text")
+def get_archives():
+    global archives
+    if archives is None:
+        archives = ArchiveCache()
+    return archives
 
+def add_events(kind, events, run=None):
+    """
+    store events of kind "messages" or "logs" in run, the current run by default
+    the events of concurrent jobs name their run, they do not change the current run
+    """
+    global num_appends
+    with events_added:
+        if run is None:
+            run = current_run or start_run()
+        elif run not in known_runs:
+            get_store().new_run(run)
+            known_runs.add(run)
+    stored = get_store().append(run, kind, events)
+    with events_added:
+        num_appends += 1
+        events_added.notify_all()
+    return stored
+
+def add_message(role, text, run=None):
     avatarUrl = find_avatar_url(role)
 
     message = {"role": role, "text": text, "avatarUrl": avatarUrl}
-    messages.append(message)
-    return jsonify(message)
+    return add_events("messages", [message], run)[0]
+
+def add_log(log, run=None):
+    return add_events("logs", [{"log": log}], run)[0]
+
+@app.route("/send_message", methods=["POST"])
+def send_message():
+    data = request.get_json()
+    return jsonify(add_message(data.get("role"), data.get("text"), data.get("run")))
 
 @app.route('/refresh-detected')
 def refresh_detected():
     # folder_name = request.args.get('folder_name')
-    global messages, logs, num_logs
-    messages, logs = [], []
-    num_logs = 0
+    # the stored runs stay, the viewer starts over on a new one
+    start_run()
     return "delete cache"
 
 @app.route("/send_log", methods=["POST"])
 def send_log():
-    global num_logs
     data = request.get_json()
-    log = data.get("log")
-    num_logs += 1
-    log = {"log": log, 'id': num_logs}
-    logs.append(log)
-    return jsonify(log)
+    return jsonify(add_log(data.get("log"), data.get("run")))
+
+@app.route("/send_event", methods=["POST"])
+def send_event():
+    metrics.observe(request.get_json().get("record", {}))
+    return jsonify({"received": 1})
+
+@app.route("/metrics")
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/send_batch", methods=["POST"])
+def send_batch():
+    events = request.get_json().get("events", [])
+    # consecutive events of the same kind and run are stored in one transaction
+    for (kind, run), group in itertools.groupby(events, key=lambda event: (event.get("kind"), event.get("run"))):
+        if kind == "message":
+            add_events("messages", [{"role": event.get("role"), "text": event.get("text"),
+                                     "avatarUrl": find_avatar_url(event.get("role"))} for event in group], run)
+        elif kind == "event":
+            for event in group:
+                metrics.observe(event.get("record", {}))
+        else:
+            add_events("logs", [{"log": event.get("log")} for event in group], run)
+    return jsonify({"received": len(events)})
 
 def find_avatar_url(role):
     role = role.replace(" ", "%20")
@@ -163,6 +360,5 @@ def find_avatar_url(role):
 
 
 if __name__ == "__main__":
-    from run_api import run_task
     print("please visit http://127.0.0.1:8000/ for demo")
     app.run(debug=True, port=8000)
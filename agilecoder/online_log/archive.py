@@ -0,0 +1,141 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+# assets that deflate does not shrink, they are stored as they are
+COMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".mp3", ".mp4", ".ogg", ".wav",
+                         ".zip", ".gz", ".bz2", ".xz", ".7z", ".jar", ".whl", ".pdf", ".woff", ".woff2"}
+
+
+class ChunkSink:
+    """a write only file for zipfile, the written bytes are taken out by the generator that streams them"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def list_tree(root) -> List[Tuple[str, str]]:
+    """(path, name in the archive) of the files under root, sorted by name"""
+    files = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            files.append((path, os.path.relpath(path, root).replace(os.sep, "/")))
+    return files
+
+
+def tree_fingerprint(root, prefix="") -> str:
+    """hash of the names, sizes and modification times of the files under root, it changes with any file"""
+    digest = hashlib.sha256(prefix.encode())
+    for path, name in list_tree(root):
+        stat = os.stat(path)
+        digest.update("{}\0{}\0{}\n".format(name, stat.st_size, stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def iter_zip(root, prefix="", chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    the zip of the files under root, produced chunk by chunk, memory stays constant whatever the size of the files
+    Args:
+        prefix: directory of the files in the archive
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path, name in list_tree(root):
+            info = zipfile.ZipInfo.from_file(path, prefix + name)
+            if os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                while True:
+                    data = src.read(chunk_size)
+                    if not data:
+                        break
+                    dst.write(data)
+                    if sink.chunks:
+                        yield sink.take()
+            # the data descriptor of the file
+            if sink.chunks:
+                yield sink.take()
+    # the central directory
+    yield sink.take()
+
+
+class ArchiveCache:
+    """
+    zips of project trees, kept on disk under the fingerprint of the tree, an unchanged project is served
+    from its archive, a changed one is streamed to the client and saved on the way
+    """
+
+    def __init__(self, directory=None, max_archives=32):
+        self.directory = directory or os.environ.get("AGILECODER_ARCHIVE_CACHE",
+                                                     os.path.join(tempfile.gettempdir(), "agilecoder-archives"))
+        self.max_archives = max_archives
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, root, prefix="") -> str:
+        return os.path.join(self.directory, tree_fingerprint(root, prefix) + ".zip")
+
+    def get(self, root, prefix="") -> Optional[str]:
+        """the archive of the tree as it is now, None when it was not built yet"""
+        path = self.path(root, prefix)
+        if not os.path.exists(path):
+            return None
+        # the archives used last are evicted last
+        os.utime(path)
+        return path
+
+    def stream(self, root, prefix="") -> Iterator[bytes]:
+        """the chunks of the zip of the tree, which is added to the cache once it was streamed completely"""
+        path = self.path(root, prefix)
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter_zip(root, prefix):
+                    f.write(chunk)
+                    yield chunk
+            os.replace(partial, path)
+        finally:
+            # the client went away before the end
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.evict()
+
+    def build(self, root, prefix="") -> str:
+        """the path of the archive of the tree, built if needed"""
+        path = self.get(root, prefix)
+        if path is None:
+            for _ in self.stream(root, prefix):
+                pass
+            path = self.path(root, prefix)
+        return path
+
+    def evict(self):
+        archives = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".zip")]
+        archives.sort(key=lambda path: os.stat(path).st_mtime)
+        for path in archives[:max(0, len(archives) - self.max_archives)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
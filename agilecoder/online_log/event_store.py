@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+KINDS = ("messages", "logs")
+DAY = 24 * 60 * 60
+
+
+class Tail:
+    """the latest events of one kind of one run, every event of the run with an id greater than floor is kept"""
+
+    def __init__(self, floor, complete):
+        self.floor = floor
+        # True while the tail holds all the events of the run
+        self.complete = complete
+        self.ids: List[int] = []
+        self.events: List[Dict] = []
+
+    def append(self, event, size):
+        self.ids.append(event["id"])
+        self.events.append(event)
+        # trimmed by chunks so that appending stays constant time on average
+        if len(self.events) > 2 * size:
+            self.floor = self.ids[-size - 1]
+            self.complete = False
+            del self.ids[:-size], self.events[:-size]
+
+    def covers(self, after):
+        return self.complete or after >= self.floor
+
+    def after(self, after, limit=None):
+        start = bisect_right(self.ids, after)
+        return self.events[start:] if limit is None else self.events[start:start + limit]
+
+
+class EventStore:
+    """
+    messages and logs of the online log, stored by run in a sqlite database in WAL mode
+    ids increase across all the runs, so that one cursor follows a viewer from a run to the next
+    the latest tail_size events of the cached_runs most recently used runs are also kept in memory,
+    older runs are only read from the database, which is bounded by the retention policy:
+    at most max_runs runs, none older than max_age seconds and max_events_per_run events of each kind a run,
+    applied when the store is opened and then every retention_interval appended events
+    """
+
+    def __init__(self, path=":memory:", tail_size=1000, cached_runs=4, max_runs=100, max_age=14 * DAY,
+                 max_events_per_run=100000, retention_interval=1000):
+        self.path = path
+        self.tail_size = tail_size
+        self.cached_runs = cached_runs
+        self.max_runs = max_runs
+        self.max_age = max_age
+        self.max_events_per_run = max_events_per_run
+        self.retention_interval = retention_interval
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS runs (run TEXT PRIMARY KEY, created REAL, updated REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, run TEXT, "
+                         "kind TEXT, time REAL, data TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_by_run ON events (run, kind, id)")
+        # the ids of deleted runs are not reused
+        row = self._db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+        self.last_id = 0 if row is None else row[0]
+        # run -> kind -> tail, the most recently used run last
+        self._tails: "OrderedDict[str, Dict[str, Tail]]" = OrderedDict()
+        self._appended = 0
+        self.apply_retention()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def new_run(self, run=None) -> str:
+        """register a run, named after the current time unless run is given"""
+        run = run or time.strftime("%Y%m%d%H%M%S") + "_{}".format(self.last_id)
+        with self._lock:
+            now = time.time()
+            self._db.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", (run, now, now))
+        return run
+
+    def _tail(self, run, kind) -> Tail:
+        tails = self._tails.get(run)
+        if tails is None:
+            tails = self._tails[run] = {}
+            while len(self._tails) > self.cached_runs:
+                self._tails.popitem(last=False)
+        self._tails.move_to_end(run)
+        if kind not in tails:
+            stored = self._db.execute("SELECT 1 FROM events WHERE run = ? AND kind = ? LIMIT 1",
+                                      (run, kind)).fetchone()
+            # later events of the run all go through append, so they are all kept from now on
+            tails[kind] = Tail(self.last_id, complete=stored is None)
+        return tails[kind]
+
+    def append(self, run, kind, events: List[Dict]) -> List[Dict]:
+        """
+        store events of one kind in one transaction
+        Returns:
+            the stored events, with their id and run
+        """
+        stored = []
+        with self._lock:
+            # before the insert, which would make the new tail of a run look like it missed earlier events
+            tail = self._tail(run, kind)
+            now = time.time()
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("INSERT INTO runs VALUES (?, ?, ?) ON CONFLICT (run) DO UPDATE SET updated = ?",
+                                 (run, now, now, now))
+                for event in events:
+                    cursor = self._db.execute("INSERT INTO events (run, kind, time, data) VALUES (?, ?, ?, ?)",
+                                              (run, kind, now, json.dumps(event)))
+                    stored.append(dict(event, id=cursor.lastrowid, run=run))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            for event in stored:
+                tail.append(event, self.tail_size)
+            if stored:
+                self.last_id = stored[-1]["id"]
+            self._appended += len(stored)
+            if self._appended >= self.retention_interval:
+                self.apply_retention()
+        return stored
+
+    def after(self, run, kind, after=None, limit=None) -> List[Dict]:
+        """
+        events of one kind of a run with an id greater than after, oldest first
+        Args:
+            after: id of the last event the caller has, None for all of them
+            limit: at most that many events, None for no limit
+        """
+        after = after or 0
+        with self._lock:
+            tails = self._tails.get(run)
+            tail = tails.get(kind) if tails is not None else None
+            if tail is not None and tail.covers(after):
+                self._tails.move_to_end(run)
+                return tail.after(after, limit)
+            rows = self._db.execute("SELECT id, data FROM events WHERE run = ? AND kind = ? AND id > ? "
+                                    "ORDER BY id LIMIT ?", (run, kind, after, -1 if limit is None else limit))
+            return [dict(json.loads(data), id=id, run=run) for id, data in rows]
+
+    def runs(self) -> List[Dict]:
+        """the runs, the most recently updated first"""
+        with self._lock:
+            rows = self._db.execute("SELECT run, created, updated FROM runs ORDER BY updated DESC").fetchall()
+            counts: Dict[Tuple[str, str], int] = {
+                (run, kind): count for run, kind, count in
+                self._db.execute("SELECT run, kind, COUNT(*) FROM events GROUP BY run, kind")}
+        return [{"run": run, "created": created, "updated": updated,
+                 "num_messages": counts.get((run, "messages"), 0), "num_logs": counts.get((run, "logs"), 0)}
+                for run, created, updated in rows]
+
+    def latest_run(self) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT run FROM runs ORDER BY updated DESC LIMIT 1").fetchone()
+        return None if row is None else row[0]
+
+    def delete_run(self, run):
+        with self._lock:
+            self._db.execute("DELETE FROM events WHERE run = ?", (run,))
+            self._db.execute("DELETE FROM runs WHERE run = ?", (run,))
+            self._tails.pop(run, None)
+
+    def apply_retention(self):
+        """drop the runs beyond max_runs or older than max_age, and the oldest events of runs that are too long"""
+        with self._lock:
+            self._appended = 0
+            expired = [run for run, in self._db.execute(
+                "SELECT run FROM runs WHERE updated < ? UNION SELECT run FROM runs WHERE run NOT IN "
+                "(SELECT run FROM runs ORDER BY updated DESC LIMIT ?)", (time.time() - self.max_age, self.max_runs))]
+            for run in expired:
+                self.delete_run(run)
+            long_runs = self._db.execute("SELECT run, kind FROM events GROUP BY run, kind HAVING COUNT(*) > ?",
+                                         (self.max_events_per_run,)).fetchall()
+            for run, kind in long_runs:
+                cutoff, = self._db.execute("SELECT id FROM events WHERE run = ? AND kind = ? ORDER BY id DESC "
+                                           "LIMIT 1 OFFSET ?", (run, kind, self.max_events_per_run)).fetchone()
+                self._db.execute("DELETE FROM events WHERE run = ? AND kind = ? AND id <= ?", (run, kind, cutoff))
+                tail = self._tails.get(run, {}).get(kind)
+                if tail is not None and tail.floor < cutoff:
+                    # the tail must not serve the deleted events
+                    start = bisect_right(tail.ids, cutoff)
+                    del tail.ids[:start], tail.events[:start]
+                    tail.floor = cutoff
+                    tail.complete = False
+
+
+def default_store_path():
+    return os.environ.get("AGILECODER_EVENT_STORE", "online_log_events.db")
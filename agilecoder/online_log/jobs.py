@@ -0,0 +1,246 @@
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from agilecoder.online_log.event_store import DAY
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    id: str
+    # arguments of the run, as a dict of the argparse namespace
+    arguments: Dict[str, Any]
+    status: str = QUEUED
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    # the directory of the software once the run succeeded
+    result: Optional[str] = None
+    error: Optional[str] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class ConnectionSink:
+    """
+    an event sink of the run in the worker process, forwards the events that the server follows to it through a
+    pipe, the threads of the run share the pipe
+    """
+    # the kinds of the events read by JobQueue._progress
+    FORWARDED = {"phase_started"}
+
+    def __init__(self, connection, level=logging.INFO):
+        self.connection = connection
+        self.level = level
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self.connection.send(message)
+
+    def write(self, record):
+        if record.get("event") in self.FORWARDED:
+            self.send(("event", record))
+
+    def close(self):
+        pass
+
+
+def run_job(target, job_id, arguments, connection):
+    """entry point of the worker process of a job"""
+    import argparse
+    from agilecoder.components import events
+    # the online log keeps the events of the job under its id
+    os.environ["AGILECODER_RUN_ID"] = job_id
+    sink = ConnectionSink(connection)
+    events.add_sink(sink)
+    try:
+        sink.send((SUCCEEDED, target(argparse.Namespace(**arguments))))
+    except BaseException:
+        sink.send((FAILED, traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+class JobQueue:
+    """
+    runs the tasks submitted to the server, each one in its own process so that runs do not share the globals of
+    the logging and of the chain, at most max_workers at once, the others wait in a queue kept in sqlite, which
+    survives a restart of the server
+    """
+
+    def __init__(self, target: Callable, path=":memory:", max_workers=2, max_age=14 * DAY):
+        self.target = target
+        self.max_workers = max_workers
+        self.max_age = max_age
+        # notified on every change of a job, wakes up the workers and the streams of the jobs
+        self.changed = threading.Condition()
+        self.jobs: Dict[str, Job] = {}
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, created REAL, data TEXT)")
+        self._load()
+        self._workers: List[threading.Thread] = []
+
+    def _load(self):
+        expired = time.time() - self.max_age
+        for job_id, data in self._db.execute("SELECT id, data FROM jobs ORDER BY created").fetchall():
+            job = Job(**json.loads(data))
+            if job.status in FINISHED and (job.finished or job.created) < expired:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                continue
+            if job.status == RUNNING:
+                # the process of the run died with the server, the queued jobs are run again
+                job.status, job.finished, job.error = FAILED, time.time(), "interrupted by a restart of the server"
+                self._save(job)
+            self.jobs[job_id] = job
+
+    def _save(self, job: Job):
+        self._db.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job.id, job.created, json.dumps(job.to_dict())))
+
+    def start(self):
+        with self.changed:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name="agilecoder-job-worker", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def submit(self, arguments: Dict[str, Any]) -> Job:
+        job = Job(id=uuid.uuid4().hex[:12], arguments=arguments, created=time.time())
+        with self.changed:
+            self.jobs[job.id] = job
+            self._save(job)
+            self.changed.notify_all()
+        self.start()
+        return job
+
+    def get(self, job_id) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """the jobs, the latest first"""
+        return sorted(self.jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def position(self, job: Job) -> Optional[int]:
+        """number of queued jobs before job, None when it is not queued"""
+        if job.status != QUEUED:
+            return None
+        return sum(1 for other in self.jobs.values() if other.status == QUEUED and other.created < job.created)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        for job in list(self.jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+    def latest_result(self) -> Optional[str]:
+        for job in self.list():
+            if job.status == SUCCEEDED:
+                return job.result
+        return None
+
+    def cancel(self, job_id) -> bool:
+        with self.changed:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            process = self._processes.get(job_id)
+            if process is not None:
+                process.terminate()
+            self._finish(job, CANCELLED)
+            return True
+
+    def wait(self, job_id, version: Dict[str, Any], timeout=None) -> Dict[str, Any]:
+        """the state of the job once it differs from version, or after timeout seconds"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.jobs[job_id].to_dict() != version, timeout=timeout)
+            return self.jobs[job_id].to_dict()
+
+    def _finish(self, job: Job, status, result=None, error=None):
+        if job.status in FINISHED:
+            return
+        job.status, job.result, job.error, job.finished = status, result, error, time.time()
+        self._save(job)
+        self.changed.notify_all()
+
+    def _next(self) -> Job:
+        with self.changed:
+            while True:
+                queued = [job for job in self.jobs.values() if job.status == QUEUED]
+                if queued:
+                    job = min(queued, key=lambda job: job.created)
+                    job.status, job.started = RUNNING, time.time()
+                    self._save(job)
+                    self.changed.notify_all()
+                    return job
+                self.changed.wait()
+
+    def _work(self):
+        context = multiprocessing.get_context("spawn")
+        while True:
+            job = self._next()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_job, args=(self.target, job.id, job.arguments, sender),
+                                      name="agilecoder-job-" + job.id, daemon=True)
+            started = False
+            try:
+                with self.changed:
+                    process.start()
+                    started = True
+                    self._processes[job.id] = process
+                sender.close()
+                self._follow(job, receiver)
+            except Exception:
+                with self.changed:
+                    self._finish(job, FAILED, error=traceback.format_exc())
+            finally:
+                # a process that failed to start cannot be joined
+                if started:
+                    process.join()
+                else:
+                    sender.close()
+                receiver.close()
+                with self.changed:
+                    self._processes.pop(job.id, None)
+                    # the process ended without reporting, killed or crashed
+                    self._finish(job, FAILED, error="the run exited with code {}".format(process.exitcode))
+
+    def _follow(self, job: Job, receiver):
+        while True:
+            try:
+                kind, payload = receiver.recv()
+            except EOFError:
+                return
+            with self.changed:
+                if kind == "event":
+                    self._progress(job, payload)
+                elif kind == SUCCEEDED:
+                    self._finish(job, SUCCEEDED, result=payload)
+                else:
+                    self._finish(job, FAILED, error=payload)
+
+    def _progress(self, job: Job, record):
+        if record.get("event") != "phase_started":
+            return
+        job.progress = {"phase": record.get("phase"), "cycle": record.get("cycle"),
+                        "num_phases": job.progress.get("num_phases", 0) + (not record.get("composed"))}
+        self._save(job)
+        self.changed.notify_all()
@@ -0,0 +1,184 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+URL = "http://127.0.0.1:8000"
+
+
+class LogShipper:
+    """
+    sends logs and messages to the online log viewer from a background thread, in batches over one
+    keep-alive session, the callers only put events in a bounded queue and never wait for the network
+    when the queue is full the oldest events are dropped, when the viewer does not answer the circuit
+    opens and events are dropped without any attempt until cooldown seconds passed
+    """
+
+    def __init__(self, url=URL, max_queue=10000, batch_size=200, flush_interval=0.1, timeout=2.0,
+                 failure_threshold=2, cooldown=30.0):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self.num_sent = 0
+        self.num_dropped = 0
+        self.failures = 0
+        self.open_until = 0.0
+        # False when the viewer has no /send_batch route, events are then posted one by one
+        self.batching = True
+        # name of the run the events belong to, the viewer keeps the events of each run apart
+        self.run_id: Optional[str] = None
+        self._notice: Optional[str] = None
+        self._session: Optional[requests.Session] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def circuit_open(self):
+        return time.monotonic() < self.open_until
+
+    @property
+    def accepting(self):
+        """whether submitted events have a chance to be sent, to skip rendering them otherwise"""
+        return not self.circuit_open
+
+    def submit(self, kind, **payload) -> bool:
+        """queue an event of kind "log", "message" or "event", returns False when it was dropped"""
+        if self._notice is not None:
+            # reported from the caller thread, the log handlers are not written from the shipper
+            notice, self._notice = self._notice, None
+            logging.info(notice)
+        if self.circuit_open:
+            self.num_dropped += 1
+            return False
+        self._ensure_thread()
+        event = dict(payload, kind=kind)
+        if self.run_id is not None:
+            event["run"] = self.run_id
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return True
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self.num_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _ensure_thread(self):
+        # a forked child inherits the shipper object but not its thread, which may also have died
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._session = None
+                self._thread = threading.Thread(target=self._run, name="agilecoder-log-shipper", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[Dict]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                if self.circuit_open:
+                    self.num_dropped += len(batch)
+                else:
+                    self._send(batch)
+            except Exception:
+                # an event that is not JSON serializable or an error inside requests loses its batch, not the thread
+                self.num_dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _post(self, route, data):
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session.post(self.url + route, json=data, timeout=self.timeout)
+
+    def _send(self, batch):
+        try:
+            if self.batching:
+                response = self._post("/send_batch", {"events": batch})
+                if response.status_code == 404:
+                    self.batching = False
+                elif response.status_code >= 500:
+                    response.raise_for_status()
+            if not self.batching:
+                for event in batch:
+                    if event["kind"] == "message":
+                        self._post("/send_message", {"role": event["role"], "text": event["text"],
+                                                     "run": event.get("run")})
+                    elif event["kind"] == "event":
+                        self._post("/send_event", {"record": event["record"], "run": event.get("run")})
+                    else:
+                        self._post("/send_log", {"log": event["log"], "run": event.get("run")})
+        except requests.RequestException:
+            self.num_dropped += len(batch)
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+                self.failures = 0
+                self._session = None
+                self._notice = "flask app.py did not start for online log, retrying in {:g}s".format(self.cooldown)
+            return
+        self.failures = 0
+        self.num_sent += len(batch)
+
+    def flush(self, timeout=5.0) -> bool:
+        """wait until the queued events were sent or dropped, returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks > 0:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+class ShipperSink:
+    """an event sink that sends the records of the structured events to the online log, which keeps metrics of them"""
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def write(self, record):
+        get_shipper().submit("event", record=record)
+
+    def close(self):
+        pass
+
+
+_shipper: Optional[LogShipper] = None
+_shipper_lock = threading.Lock()
+
+
+def get_shipper() -> LogShipper:
+    global _shipper
+    with _shipper_lock:
+        if _shipper is None:
+            _shipper = LogShipper()
+            # the last events of a run, like <FINISH>, are delivered before the interpreter exits
+            atexit.register(_shipper.flush, 2.0)
+        return _shipper
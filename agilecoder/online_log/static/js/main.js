@@ -64,19 +64,46 @@ function parseCodeBlocks(text, role) {
 }
 
 
-function get_new_messages() {
-
-  $.getJSON("/get_messages", function (data) {
-    var lastDisplayedMessageIndex = $("#chat-box .message-container").length;
+// id of the last displayed message, only newer messages are fetched
+var lastMessageId = 0;
+// the run shown by this page, the messages of concurrent runs are not mixed into it
+var followedRun = null;
+
+function show_message(message) {
+  if (message.id <= lastMessageId) {
+    return;
+  }
+  lastMessageId = message.id;
+  append_message(message.role, message.text, message.avatarUrl);
+}
 
-    for (var i = lastDisplayedMessageIndex; i < data.length; i++) {
-      var role = data[i].role;
-      var text = data[i].text;
-      var avatarUrl = data[i].avatarUrl;
+function get_new_messages() {
 
-      append_message(role, text, avatarUrl);
+  $.getJSON("/get_messages?after=" + lastMessageId + "&run=" + encodeURIComponent(followedRun), function (data) {
+    for (var i = 0; i < data.length; i++) {
+      show_message(data[i]);
+    }
+  });
+}
 
+function follow_messages() {
+  // the current run of the server, or else the run started last
+  $.getJSON("/runs", function (data) {
+    followedRun = data.current || data.latest;
+    if (!followedRun) {
+      setTimeout(follow_messages, 1000);
+      return;
     }
+    if (!window.EventSource) {
+      get_new_messages();
+      setInterval(get_new_messages, 1000);
+      return;
+    }
+    // the browser reconnects by itself and resumes after the last event id
+    var source = new EventSource("/stream/messages?after=" + lastMessageId + "&run=" + encodeURIComponent(followedRun));
+    source.addEventListener("messages", function (event) {
+      show_message(JSON.parse(event.data));
+    });
   });
 }
 
@@ -131,10 +158,7 @@ function copyToClipboard(element) {
 
 
 $(document).ready(function () {
-  get_new_messages();
-  setInterval(function () {
-    get_new_messages();
-  }, 1000);
+  follow_messages();
   $("#submitButton").click(function(e){
     $("#loading-bar").css('visibility', 'visible');
     // $(this).prop("disabled", true);
@@ -117,6 +117,9 @@ let pauseIntervalId;
 var if_move = true;
 var md = window.markdownit();
 var folder_name = null;
+// id of the job submitted from this page, its logs are followed and its project downloaded
+var current_job = null;
+var logSource = null;
 
 //watch replay button clicked
 const button = document.getElementById('replay');
@@ -132,7 +135,8 @@ $(document).ready(function() {
         $.ajax({
             url: '/download',
             data: {
-                folder_name: folder_name
+                folder_name: folder_name,
+                job: current_job
             },
             xhrFields: {
                 responseType: 'blob' // Set the response type to 'blob' for binary data
@@ -243,42 +247,64 @@ function watchfileInput(content, _folder_name) {
     }
 }
 
-function get_new_logs(start_idx) {
-
-    $.getJSON("/get_logs", async function (data) {
-        // console.log(data);
-    //   var lastDisplayedMessageIndex = dialogbody.length;
-      for (var i = start_idx; i < data.length; i++) {
-        var contents = data[i].log;
-        if (contents == "<FINISH>"){
-            var form = document.getElementById('taskForm');
-            var loadingBar = document.getElementById('loading-bar');
-    
-            // Enable input elements
-            var inputs = form.querySelectorAll('input');
-            inputs.forEach(function(input) {
-                input.disabled = false;
-            });
-    
-            // Show loading bar
-            loadingBar.style.display = 'block';
-        }
-        // console.log("LOGGGG", contents);
-        dialog = extraction(contents);
-        // console.log(dialog);
-        var filelable = document.getElementById("successupload");
-        filelable.style.display = "block";
-        var info = "Replaying" + "......";
-        filelable.innerHTML = md.render(info);
-        for (let i = 0; i < dialog.length; ++i) {
-            await createPara(dialog[i], i);
-        }
-  
+// id of the last log shown, the logs are shown one after the other in this chain
+var lastLogId = 0;
+var shownLogs = Promise.resolve();
+
+async function show_log(log) {
+    if (log.id <= lastLogId) {
+        return;
+    }
+    lastLogId = log.id;
+    var contents = log.log;
+    if (contents == "<FINISH>"){
+        var form = document.getElementById('taskForm');
+        var loadingBar = document.getElementById('loading-bar');
+
+        // Enable input elements
+        var inputs = form.querySelectorAll('input');
+        inputs.forEach(function(input) {
+            input.disabled = false;
+        });
+
+        // Show loading bar
+        loadingBar.style.display = 'block';
+    }
+    dialog = extraction(contents);
+    var filelable = document.getElementById("successupload");
+    filelable.style.display = "block";
+    var info = "Replaying" + "......";
+    filelable.innerHTML = md.render(info);
+    for (let i = 0; i < dialog.length; ++i) {
+        await createPara(dialog[i], i);
+    }
+}
+
+function poll_new_logs() {
+    $.getJSON("/get_logs?after=" + lastLogId + (current_job ? "&run=" + current_job : ""), async function (data) {
+      for (var i = 0; i < data.length; i++) {
+        await show_log(data[i]);
       }
-      get_new_logs(data.length);
+      setTimeout(poll_new_logs, data.length > 0 ? 0 : 1000);
+    });
+}
+
+function get_new_logs(after_id, run) {
+    lastLogId = after_id;
+    if (!window.EventSource) {
+        poll_new_logs();
+        return;
+    }
+    if (logSource != null) {
+        logSource.close();
+    }
+    // the server pushes only the new logs, the browser reconnects by itself after the last event id
+    var source = logSource = new EventSource("/stream/logs?after=" + after_id + (run ? "&run=" + run : ""));
+    source.addEventListener("logs", function (event) {
+        var log = JSON.parse(event.data);
+        shownLogs = shownLogs.then(function () { return show_log(log); });
     });
-    
-  }
+}
 //extract information 
 function extraction(contents) {
     const regex = /\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} \w+)\] ([.\s\S\n\r\d\D\t]*?)(?=\n\[\d|$)/g;
@@ -22,26 +22,12 @@ root = os.path.dirname(__file__)
 sys.path.append(root)
 
 from agilecoder.components.chat_chain import ChatChain
+from agilecoder.components.log_buffer import install_buffer_handler
 from dotenv import load_dotenv
 current_dir = os.getcwd()
 env_path = os.path.join(current_dir, '.env')
 load_dotenv(env_path)
 
-class BufferHandler(logging.Handler):
-    def __init__(self, level=logging.NOTSET, format=None, datefmt=None, encoding=None):
-        logging.Handler.__init__(self)
-        self.buffer = []
-
-        if format:
-            formatter = logging.Formatter(format, datefmt)
-            self.setFormatter(formatter)
-        if level:
-            self.setLevel(level)
-        if encoding:
-            self.encoding = encoding
-
-    def emit(self, record):
-        self.buffer.append(self.format(record))
 def get_config(company):
     """
     return configuration json files for ChatChain
@@ -86,6 +72,8 @@ parser.add_argument('--name', type=str, default="Gomoku",
                     help="Name of software, your software will be generated in WareHouse/name_org_timestamp")
 parser.add_argument('--model', type=str, default="CLAUDE",
                     help="GPT Model, choose from {'GPT_3_5_TURBO','GPT_4','GPT_4_32K', 'GPT_3_5_AZURE','ClAUDE'}")
+parser.add_argument('--unit-testing', action='store_true', default=None,
+                    help="Write and run unit tests in the Test phases, like unit_testing in ChatChainConfig.json")
 args = parser.parse_args()
 
 # Start AgileCoder
@@ -102,7 +90,8 @@ chat_chain = ChatChain(config_path=config_path,
                        task_prompt=args.task,
                        project_name=args.name,
                        org_name=args.org,
-                       model_type=args2type[args.model])
+                       model_type=args2type[args.model],
+                       unit_testing=args.unit_testing)
 
 # ----------------------------------------
 #          Init Log
@@ -110,12 +99,8 @@ chat_chain = ChatChain(config_path=config_path,
 logging.basicConfig(filename=chat_chain.log_filepath, level=logging.INFO,
                     format='[%(asctime)s %(levelname)s] %(message)s',
                     datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-buffer_handler = BufferHandler(level=logging.INFO,
-                    format='[%(asctime)s %(levelname)s] %(message)s',
-                    datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-buffer_handler.setLevel(logging.INFO)  # Set the handler level to DEBUG
-# logger.addHandler(buffer_handler)
-logging.root.addHandler(buffer_handler)
+# keeps the latest records for the online log, AGILECODER_LOG_BUFFER sets how many
+install_buffer_handler()
 # ----------------------------------------
 #          Pre Processing
 # ----------------------------------------
@@ -8,26 +8,13 @@ root = os.path.dirname(__file__)
 sys.path.append(root)
 
 from agilecoder.components.chat_chain import ChatChain
+from agilecoder.components.log_buffer import install_buffer_handler
 from agilecoder.online_log.app import send_online_log
 from dotenv import load_dotenv
 load_dotenv()
 
+args2type = {'GPT_3_5_TURBO': ModelType.GPT_3_5_TURBO, 'GPT_4': ModelType.GPT_4, 'GPT_4_32K': ModelType.GPT_4_32k, 'GPT_3_5_AZURE': ModelType.GPT_3_5_AZURE,'CLAUDE':ModelType.CLAUDE}
 
-class BufferHandler(logging.Handler):
-    def __init__(self, level=logging.NOTSET, format=None, datefmt=None, encoding=None):
-        logging.Handler.__init__(self)
-        self.buffer = []
-
-        if format:
-            formatter = logging.Formatter(format, datefmt)
-            self.setFormatter(formatter)
-        if level:
-            self.setLevel(level)
-        if encoding:
-            self.encoding = encoding
-
-    def emit(self, record):
-        self.buffer.append(self.format(record))
 
 def get_config(company):
     """
@@ -72,14 +59,14 @@ def run_task(args):
     home_path = os.path.expanduser("~")
     warehouse_path = os.path.join(home_path, "AgileCoder", "WareHouse")
     os.makedirs(warehouse_path, exist_ok = True)
-    args2type = {'GPT_3_5_TURBO': ModelType.GPT_3_5_TURBO, 'GPT_4': ModelType.GPT_4, 'GPT_4_32K': ModelType.GPT_4_32k, 'GPT_3_5_AZURE': ModelType.GPT_3_5_AZURE,'CLAUDE':ModelType.CLAUDE}
     chat_chain = ChatChain(config_path=config_path,
                         config_phase_path=config_phase_path,
                         config_role_path=config_role_path,
                         task_prompt=args.task,
                         project_name=args.name,
                         org_name=args.org,
-                        model_type=args2type[args.model])
+                        model_type=args2type[args.model],
+                        unit_testing=getattr(args, "unit_testing", None))
 
     # ----------------------------------------
     #          Init Log
@@ -87,12 +74,8 @@ def run_task(args):
     logging.basicConfig(filename=chat_chain.log_filepath, level=logging.INFO,
                         format='[%(asctime)s %(levelname)s] %(message)s',
                         datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-    buffer_handler = BufferHandler(level=logging.INFO,
-                        format='[%(asctime)s %(levelname)s] %(message)s',
-                        datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-    buffer_handler.setLevel(logging.INFO)  # Set the handler level to DEBUG
-    # logger.addHandler(buffer_handler)
-    logging.root.addHandler(buffer_handler)
+    # replaces the handler of the previous task, AGILECODER_LOG_BUFFER sets how many records are kept
+    install_buffer_handler()
 
     # ----------------------------------------
     #          Pre Processing
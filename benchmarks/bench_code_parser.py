@@ -0,0 +1,67 @@
+"""
+throughput of Codes parsing on the response corpus, optionally against an older revision
+
+    python benchmarks/bench_code_parser.py --baseline HEAD~1 --size 300
+the baseline is timed on --baseline-size KB only, the regex based parser is quadratic on some layouts
+"""
+import argparse
+import re
+
+from common import best_of, load_baseline, load_corpus
+
+from agilecoder.components.code_parser import CodeBlockParser
+from agilecoder.components.codes import Codes
+
+
+def scale(content, size_kb):
+    """repeat a response with renamed files until it reaches size_kb"""
+    parts = []
+    total = 0
+    i = 0
+    while total < size_kb * 1024:
+        part = re.sub(r"(\w+)\.(py|txt|css)\n```", r"\g<1>_{}.\2\n```".format(i), content) + "\n\n"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def streamed(content, chunk_size=64):
+    parser = CodeBlockParser()
+    for i in range(0, len(content), chunk_size):
+        parser.feed(content[i:i + chunk_size])
+    parser.close()
+    return parser.blocks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", default=None, help="git revision to compare against")
+    parser.add_argument("--size", type=int, default=300, help="size in KB of the scaled responses")
+    parser.add_argument("--baseline-size", type=int, default=20, help="size in KB of the responses given to the baseline")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    baseline = load_baseline(args.baseline, "agilecoder/components/codes.py").Codes if args.baseline else None
+
+    print("{:<22}{:>10}{:>14}{:>14}{:>14}".format("response", "KB", "parse MB/s", "stream MB/s", "baseline MB/s"))
+    for name, content in load_corpus().items():
+        if baseline is not None:
+            expected = baseline(content)
+            actual = Codes(content)
+            assert expected.codebooks == actual.codebooks, name
+            assert expected.has_correct_format == actual.has_correct_format, name
+        large = scale(content, args.size)
+        megabytes = len(large) / 1024 / 1024
+        row = [name, len(large) // 1024,
+               megabytes / best_of(lambda: Codes(large), args.repeat),
+               megabytes / best_of(lambda: streamed(large), args.repeat)]
+        if baseline is not None:
+            small = scale(content, args.baseline_size)
+            row.append(len(small) / 1024 / 1024 / best_of(lambda: baseline(small), args.repeat))
+        else:
+            row.append(float("nan"))
+        print("{:<22}{:>10}{:>14.2f}{:>14.2f}{:>14.2f}".format(*row))
+
+
+if __name__ == "__main__":
+    main()
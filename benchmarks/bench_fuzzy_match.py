@@ -0,0 +1,93 @@
+"""
+time to assign an unnamed code block to one of the project files, against strsimpy's NormalizedLevenshtein
+
+    python benchmarks/bench_fuzzy_match.py --files 6 --lines 200
+the reference needs strsimpy installed, rapidfuzz is used automatically when installed
+"""
+import argparse
+import importlib.util
+import random
+import time
+
+from common import best_of, load_corpus
+
+from agilecoder.components import similarity
+from agilecoder.components.codes import Codes
+
+
+def make_project(num_files, num_lines, seed=0):
+    """files of num_lines drawn from the code in the corpus, so that they share vocabulary like real projects"""
+    pool = [line for content in load_corpus().values() for code in Codes(content).codebooks.values()
+            for line in code.splitlines()]
+    generator = random.Random(seed)
+    return {"file_{}.py".format(i): "\n".join(generator.choice(pool) for _ in range(num_lines)) for i in range(num_files)}
+
+
+def edit(code, ratio, seed=0):
+    """rewrite, drop or insert about ratio of the lines"""
+    generator = random.Random(seed)
+    lines = code.splitlines()
+    for _ in range(int(len(lines) * ratio)):
+        i = generator.randrange(len(lines))
+        operation = generator.random()
+        if operation < 0.4:
+            lines[i] = lines[i].replace("self", "this")
+        elif operation < 0.7:
+            lines.pop(i)
+        else:
+            lines.insert(i, "    # updated")
+    return "\n".join(lines)
+
+
+def reference(code, codebooks, threshold=0.7):
+    from strsimpy.normalized_levenshtein import NormalizedLevenshtein
+    normalized_levenshtein = NormalizedLevenshtein()
+    scores = [(filename, normalized_levenshtein.similarity(code, file_code)) for filename, file_code in codebooks.items()]
+    if len(scores) == 0:
+        return None
+    best = sorted(scores, key=lambda x: x[1], reverse=True)[0]
+    return best if best[1] > threshold else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-reference", action="store_true", help="the reference takes minutes on large files")
+    args = parser.parse_args()
+    codebooks = make_project(args.files, args.lines)
+    queries = {"small edit": edit(codebooks["file_0.py"], 0.05, 1),
+               "large edit": edit(codebooks["file_{}.py".format(args.files - 1)], 0.3, 2),
+               "new file": make_project(1, args.lines, seed=99)["file_0.py"]}
+    accelerator = similarity._rapidfuzz_levenshtein
+    has_reference = importlib.util.find_spec("strsimpy") is not None and not args.skip_reference
+
+    print("{} files of {} lines, {} KB".format(args.files, args.lines, sum(map(len, codebooks.values())) // 1024))
+    print("{:<12}{:>22}{:>14}{:>14}{:>14}".format("query", "match", "reference s", "myers s", "rapidfuzz s"))
+    for name, code in queries.items():
+        similarity._rapidfuzz_levenshtein = None
+        match = similarity.best_match(code, codebooks)
+        row = [name, "{} {:.3f}".format(*match) if match else "None"]
+        if has_reference:
+            start = time.perf_counter()
+            expected = reference(code, codebooks)
+            row.append(time.perf_counter() - start)
+            assert expected == match, (name, expected, match)
+        else:
+            row.append(float("nan"))
+        # profiles are cached across calls, time the first call too
+        similarity._profile.cache_clear()
+        row.append(best_of(lambda: (similarity._profile.cache_clear(), similarity.best_match(code, codebooks)), args.repeat))
+        if accelerator is not None:
+            similarity._rapidfuzz_levenshtein = accelerator
+            assert similarity.best_match(code, codebooks) == match, name
+            row.append(best_of(lambda: (similarity._profile.cache_clear(), similarity.best_match(code, codebooks)), args.repeat))
+        else:
+            row.append(float("nan"))
+        print("{:<12}{:>22}{:>14.4f}{:>14.4f}{:>14.4f}".format(*row))
+    similarity._rapidfuzz_levenshtein = accelerator
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+per-rewrite cost of versioning a project with git_management, shelling out to git versus GitRepository
+
+    python benchmarks/bench_git_snapshot.py --files 20 --rewrites 30
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# the agilecoder of this checkout, as common.py does for the other benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agilecoder.components.versioning import GitRepository
+
+IDENTITY = {"GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@localhost",
+            "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@localhost"}
+
+
+def make_project(directory, num_files, num_assets):
+    for i in range(num_files):
+        with open(os.path.join(directory, "module_{}.py".format(i)), "w") as f:
+            f.write("def function_{}():\n    return {}\n".format(i, i) * 50)
+    os.makedirs(os.path.join(directory, "assets"))
+    for i in range(num_assets):
+        with open(os.path.join(directory, "assets", "image_{}.png".format(i)), "wb") as f:
+            f.write(os.urandom(200 * 1024))
+
+
+def touch(directory, rewrite):
+    filename = "module_{}.py".format(rewrite % 3)
+    with open(os.path.join(directory, filename), "a") as f:
+        f.write("# rewrite {}\n".format(rewrite))
+    return filename
+
+
+def shell(directory, rewrites):
+    os.system("cd {}; git init -q".format(directory))
+    start = time.perf_counter()
+    for rewrite in range(rewrites):
+        touch(directory, rewrite)
+        os.system("cd {}; git add .".format(directory))
+        os.system("cd {}; git commit -q -m \"{}\"".format(directory, rewrite))
+    return (time.perf_counter() - start) / rewrites
+
+
+def in_process(directory, rewrites):
+    repository = GitRepository(directory)
+    repository.stage([filename for filename in os.listdir(directory) if filename.endswith(".py")])
+    repository.commit("initial")
+    start = time.perf_counter()
+    for rewrite in range(rewrites):
+        repository.stage([touch(directory, rewrite)])
+        repository.commit(str(rewrite))
+    return (time.perf_counter() - start) / rewrites
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--assets", type=int, default=10)
+    parser.add_argument("--rewrites", type=int, default=30)
+    args = parser.parse_args()
+    os.environ.update(IDENTITY)
+    for name, function in [("git add/commit", shell), ("GitRepository", in_process)]:
+        directory = tempfile.mkdtemp()
+        try:
+            make_project(directory, args.files, args.assets)
+            print("{:<16}{:>10.2f} ms per rewrite".format(name, function(directory, args.rewrites) * 1000))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
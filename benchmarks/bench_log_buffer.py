@@ -0,0 +1,76 @@
+"""
+memory held by the log buffer of the root logger after replaying a recorded run many times,
+the unbounded list of the former BufferHandler against the ring buffer
+
+    python benchmarks/bench_log_buffer.py --sprints 50
+"""
+import argparse
+import logging
+import os
+import re
+import time
+import tracemalloc
+
+from common import ROOT
+
+from agilecoder.components.log_buffer import BufferHandler
+
+RECORDED_RUN = os.path.join(ROOT, "agilecoder", "online_log", "static", "replay", "logs", "20230727204525.log")
+FORMAT = '[%(asctime)s %(levelname)s] %(message)s'
+
+
+class ListBufferHandler(logging.Handler):
+    """the handler used before, every formatted record is kept"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.buffer = []
+        self.setFormatter(logging.Formatter(FORMAT))
+
+    def emit(self, record):
+        self.buffer.append(self.format(record))
+
+
+def load_messages():
+    with open(RECORDED_RUN, encoding="utf-8") as f:
+        content = f.read()
+    return [message.strip() for message in re.split(r"^\[[^\]]+ INFO\] ", content, flags=re.MULTILINE) if message.strip()]
+
+
+def replay(handler, messages, sprints):
+    logger = logging.getLogger("bench_log_buffer")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for sprint in range(sprints):
+        for message in messages:
+            # distinct strings, like the codes and diffs logged by every sprint
+            logger.info("%s\n%d", message, sprint)
+            handler.buffer[-1]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logger.removeHandler(handler)
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sprints", type=int, default=50)
+    parser.add_argument("--capacity", type=int, default=1000)
+    args = parser.parse_args()
+    messages = load_messages()
+    print("{} records, {} KB per replay, {} replays".format(len(messages), sum(map(len, messages)) // 1024, args.sprints))
+    handlers = [("list", ListBufferHandler()),
+                ("ring {}".format(args.capacity), BufferHandler(format=FORMAT, capacity=args.capacity)),
+                ("latest only", BufferHandler(format=FORMAT, capacity=1))]
+    for name, handler in handlers:
+        memory, elapsed = replay(handler, messages, args.sprints)
+        print("{:<14}{:>10.1f} MB{:>10.2f} us per record".format(
+            name, memory / 2 ** 20, elapsed / (len(messages) * args.sprints) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
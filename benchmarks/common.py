@@ -0,0 +1,42 @@
+import glob
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus")
+sys.path.insert(0, ROOT)
+
+
+def load_corpus():
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            corpus[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return corpus
+
+
+def load_baseline(revision, path):
+    """import the version of a module at a git revision, to compare against the working tree"""
+    source = subprocess.run(["git", "show", "{}:{}".format(revision, path)], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    fd, module_path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location("baseline_" + os.path.basename(path)[:-3], module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    os.remove(module_path)
+    return module
+
+
+def best_of(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -17,7 +17,6 @@ install_requires=[
         "tiktoken",
         "markdown",
         "colorama",
-        "strsimpy==0.2.1",
         "python-dotenv"
       ],
 packages=find_packages(),
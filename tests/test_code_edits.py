@@ -0,0 +1,31 @@
+from agilecoder.components.code_edits import Edit, apply_edit
+
+CODE = "import os\n\n\ndef a():\n    return 1\n\n\ndef b():\n    return 2\n"
+
+
+def test_search_block_spanning_blank_lines_is_applied():
+    search = ["    return 1", "", "", "def b():", "    return 2"]
+    replace = ["    return 1", "", "", "def b():", "    return 3"]
+
+    new_code, detail = apply_edit(CODE, Edit("main.py", search, replace))
+    assert detail == "exact"
+    assert new_code == CODE.replace("return 2", "return 3")
+
+
+def test_search_block_without_the_blank_lines_of_the_code_is_applied():
+    new_code, detail = apply_edit(CODE, Edit("main.py", ["    return 1", "def b():"], ["    return 1", "", "", "def c():"]))
+    assert detail == "blank lines"
+    assert new_code == CODE.replace("def b", "def c")
+
+
+def test_blank_lines_around_a_search_block_are_not_anchors():
+    new_code, detail = apply_edit(CODE, Edit("main.py", ["", "def b():", ""], ["", "def c():", ""]))
+    assert detail == "exact"
+    assert new_code == CODE.replace("def b", "def c")
+
+
+def test_created_file_keeps_its_blank_lines():
+    content = 'import os\n\n\ndef f():\n    s = """a\n\nb"""\n'
+    new_code, detail = apply_edit(None, Edit("main.py", [], content.split("\n")))
+    assert detail == "created"
+    assert new_code == content
@@ -0,0 +1,57 @@
+from agilecoder.components.code_parser import CodeBlockParser, parse_code_blocks
+
+RESPONSE = "main.py\n```python\nprint('main')\n```\n\nutils.py\n```python\ndef f():\n    return 1\n```\n"
+
+
+def test_blocks_keep_the_text_above_their_fence():
+    main, utils = parse_code_blocks(RESPONSE)
+    assert (main.header_line, main.language, main.body) == ("main.py", "python", "print('main')\n")
+    assert (utils.header, utils.header_line) == ("\n\nutils.py\n", "utils.py")
+    assert utils.body == "def f():\n    return 1\n"
+    assert main.closed and utils.closed
+
+
+def test_chunks_split_anywhere_give_the_same_blocks():
+    for size in (1, 2, 3, 7):
+        parser = CodeBlockParser()
+        completed = []
+        for start in range(0, len(RESPONSE), size):
+            completed += parser.feed(RESPONSE[start:start + size])
+        completed += parser.close()
+        assert completed == parse_code_blocks(RESPONSE)
+
+
+def test_block_is_returned_once_its_fence_is_closed():
+    parser = CodeBlockParser()
+    assert parser.feed("main.py\n```python\nprint(1)\n") == []
+    assert parser.in_block
+    assert [block.body for block in parser.feed("```\n")] == ["print(1)\n"]
+    assert not parser.in_block
+
+
+def test_truncated_response_keeps_its_last_block_unclosed():
+    blocks = parse_code_blocks(RESPONSE + "game.py\n```python\nclass Game:\n    def run(sel")
+    assert [block.closed for block in blocks] == [True, True, False]
+    assert blocks[-1].header_line == "game.py"
+    assert blocks[-1].body == "class Game:\n    def run(sel"
+
+
+def test_unterminated_fence_line_is_not_a_block():
+    # the language of a fence is only known at the end of its line
+    assert parse_code_blocks("main.py\n```pyth") == []
+
+
+def test_fence_inside_a_line_does_not_open_a_block():
+    assert parse_code_blocks("use ```python fences\n") == []
+    [block] = parse_code_blocks("use ```python fences\n```\ncode\n```\n")
+    assert block.header_line == "use ```python fences"
+
+
+def test_nested_path_above_a_fence_is_kept_whole():
+    [block] = parse_code_blocks("src/game/board.py\n```python\nBOARD = []\n```\n")
+    assert block.header_line == "src/game/board.py"
+
+
+def test_fence_at_the_start_of_the_response_has_no_header_line():
+    [block] = parse_code_blocks("```python\nx = 1\n```\n")
+    assert (block.header, block.header_line) == ("", None)
@@ -0,0 +1,86 @@
+import os
+
+from agilecoder.components.code_store import CodeStore
+
+
+def write(root, path, content):
+    filepath = os.path.join(root, path)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "w") as f:
+        f.write(content)
+
+
+def test_scan_lists_the_nested_sources_without_the_ignored_ones(tmp_path):
+    root = str(tmp_path)
+    write(root, "main.py", "print(1)\n")
+    write(root, "game/board/cell.py", "CELL = 1\n")
+    write(root, "game/__pycache__/cell.py", "")
+    write(root, "build/main.py", "")
+    write(root, "notes.txt", "")
+    write(root, "generated/out.py", "")
+    write(root, ".gitignore", "# output\ngenerated/\n!keep.py\n")
+
+    store = CodeStore(root)
+    assert sorted(store) == ["game/board/cell.py", "main.py"]
+    assert store["game/board/cell.py"] == "CELL = 1\n"
+
+
+def test_size_limits_skip_files(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "a = 1\n")
+    write(root, "b.py", "b = 1\n")
+    write(root, "large.py", "x" * 100)
+
+    store = CodeStore(root, max_file_size=50, max_files=1)
+    assert list(store) == ["a.py"]
+    assert store.skipped == {"b.py": "more than 1 files", "large.py": "larger than 50 bytes"}
+
+
+def test_deleted_then_assigned_file_is_back(tmp_path):
+    root = str(tmp_path)
+    write(root, "main.py", "print(1)\n")
+    store = CodeStore(root)
+
+    del store["main.py"]
+    assert "main.py" not in store and len(store) == 0
+    store["main.py"] = "print(2)\n"
+    assert list(store) == ["main.py"] and len(store) == 1
+    assert store["main.py"] == "print(2)\n"
+
+    write(root, "main.py", "print(2)\n")
+    store.mark_written("main.py")
+    assert store.modified == {} and store.deleted == set()
+    assert store["main.py"] == "print(2)\n"
+
+
+def test_file_removed_from_disk_is_missing(tmp_path):
+    root = str(tmp_path)
+    write(root, "main.py", "print(1)\n")
+    store = CodeStore(root)
+
+    os.remove(os.path.join(root, "main.py"))
+    assert store.get("main.py") is None
+
+
+def test_cache_evicts_the_least_recently_read_files(tmp_path):
+    root = str(tmp_path)
+    for name in "abc":
+        write(root, name + ".py", name * 10)
+    store = CodeStore(root, cache_bytes=20)
+
+    for name in ("a.py", "b.py", "a.py", "c.py"):
+        store[name]
+    assert list(store._cache) == ["a.py", "c.py"]
+    assert store._cached_bytes == 20
+
+
+def test_cache_is_invalidated_by_the_modification_time(tmp_path):
+    root = str(tmp_path)
+    write(root, "main.py", "print(1)\n")
+    store = CodeStore(root, formatter=str.strip)
+    assert store["main.py"] == "print(1)"
+
+    write(root, "main.py", "print(2)\n")
+    stat = os.stat(os.path.join(root, "main.py"))
+    os.utime(os.path.join(root, "main.py"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert store["main.py"] == "print(2)"
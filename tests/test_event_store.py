@@ -0,0 +1,91 @@
+import time
+
+from agilecoder.online_log.event_store import EventStore
+
+
+def messages(*texts):
+    return [{"text": text} for text in texts]
+
+
+def texts(events):
+    return [event["text"] for event in events]
+
+
+def test_first_append_of_a_run_keeps_all_its_events_in_memory():
+    store = EventStore()
+    first, second = store.append("run", "messages", messages("a", "b"))
+
+    tail = store._tails["run"]["messages"]
+    assert tail.complete and tail.covers(0)
+    assert store.after("run", "messages") == [first, second]
+    assert store.after("run", "messages", after=first["id"]) == [second]
+    assert texts(store.after("run", "messages", limit=1)) == ["a"]
+
+
+def test_events_beyond_the_tail_are_read_from_the_database():
+    store = EventStore(tail_size=2)
+    stored = store.append("run", "messages", messages(*"abcde"))
+
+    assert not store._tails["run"]["messages"].complete
+    assert texts(store.after("run", "messages")) == list("abcde")
+    assert texts(store.after("run", "messages", after=stored[3]["id"])) == ["e"]
+
+
+def test_least_recently_used_runs_leave_memory():
+    store = EventStore(cached_runs=1)
+    store.append("first", "messages", messages("a"))
+    store.append("second", "messages", messages("b"))
+
+    assert list(store._tails) == ["second"]
+    assert texts(store.after("first", "messages")) == ["a"]
+
+
+def test_cursors_keep_increasing_across_restarts(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    old = store.append("old", "messages", messages("a", "b"))
+    store.delete_run("old")
+    store.close()
+
+    store = EventStore(path)
+    [new] = store.append("new", "messages", messages("c"))
+    assert new["id"] > old[-1]["id"]
+    store.close()
+
+    store = EventStore(path)
+    assert store.after("new", "messages", after=old[-1]["id"]) == [new]
+
+
+def test_run_continued_after_a_restart_keeps_its_earlier_events(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    store.append("run", "logs", messages("a"))
+    store.close()
+
+    store = EventStore(path)
+    store.append("run", "logs", messages("b"))
+    assert not store._tails["run"]["logs"].complete
+    assert texts(store.after("run", "logs")) == ["a", "b"]
+
+
+def test_retention_drops_the_oldest_runs(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    for run in ("first", "second", "third"):
+        store.append(run, "messages", messages(run))
+        time.sleep(0.01)
+    store.close()
+
+    store = EventStore(path, max_runs=2)
+    assert [run["run"] for run in store.runs()] == ["third", "second"]
+    assert store.after("first", "messages") == []
+
+
+def test_retention_drops_the_oldest_events_of_long_runs():
+    store = EventStore(max_events_per_run=3, retention_interval=5)
+    store.append("run", "messages", messages(*"abcd"))
+    assert texts(store.after("run", "messages")) == list("abcd")
+
+    store.append("run", "messages", messages("e"))
+    assert texts(store.after("run", "messages")) == list("cde")
+    assert store.runs()[0]["num_messages"] == 3
@@ -0,0 +1,42 @@
+from agilecoder.online_log.jobs import CANCELLED, FAILED, FINISHED, QUEUED, RUNNING, JobQueue
+
+
+def wait_finished(jobs, job):
+    with jobs.changed:
+        jobs.changed.wait_for(lambda: job.status in FINISHED, timeout=10)
+    return job.to_dict()
+
+
+def test_a_run_that_fails_to_start_does_not_stop_its_worker():
+    # a lambda cannot be pickled for the spawned process of the run
+    jobs = JobQueue(lambda args: None, max_workers=1)
+    first = jobs.submit({"name": "first"})
+    assert wait_finished(jobs, first)["status"] == FAILED
+    assert "pickle" in first.error.lower()
+
+    second = jobs.submit({"name": "second"})
+    assert wait_finished(jobs, second)["status"] == FAILED
+    assert all(worker.is_alive() for worker in jobs._workers)
+
+
+def test_cancel_a_queued_job():
+    jobs = JobQueue(print, max_workers=0)
+    job = jobs.submit({"name": "queued"})
+
+    assert jobs.cancel(job.id)
+    assert jobs.get(job.id).status == CANCELLED
+    assert not jobs.cancel(job.id)
+
+
+def test_restart_fails_the_running_jobs_and_keeps_the_queued_ones(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    jobs = JobQueue(print, path, max_workers=0)
+    running, queued = jobs.submit({"name": "running"}), jobs.submit({"name": "queued"})
+    running.status = RUNNING
+    jobs._save(running)
+
+    restarted = JobQueue(print, path, max_workers=0)
+    assert restarted.get(running.id).status == FAILED
+    assert restarted.get(running.id).error == "interrupted by a restart of the server"
+    assert restarted.get(queued.id).status == QUEUED
+    assert restarted.position(restarted.get(queued.id)) == 0
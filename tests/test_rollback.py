@@ -0,0 +1,38 @@
+from agilecoder.components.chat_env import ChatEnv, ChatEnvConfig
+
+
+def make_env(tmp_path):
+    env = ChatEnv(ChatEnvConfig(clear_structure=False, brainstorming=False, gui_design=False, git_management=False,
+                                rollback_on_regression=True))
+    env.set_directory(str(tmp_path / "software"))
+    return env
+
+
+def write_and_test(env, code, num_errors):
+    env.update_codes("main.py\n```python\n{}\n```\n".format(code))
+    env.rewrite_codes()
+    env.record_test_outcome(num_errors > 0, ["error"] * num_errors)
+    return env.codes.history.head
+
+
+def test_rollback_keeps_the_codes_of_the_current_sprint(tmp_path):
+    env = make_env(tmp_path)
+    write_and_test(env, "print('sprint 1')", 0)
+    # the Test phase of the next sprint starts on the new codes
+    sprint_2 = write_and_test(env, "print('sprint 2')", 1)
+
+    assert env.roll_back_codes(since=sprint_2.number) is None
+    assert env.codes.codebooks["main.py"] == "print('sprint 2')"
+
+
+def test_rollback_restores_the_best_codes_of_the_current_sprint(tmp_path):
+    env = make_env(tmp_path)
+    write_and_test(env, "print('sprint 1')", 0)
+    sprint_2 = write_and_test(env, "print('sprint 2')", 1)
+    write_and_test(env, "print('sprint 2, worse')", 3)
+
+    restored = env.roll_back_codes(since=sprint_2.number)
+    assert restored is sprint_2
+    assert env.codes.codebooks["main.py"] == "print('sprint 2')"
+    with open(tmp_path / "software" / "main.py") as f:
+        assert f.read() == "print('sprint 2')"
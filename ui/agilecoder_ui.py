@@ -8,7 +8,7 @@ from src.init import init_devika
 init_devika()
 
 from src.run_terminal import TerminalRun
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from src.socket_instance import socketio, emit_agent
 import os
@@ -23,6 +23,7 @@ from src.project import ProjectManager
 from src.state import AgentState
 from src.agents import Agent
 from src.llm import LLM
+from agilecoder.components.metrics import CONTENT_TYPE, REGISTRY
 
 
 app = Flask(__name__)
@@ -200,6 +201,11 @@ def get_settings():
 
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     logger.info("AgileCoder is up and running!")
     socketio.run(app, debug=False, port=1337, host="0.0.0.0")
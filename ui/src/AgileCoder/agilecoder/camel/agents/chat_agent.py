@@ -23,6 +23,7 @@ from agilecoder.camel.configs import ChatGPTConfig
 from agilecoder.camel.messages import ChatMessage, MessageType, SystemMessage
 from agilecoder.camel.model_backend import ModelBackend, ModelFactory
 from agilecoder.camel.typing import ModelType, RoleType
+from agilecoder.components.events import LLMRetry, emit
 from agilecoder.camel.utils import (
     get_model_token_limit,
     num_tokens_from_messages,
@@ -30,6 +31,12 @@ from agilecoder.camel.utils import (
 )
 
 
+def emit_retry(retry_state):
+    """called by tenacity before a step of an agent is tried again"""
+    agent = retry_state.args[0]
+    emit(LLMRetry(agent.model.value, retry_state.attempt_number))
+
+
 @dataclass(frozen=True)
 class ChatAgentResponse:
     r"""Response of a ChatAgent.
@@ -153,7 +160,7 @@ class ChatAgent(BaseAgent):
         self.stored_messages.append(message)
         return self.stored_messages
 
-    @retry(wait=wait_exponential(min=5, max=60), stop=stop_after_attempt(5))
+    @retry(wait=wait_exponential(min=5, max=60), stop=stop_after_attempt(5), before_sleep=emit_retry)
     @openai_api_key_required
     def step(
             self,
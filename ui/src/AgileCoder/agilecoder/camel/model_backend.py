@@ -14,10 +14,12 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 import os
+import time
 import openai
 import tiktoken
 
 from agilecoder.camel.typing import ModelType
+from agilecoder.components.events import LLMCall, emit
 from agilecoder.components.utils import log_and_print_online
 
 
@@ -82,8 +84,15 @@ class OpenAIModel(ModelBackend):
         else:
             kwargs['model'] = self.model_type.value
         # import pdb; pdb.set_trace()
-        response = openai.ChatCompletion.create(*args, **kwargs,
-                                                **self.model_config_dict)
+        start = time.perf_counter()
+        try:
+            response = openai.ChatCompletion.create(*args, **kwargs,
+                                                    **self.model_config_dict)
+        except Exception as e:
+            emit(LLMCall(self.model_type.value, 0, 0, time.perf_counter() - start, error=type(e).__name__))
+            raise
+        emit(LLMCall(self.model_type.value, response["usage"]["prompt_tokens"],
+                     response["usage"]["completion_tokens"], time.perf_counter() - start))
 
         log_and_print_online(
             "**[OpenAI_Usage_Info Receive]**\nprompt_tokens: {}\ncompletion_tokens: {}\ntotal_tokens: {}\n".format(
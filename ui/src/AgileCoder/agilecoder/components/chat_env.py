@@ -12,6 +12,7 @@ import requests
 
 from agilecoder.components.codes import Codes
 from agilecoder.components.documents import Documents
+from agilecoder.components.events import TestRun, emit
 from agilecoder.components.roster import Roster
 from agilecoder.components.utils import log_and_print_online
 
@@ -165,6 +166,7 @@ class ChatEnv:
                         #         break
                         command = "cd {}; ls -l; python3 ".format(directory) + testing_command
                     print('COMMAND:', command)
+                    start = time.perf_counter()
                     process = subprocess.Popen(command,
                                     shell=True,
                                     preexec_fn=os.setsid,
@@ -197,6 +199,8 @@ class ChatEnv:
                     #     else:
                     #         return False, success_info
                     error_output = process.stderr.read().decode('utf-8')
+                    duration = time.perf_counter() - start
+                    passed = True
                     if error_output:
                         if return_code != 0:
                             if "Traceback".lower() in error_output.lower():
@@ -204,13 +208,16 @@ class ChatEnv:
                                 # return True, errs
                                 error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
                                 return_flag = True
+                                passed = False
                                 
                             # else:
                             #     return False, success_info
                         else:
                             if 'error' in error_output.lower():
                                 return_flag = True
+                                passed = False
                                 error_contents += """\nError Traceback for Running {testing_command}:\n{errs}""".format(testing_command = testing_command, errs = errs)
+                    emit(TestRun(testing_command, passed, duration, return_code))
 
                 if return_flag:
                     return return_flag, error_contents
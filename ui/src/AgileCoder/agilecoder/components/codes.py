@@ -1,6 +1,7 @@
 import os
 import re
 from strsimpy.normalized_levenshtein import NormalizedLevenshtein
+from agilecoder.components.events import CodesUpdated, emit
 from agilecoder.components.utils import log_and_print_online
 import difflib
 import ast
@@ -173,8 +174,10 @@ class Codes:
         new_codes = Codes(generated_content)
         differ = difflib.Differ()
         flag = False
+        updated = []
         for key in new_codes.codebooks.keys():
             if key not in self.codebooks.keys() or self.codebooks[key] != new_codes.codebooks[key]:
+                updated.append(key)
                 update_codes_content = "**[Update Codes]**\n\n"
                 update_codes_content += "{} updated.\n".format(key)
                 old_codes_content = self.codebooks[key] if key in self.codebooks.keys() else "# None"
@@ -193,6 +196,7 @@ class Codes:
                 log_and_print_online(update_codes_content)
                 self.codebooks[key] = new_codes.codebooks[key]
             flag = True
+        emit(CodesUpdated(updated))
         return flag
         # return hasattr(new_codes, 'has_correct_format') and new_codes.has_correct_format
 
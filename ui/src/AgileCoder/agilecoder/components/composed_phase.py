@@ -5,6 +5,7 @@ from collections import defaultdict
 
 from agilecoder.camel.typing import ModelType
 from agilecoder.components.chat_env import ChatEnv
+from agilecoder.components.events import PhaseStarted, emit
 from agilecoder.components.utils import log_and_print_online
 import sys
 from project import ProjectManager
@@ -144,6 +145,7 @@ class ComposedPhase(ABC):
         """
         self.update_phase_env(chat_env)
         for cycle_index in range(self.cycle_num):
+            emit(PhaseStarted(self.phase_name, composed=True, cycle=cycle_index))
             for phase_item in self.composition:
                 if phase_item["phaseType"] == "SimplePhase":  # right now we do not support nested composition
                     phase = phase_item['phase']
@@ -0,0 +1 @@
+../../../../../agilecoder/components/events.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../../../../agilecoder/components/log_buffer.py
\ No newline at end of file
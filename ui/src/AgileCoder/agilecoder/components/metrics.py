@@ -0,0 +1 @@
+../../../../../agilecoder/components/metrics.py
\ No newline at end of file
@@ -1,11 +1,13 @@
 import os
 import re
+import time
 from abc import ABC, abstractmethod
 
 from agilecoder.camel.agents import RolePlaying
 from agilecoder.camel.messages import ChatMessage
 from agilecoder.camel.typing import TaskType, ModelType
 from agilecoder.components.chat_env import ChatEnv
+from agilecoder.components.events import PhaseFinished, PhaseStarted, emit
 from agilecoder.components.statistics import get_info
 from agilecoder.components.utils import log_and_print_online, log_arguments, get_classes_in_folder
 import glob
@@ -142,6 +144,7 @@ class Phase(ABC):
             # all above are done in role_play_session.step, which contains two interactions with LLM
             # the first interaction is logged in role_play_session.init_chat
             assistant_response, user_response = role_play_session.step(input_user_msg, chat_turn_limit == 1)
+            self.turns = getattr(self, "turns", 0) + 1
 
             conversation_meta = "**" + assistant_role_name + "<->" + user_role_name + " on : " + str(
                 phase_name) + ", turn " + str(i) + "**\n\n" #use this
@@ -234,6 +237,7 @@ class Phase(ABC):
         else:
             raise ValueError(f"Reflection of phase {phase_name}: Not Assigned.")
 
+        self.reflections = getattr(self, "reflections", 0) + 1
         # Reflections actually is a special phase between CEO and counselor
         # They read the whole chatting history of this phase and give refined conclusion of this phase
         reflected_content = \
@@ -307,6 +311,9 @@ class Phase(ABC):
             chat_env: updated global chat chain environment using the conclusion from this phase execution
 
         """
+        emit(PhaseStarted(self.phase_name))
+        start = time.perf_counter()
+        self.turns, self.reflections = 0, 0
         self.update_phase_env(chat_env)
         self.seminar_conclusion = \
             self.chatting(chat_env=chat_env,
@@ -322,6 +329,7 @@ class Phase(ABC):
                           placeholders=self.phase_env,
                           model_type=self.model_type)
         chat_env = self.update_chat_env(chat_env)
+        emit(PhaseFinished(self.phase_name, time.perf_counter() - start, self.turns, self.reflections))
         return chat_env
 
 
@@ -1048,6 +1056,9 @@ class TestErrorSummary(Phase):
         return chat_env
 
     def execute(self, chat_env, chat_turn_limit, need_reflect) -> ChatEnv:
+        emit(PhaseStarted(self.phase_name))
+        start = time.perf_counter()
+        self.turns, self.reflections = 0, 0
         self.update_phase_env(chat_env)
         flag = True
         if "ModuleNotFoundError" in self.phase_env['test_reports']:
@@ -1079,6 +1090,7 @@ class TestErrorSummary(Phase):
                               chat_turn_limit=chat_turn_limit,
                               placeholders=self.phase_env)
         chat_env = self.update_chat_env(chat_env)
+        emit(PhaseFinished(self.phase_name, time.perf_counter() - start, self.turns, self.reflections))
         return chat_env
 
 def extract_file_names(traceback_str):
@@ -0,0 +1 @@
+../../../../../agilecoder/online_log/archive.py
\ No newline at end of file
@@ -19,6 +19,9 @@ from agilecoder.camel.typing import ModelType
 
 
 from agilecoder.components.chat_chain import ChatChain
+from agilecoder.components.log_buffer import install_buffer_handler
+from agilecoder.components.metrics import MetricsSink
+from agilecoder.components.events import install_sink
 from dotenv import load_dotenv
 current_dir = os.getcwd()
 env_path = os.path.join(current_dir, '.env')
@@ -27,21 +30,6 @@ def get_log_filename():
     for handler in logging.root.handlers:
         if isinstance(handler, logging.FileHandler):
             return handler.baseFilename
-class BufferHandler(logging.Handler):
-    def __init__(self, level=logging.NOTSET, format=None, datefmt=None, encoding=None):
-        logging.Handler.__init__(self)
-        self.buffer = []
-
-        if format:
-            formatter = logging.Formatter(format, datefmt)
-            self.setFormatter(formatter)
-        if level:
-            self.setLevel(level)
-        if encoding:
-            self.encoding = encoding
-
-    def emit(self, record):
-        self.buffer.append(self.format(record))
 root = 'src/AgileCoder/agilecoder'
 
 def get_config(company):
@@ -153,12 +141,10 @@ class Agent:
         logging.basicConfig(filename=chat_chain.log_filepath, level=logging.INFO,
                     format='[%(asctime)s %(levelname)s] %(message)s',
                     datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-        buffer_handler = BufferHandler(level=logging.INFO,
-                            format='[%(asctime)s %(levelname)s] %(message)s',
-                            datefmt='%Y-%d-%m %H:%M:%S', encoding="utf-8")
-        buffer_handler.setLevel(logging.INFO)  # Set the handler level to DEBUG
-        # logger.addHandler(buffer_handler)
-        logging.root.addHandler(buffer_handler)
+        # replaces the handler of the previous task, AGILECODER_LOG_BUFFER sets how many records are kept
+        install_buffer_handler()
+        # the metrics of the chain are served by /metrics of the UI server
+        install_sink(MetricsSink())
         # ----------------------------------------
         #          Pre Processing
         # ----------------------------------------
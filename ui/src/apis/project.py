@@ -1,4 +1,4 @@
-from flask import blueprints, request, jsonify, send_file, make_response
+from flask import Response, blueprints, request, jsonify, send_file, make_response
 from src.logger import Logger, route_logger
 from src.config import Config
 from src.project import ProjectManager
@@ -36,9 +36,10 @@ def delete_project():
 @route_logger(logger)
 def download_project():
     project_name = request.args.get("project_name")
-    manager.project_to_zip(project_name)
-    project_path = manager.get_zip_path(project_name)
-    return send_file(project_path, as_attachment=False)
+    zip_path = manager.get_zip_path(project_name)
+    if zip_path is not None:
+        return send_file(zip_path, as_attachment=False)
+    return Response(manager.stream_project_zip(project_name), mimetype="application/zip")
 
 
 @project_bp.route("/api/download-project-pdf", methods=["GET"])
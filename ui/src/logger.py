@@ -1,10 +1,15 @@
+import time
 from functools import wraps
 
 from fastlogging import LogInit
 from flask import request
 
+from agilecoder.components.metrics import REGISTRY
 from src.config import Config
 
+REQUEST_SECONDS = REGISTRY.histogram("agilecoder_ui_request_seconds", "Latency of the routes of the UI server.",
+                                     ["route", "method"])
+
 
 class Logger:
     def __init__(self, filename="devika_agent.log"):
@@ -56,7 +61,10 @@ def route_logger(logger: Logger):
                 logger.info(f"{request.path} {request.method}")
 
             # Call the actual route function
+            start = time.perf_counter()
             response = func(*args, **kwargs)
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method)
 
             from werkzeug.wrappers import Response
 
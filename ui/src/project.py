@@ -1,11 +1,11 @@
 import os
 import json
-import zipfile
 from datetime import datetime
 from typing import Optional
 from src.socket_instance import emit_agent
 from sqlmodel import Field, Session, SQLModel, create_engine
 from src.config import Config
+from agilecoder.online_log.archive import ArchiveCache
 
 
 class Projects(SQLModel, table=True):
@@ -21,6 +21,7 @@ class ProjectManager:
         config = Config()
         sqlite_path = config.get_sqlite_db()
         self.project_path = config.get_projects_dir()
+        self.archives = ArchiveCache()
         self.engine = create_engine(f"sqlite:///{sqlite_path}")
         SQLModel.metadata.create_all(self.engine)
 
@@ -135,17 +136,16 @@ class ProjectManager:
     def get_project_path(self, project: str):
         return os.path.join(self.project_path, project.lower().replace(" ", "-"))
 
-    def project_to_zip(self, project: str):
-        project_path = self.get_project_path(project)
-        zip_path = f"{project_path}.zip"
+    def _zip_prefix(self, project: str):
+        # the files are in the directory of the project in the archive
+        return os.path.basename(self.get_project_path(project)) + "/"
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(project_path):
-                for file in files:
-                    relative_path = os.path.relpath(os.path.join(root, file), os.path.join(project_path, '..'))
-                    zipf.write(os.path.join(root, file), arcname=relative_path)
+    def project_to_zip(self, project: str):
+        return self.archives.build(self.get_project_path(project), self._zip_prefix(project))
 
-        return zip_path
+    def stream_project_zip(self, project: str):
+        return self.archives.stream(self.get_project_path(project), self._zip_prefix(project))
 
     def get_zip_path(self, project: str):
-        return f"{self.get_project_path(project)}.zip"
+        """the cached archive of the project as it is now, None when it has to be streamed"""
+        return self.archives.get(self.get_project_path(project), self._zip_prefix(project))